@@ -0,0 +1,290 @@
+"""
+Operational reporting from daily rollups.
+
+daily_rollups holds one row per (day, doctor): appointment counts per
+status, booked vs available minutes, and histograms of booking lead time
+(created_at -> date) and time to completion (slot start -> completed_at).
+Triggers on appointments, appointments_archive, availabilities and
+availability_rules add the affected days to rollup_dirty_days (for a
+rule, the days in its range that already have rollup data); refresh() recomputes only those
+days, ANALYTICS_BATCH_DAYS at a time, each batch in one short
+transaction. Reports sum rollup rows, so their cost depends on the
+number of days and doctors in range, never on the size of appointments.
+
+Distributions are kept as bucket counts on fixed edges, which add up
+across days, doctors and specializations; percentiles are read off the
+summed histogram and reported as the bucket's upper edge.
+
+Availability older than AVAILABILITY_KEEP_DAYS is pruned by
+maintenance.py, so available minutes for those days are frozen at their
+last computed value instead of being recomputed from nothing.
+
+    python analytics.py refresh
+    python analytics.py refresh --rebuild        # recompute every day
+    python analytics.py report --by week --from 2026-01-01 --to 2026-03-31
+"""
+import argparse
+import json
+import sys
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import date, timedelta
+from sqlalchemy import bindparam, create_engine, text
+import config
+import engine_profile
+import migrations
+import slots
+
+#upper bucket edges; values above the last edge land in an overflow bucket
+LEAD_EDGES_DAYS = (0, 1, 2, 3, 7, 14, 30, 60, 90, 180, 365)
+COMPLETION_EDGES_HOURS = (0.5, 1, 2, 4, 8, 24, 72, 168)
+GROUPS = ('day', 'week', 'doctor', 'specialization')
+COUNTED = ('pending', 'completed', 'cancelled', 'no-show')
+
+_CLAIM = text(
+    "DELETE FROM rollup_dirty_days WHERE day IN (SELECT day FROM rollup_dirty_days ORDER BY day LIMIT :limit) "
+    "RETURNING day"
+)
+_EXTRACT_COLUMNS = (
+    "date, COALESCE(doctor_id, 0), status, time IS NOT NULL, "
+    "julianday(date) - julianday(created_at), "
+    "(julianday(completed_at) - julianday(date || ' ' || COALESCE(time, '00:00:00'))) * 24"
+)
+_EXTRACT = text(
+    f"SELECT {_EXTRACT_COLUMNS} FROM appointments WHERE date IN :days "
+    f"UNION ALL SELECT {_EXTRACT_COLUMNS} FROM appointments_archive WHERE date IN :days"
+).bindparams(bindparam('days', expanding=True))
+_WINDOWS = text(
+    "SELECT doctor_id, date, start_time, end_time FROM availabilities WHERE date IN :days"
+).bindparams(bindparam('days', expanding=True))
+_RULES = text(
+    "SELECT doctor_id, weekdays, start_time, end_time, valid_from, valid_until, skip_dates "
+    "FROM availability_rules WHERE valid_from <= :last AND (valid_until IS NULL OR valid_until >= :first)"
+)
+_FROZEN = text(
+    "SELECT day, doctor_id, available_minutes FROM daily_rollups WHERE day IN :days AND day < :horizon"
+).bindparams(bindparam('days', expanding=True))
+_CLEAR = text("DELETE FROM daily_rollups WHERE day IN :days").bindparams(bindparam('days', expanding=True))
+_INSERT = text(
+    "INSERT INTO daily_rollups (day, doctor_id, total, pending, completed, cancelled, no_show, "
+    "booked_minutes, available_minutes, lead_hist, completion_hist) "
+    "VALUES (:day, :doctor_id, :total, :pending, :completed, :cancelled, :no_show, "
+    ":booked_minutes, :available_minutes, :lead_hist, :completion_hist)"
+)
+
+
+def _new_row():
+    return {'total': 0, 'pending': 0, 'completed': 0, 'cancelled': 0, 'no_show': 0,
+            'booked_minutes': 0, 'available_minutes': 0,
+            'lead_hist': [0] * (len(LEAD_EDGES_DAYS) + 1),
+            'completion_hist': [0] * (len(COMPLETION_EDGES_HOURS) + 1)}
+
+
+def _capacity(conn, days):
+    """{(day, doctor_id): available minutes} from one-off windows and weekly rules."""
+    windows = defaultdict(list)
+    for doctor_id, day, s, e in conn.execute(_WINDOWS, {'days': days}):
+        windows[(day, doctor_id)].append((slots.to_minutes(s), slots.to_minutes(e)))
+    first, last = date.fromisoformat(days[0]), date.fromisoformat(days[-1])
+    wanted = set(days)
+    for doctor_id, weekdays, s, e, valid_from, valid_until, skip_dates in conn.execute(
+            _RULES, {'first': days[0], 'last': days[-1]}):
+        skipped = {date.fromisoformat(d) for d in (skip_dates or '').split(',') if d}
+        expanded = slots.expand_rule(weekdays, (slots.to_minutes(s), slots.to_minutes(e)),
+                                     date.fromisoformat(valid_from),
+                                     date.fromisoformat(valid_until) if valid_until else None, skipped, first, last)
+        for day, window in expanded:
+            if day.isoformat() in wanted:
+                windows[(day.isoformat(), doctor_id)].append(window)
+    return {key: sum(e - s for s, e in slots.merge_intervals(w)) for key, w in windows.items()}
+
+
+def _rebuild_days(conn, days, horizon):
+    rows = defaultdict(_new_row)
+    for day, doctor_id, status, timed, lead, completion in conn.execute(_EXTRACT, {'days': days}):
+        row = rows[(day, doctor_id)]
+        row['total'] += 1
+        if status in COUNTED:
+            row[status.replace('-', '_')] += 1
+        if status != 'cancelled' and timed:
+            row['booked_minutes'] += slots.SLOT_MINUTES
+        if lead is not None:
+            row['lead_hist'][bisect_left(LEAD_EDGES_DAYS, max(lead, 0))] += 1
+        if completion is not None and status == 'completed':
+            row['completion_hist'][bisect_left(COMPLETION_EDGES_HOURS, max(completion, 0))] += 1
+    capacity = _capacity(conn, days)
+    #past the availability prune horizon the windows may be gone already
+    for day, doctor_id, minutes in conn.execute(_FROZEN, {'days': days, 'horizon': horizon}):
+        capacity[(day, doctor_id)] = minutes
+    for key, minutes in capacity.items():
+        rows[key]['available_minutes'] = minutes
+    conn.execute(_CLEAR, {'days': days})
+    if rows:
+        conn.execute(_INSERT, [
+            dict(row, day=day, doctor_id=doctor_id,
+                 lead_hist=json.dumps(row['lead_hist']), completion_hist=json.dumps(row['completion_hist']))
+            for (day, doctor_id), row in rows.items()
+        ])
+
+
+def refresh(engine, batch_days=None, today=None, log=None):
+    """Recompute the rollups of every dirty day; returns how many days were rebuilt."""
+    batch_days = batch_days or config.ANALYTICS_BATCH_DAYS
+    horizon = ((today or date.today()) - timedelta(days=config.AVAILABILITY_KEEP_DAYS)).isoformat()
+    done = 0
+    while True:
+        #claiming the days is the transaction's first write, so no other
+        #writer can dirty them again until this batch commits
+        with engine.begin() as conn:
+            days = sorted(str(d) for d in conn.execute(_CLAIM, {'limit': batch_days}).scalars())
+            if days:
+                _rebuild_days(conn, days, horizon)
+        if not days:
+            return done
+        done += len(days)
+        if log:
+            log(f"rebuilt {done} days")
+
+
+def mark_all_dirty(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT OR IGNORE INTO rollup_dirty_days (day) "
+            "SELECT date FROM appointments UNION SELECT date FROM appointments_archive "
+            "UNION SELECT date FROM availabilities UNION SELECT day FROM daily_rollups"
+        ))
+
+
+def pending_days(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM rollup_dirty_days")).scalar()
+
+
+#-------
+#Reports
+#-------
+def percentile(hist, edges, q):
+    """Upper edge of the bucket holding the q-th quantile, None if empty, inf for overflow."""
+    total = sum(hist)
+    if not total:
+        return None
+    need = q * total
+    seen = 0
+    for i, n in enumerate(hist):
+        seen += n
+        if seen >= need and n:
+            return edges[i] if i < len(edges) else float('inf')
+    return float('inf')
+
+
+def _group_key(by, day, doctor_id, doctor_name, specialization):
+    if by == 'day':
+        return day
+    if by == 'week':
+        d = date.fromisoformat(day)
+        return (d - timedelta(days=d.weekday())).isoformat()
+    if by == 'doctor':
+        return doctor_name or (f"doctor {doctor_id}" if doctor_id else 'unassigned')
+    return specialization or 'unspecified'
+
+
+def report(engine, start, end, by='day'):
+    """
+    List of dicts, one per group, with counts, completion/cancellation/no-show
+    rates, utilisation and lead/completion time percentiles.
+    """
+    if by not in GROUPS:
+        raise ValueError(f"unknown grouping {by!r}; use one of {', '.join(GROUPS)}")
+    groups = {}
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT r.day, r.doctor_id, u.name, d.specialization, r.total, r.pending, r.completed, r.cancelled, "
+            "r.no_show, r.booked_minutes, r.available_minutes, r.lead_hist, r.completion_hist "
+            "FROM daily_rollups r LEFT JOIN doctors d ON d.id = r.doctor_id LEFT JOIN users u ON u.id = d.user_id "
+            "WHERE r.day >= :start AND r.day <= :end"
+        ), {'start': start.isoformat(), 'end': end.isoformat()})
+        for (day, doctor_id, name, specialization, total, pending, completed, cancelled, no_show,
+             booked, available, lead_hist, completion_hist) in rows:
+            key = _group_key(by, day, doctor_id, name, specialization)
+            g = groups.get(key)
+            if g is None:
+                g = groups[key] = _new_row()
+            g['total'] += total
+            g['pending'] += pending
+            g['completed'] += completed
+            g['cancelled'] += cancelled
+            g['no_show'] += no_show
+            g['booked_minutes'] += booked
+            g['available_minutes'] += available
+            for i, n in enumerate(json.loads(lead_hist)):
+                g['lead_hist'][i] += n
+            for i, n in enumerate(json.loads(completion_hist)):
+                g['completion_hist'][i] += n
+    result = []
+    for key in sorted(groups):
+        g = groups[key]
+        total = g['total']
+        result.append({
+            'group': key,
+            'total': total,
+            'completed': g['completed'],
+            'cancelled': g['cancelled'],
+            'no_show': g['no_show'],
+            'pending': g['pending'],
+            'completion_rate': g['completed'] / total if total else None,
+            'cancellation_rate': g['cancelled'] / total if total else None,
+            'no_show_rate': g['no_show'] / total if total else None,
+            'utilisation': g['booked_minutes'] / g['available_minutes'] if g['available_minutes'] else None,
+            'lead_days_p50': percentile(g['lead_hist'], LEAD_EDGES_DAYS, 0.5),
+            'lead_days_p90': percentile(g['lead_hist'], LEAD_EDGES_DAYS, 0.9),
+            'completion_hours_p50': percentile(g['completion_hist'], COMPLETION_EDGES_HOURS, 0.5),
+            'completion_hours_p90': percentile(g['completion_hist'], COMPLETION_EDGES_HOURS, 0.9),
+        })
+    return result
+
+
+def _fmt(value, pct=False):
+    if value is None:
+        return '-'
+    if value == float('inf'):
+        return 'more'
+    return f"{value:.0%}" if pct else f"{value:g}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh and query the appointment rollups.")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    r = sub.add_parser('refresh', help='recompute dirty days')
+    r.add_argument('--rebuild', action='store_true', help='recompute every day, not just dirty ones')
+    r.add_argument('--batch-days', type=int, default=config.ANALYTICS_BATCH_DAYS)
+    rep = sub.add_parser('report', help='print a report (refreshes dirty days first)')
+    rep.add_argument('--by', choices=GROUPS, default='week')
+    rep.add_argument('--from', dest='start', type=date.fromisoformat, default=date.today() - timedelta(days=89))
+    rep.add_argument('--to', dest='end', type=date.fromisoformat, default=date.today())
+    args = parser.parse_args(argv)
+
+    engine = create_engine(config.DATABASE_URI)
+    engine_profile.install(engine)
+    migrations.upgrade(engine)
+    if args.cmd == 'refresh':
+        if args.rebuild:
+            mark_all_dirty(engine)
+        started = time.perf_counter()
+        n = refresh(engine, args.batch_days, log=lambda msg: print(msg, file=sys.stderr))
+        print(f"rebuilt {n} days in {time.perf_counter() - started:.1f}s")
+        return 0
+    refresh(engine)
+    print(f"{args.by:<24}{'total':>8}{'done':>7}{'cancel':>7}{'no-show':>8}{'util':>6}"
+          f"{'lead p50/p90 d':>16}{'done p50/p90 h':>16}")
+    for row in report(engine, args.start, args.end, args.by):
+        print(f"{str(row['group'])[:23]:<24}{row['total']:>8}{_fmt(row['completion_rate'], True):>7}"
+              f"{_fmt(row['cancellation_rate'], True):>7}{_fmt(row['no_show_rate'], True):>8}"
+              f"{_fmt(row['utilisation'], True):>6}"
+              f"{_fmt(row['lead_days_p50']) + '/' + _fmt(row['lead_days_p90']):>16}"
+              f"{_fmt(row['completion_hours_p50']) + '/' + _fmt(row['completion_hours_p90']):>16}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
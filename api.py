@@ -0,0 +1,323 @@
+"""
+JSON API, mounted at /api/v1.
+
+Uses the same login session as the HTML routes (POST /login first) and
+the same query helpers, so list endpoints are keyset-paginated:
+
+    GET  /api/v1/me
+    GET  /api/v1/doctors?specialization=&cursor=&dir=
+    GET  /api/v1/patients?cursor=&dir=                      admin
+    GET  /api/v1/patients/<id>                              admin, doctor
+    GET  /api/v1/appointments?status=&date_from=&date_to=&doctor_id=&patient_id=&cursor=&dir=
+    POST /api/v1/appointments                               {"doctor_id", "date", "time", "reason"}
+    POST /api/v1/appointments/batch                         {"updates": [{"id", "status", "notes"}, ...]}
+    GET  /api/v1/search?q=&kind=patients|appointments&cursor=&dir=  patients: admin, doctor
+    GET  /api/v1/availability?doctor_id=&date_from=&date_to=  first 500 windows
+    POST /api/v1/availability/batch                         {"windows": [{"date", "start_time", "end_time"}, ...]}
+
+Batch endpoints load every target row with one query and commit once;
+each item gets its own {"ok": true} or {"ok": false, "error": ...}
+result so one bad item doesn't sink the rest. Doctors and patients only
+ever see or touch their own appointments.
+"""
+from datetime import datetime
+from functools import wraps
+from flask import Blueprint, jsonify, request
+from models import db, Doctor, Patient, Availability, Appointment
+import auth
+import booking
+import fulltext
+import queries
+import validation
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+MAX_BATCH = 500
+
+
+def error(message, status=400):
+    return jsonify(error=message), status
+
+
+def api_role_required(*roles):
+    """JSON flavour of auth.role_required: 401/403 instead of a redirect."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            principal = auth.current_principal()
+            if principal is None or not principal.is_active:
+                return error("Login required.", 401)
+            if principal.role not in roles:
+                return error("Not allowed for this role.", 403)
+            #without a profile the doctor_id/patient_id scoping filters would be None
+            if principal.role == 'doctor' and principal.doctor_id is None:
+                return error("Doctor profile not found.", 403)
+            if principal.role == 'patient' and principal.patient_id is None:
+                return error("Patient profile not found.", 403)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def json_body():
+    """The JSON body as a dict; {} when it is missing, invalid or not an object."""
+    body = request.get_json(silent=True)
+    return body if isinstance(body, dict) else {}
+
+
+def batch_items(key):
+    """The list under `key` in the JSON body, or an error response."""
+    items = json_body().get(key)
+    if not isinstance(items, list) or not items:
+        return None, error(f'Send a non-empty "{key}" list.')
+    if len(items) > MAX_BATCH:
+        return None, error(f'At most {MAX_BATCH} {key} per request.')
+    return items, None
+
+
+def page_json(page, serialize):
+    return jsonify(items=[serialize(x) for x in page.items],
+                   next_cursor=page.next_cursor, prev_cursor=page.prev_cursor)
+
+
+#-----------
+#Serializers
+#-----------
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _hm(value):
+    return value.strftime('%H:%M') if value is not None else None
+
+
+def appointment_json(a):
+    return {
+        'id': a.id, 'date': _iso(a.date), 'time': _hm(a.time), 'status': a.status,
+        'patient_id': a.patient_id, 'patient_name': a.patient_name,
+        'doctor_id': a.doctor_id, 'doctor_name': a.doctor_name,
+        'reason': a.reason, 'notes': a.notes, 'completed_at': _iso(a.completed_at),
+    }
+
+
+def doctor_json(d):
+    return {'id': d.id, 'name': d.user.name if d.user else None,
+            'specialization': d.specialization, 'contact': d.contact}
+
+
+def patient_json(p):
+    return {'id': p.id, 'name': p.user.name if p.user else None, 'email': p.user.email if p.user else None,
+            'age': p.age, 'gender': p.gender, 'contact': p.contact}
+
+
+def availability_json(av):
+    return {'id': av.id, 'doctor_id': av.doctor_id, 'date': _iso(av.date),
+            'start_time': _hm(av.start_time), 'end_time': _hm(av.end_time)}
+
+
+#------
+#Routes
+#------
+@bp.route('/me')
+@api_role_required('admin', 'doctor', 'patient')
+def me():
+    p = auth.current_principal()
+    return jsonify(user_id=p.user_id, name=p.name, email=p.email, role=p.role,
+                   doctor_id=p.doctor_id, patient_id=p.patient_id)
+
+
+@bp.route('/doctors')
+@api_role_required('admin', 'doctor', 'patient')
+def doctors():
+    page = queries.doctors_page(request.args.get('specialization', '').strip() or None,
+                                request.args.get('cursor'), request.args.get('dir', 'next'))
+    return page_json(page, doctor_json)
+
+
+@bp.route('/patients')
+@api_role_required('admin')
+def patients():
+    page = queries.patients_page(request.args.get('cursor'), request.args.get('dir', 'next'))
+    return page_json(page, patient_json)
+
+
+@bp.route('/patients/<int:patient_id>')
+@api_role_required('admin', 'doctor')
+def patient(patient_id):
+    p = queries.get_patient(patient_id)
+    if not p:
+        return error("Patient not found.", 404)
+    return jsonify(patient_json(p))
+
+
+@bp.route('/appointments')
+@api_role_required('admin', 'doctor', 'patient')
+def appointments():
+    principal = auth.current_principal()
+    filters = queries.parse_appointment_filters(request.args)
+    if principal.role == 'doctor':
+        filters['doctor_id'] = principal.doctor_id
+    elif principal.role == 'patient':
+        filters['patient_id'] = principal.patient_id
+    page = queries.appointments_page(filters, request.args.get('cursor'), request.args.get('dir', 'next'))
+    return page_json(page, appointment_json)
+
+
+@bp.route('/appointments', methods=['POST'])
+@api_role_required('admin', 'patient')
+def create_appointment():
+    principal = auth.current_principal()
+    body = json_body()
+    patient_id = principal.patient_id if principal.role == 'patient' else body.get('patient_id')
+    try:
+        doctor_id = int(body.get('doctor_id'))
+        patient_id = int(patient_id)
+        appt_date = validation.parse_date(body.get('date'))
+        appt_time = validation.parse_time(body.get('time'))
+    except (TypeError, ValueError):
+        return error("Send doctor_id, date (YYYY-MM-DD) and time (HH:MM)"
+                     + (" and patient_id" if principal.role == 'admin' else "") + ".")
+    if not db.session.get(Doctor, doctor_id):
+        return error("Doctor not found.", 404)
+    if principal.role == 'admin' and not db.session.get(Patient, patient_id):
+        return error("Patient not found.", 404)
+    try:
+        appt = booking.book(patient_id, doctor_id, appt_date, appt_time,
+                            validation.optional(str(body.get('reason') or '')))
+    except booking.SlotTaken:
+        return error("That doctor already has an appointment at that date & time.", 409)
+    return jsonify(appointment_json(queries.get_appointment(appt.id))), 201
+
+
+def _apply_update(appt, item, now):
+    status = item.get('status') or 'completed'
+    if not isinstance(status, str):
+        raise ValueError("status must be a string")
+    status = status.strip().lower()
+    if status not in queries.APPOINTMENT_STATUSES:
+        raise ValueError(f"unknown status {status!r}")
+    #as in the views, a cancellation is final: its slot may be rebooked
+    if appt.status == 'cancelled' and status != 'cancelled':
+        raise ValueError("cancelled appointments can't be changed")
+    appt.status = status
+    if 'notes' in item:
+        appt.notes = validation.optional(str(item['notes'] or ''))
+    if status == 'completed' and appt.completed_at is None:
+        appt.completed_at = now
+
+
+@bp.route('/appointments/batch', methods=['POST'])
+@api_role_required('admin', 'doctor')
+def update_appointments():
+    """Set status/notes on many appointments in one transaction."""
+    principal = auth.current_principal()
+    items, err = batch_items('updates')
+    if err:
+        return err
+    ids = set()
+    for item in items:
+        try:
+            ids.add(int(item.get('id')))
+        except (AttributeError, TypeError, ValueError):
+            pass
+    found = {a.id: a for a in Appointment.query.filter(Appointment.id.in_(ids))} if ids else {}
+    now = datetime.now()
+    results, pending = [], []
+    for item in items:
+        try:
+            appt = found.get(int(item.get('id')))
+        except (AttributeError, TypeError, ValueError):
+            results.append({'id': None, 'ok': False, 'error': 'missing id'})
+            continue
+        if appt is None or (principal.role == 'doctor' and appt.doctor_id != principal.doctor_id):
+            results.append({'id': item.get('id'), 'ok': False, 'error': 'not found'})
+            continue
+        results.append({'id': appt.id, 'ok': True})
+        pending.append((results[-1], appt, item))
+    for result, appt, item in pending:
+        try:
+            _apply_update(appt, item, now)
+        except ValueError as e:
+            result.update(ok=False, error=str(e))
+    db.session.commit()
+    return jsonify(results=results, updated=sum(r['ok'] for r in results))
+
+
+@bp.route('/search')
+@api_role_required('admin', 'doctor', 'patient')
+def search():
+    principal = auth.current_principal()
+    q = request.args.get('q', '')
+    kind = request.args.get('kind', 'patients')
+    cursor, direction = request.args.get('cursor'), request.args.get('dir', 'next')
+    if kind == 'patients':
+        if principal.role == 'patient':
+            return error("Not allowed for this role.", 403)
+        return page_json(fulltext.search_patients(q, cursor, direction), patient_json)
+    if kind == 'appointments':
+        page = fulltext.search_appointments(q, principal.doctor_id, principal.patient_id, cursor, direction)
+        return page_json(page, appointment_json)
+    return error("kind must be patients or appointments.")
+
+
+@bp.route('/availability')
+@api_role_required('admin', 'doctor', 'patient')
+def availability():
+    principal = auth.current_principal()
+    filters = queries.parse_appointment_filters(request.args)
+    doctor_id = principal.doctor_id if principal.role == 'doctor' else filters.get('doctor_id')
+    if doctor_id is None:
+        return error("doctor_id is required.")
+    q = Availability.query.filter(Availability.doctor_id == doctor_id)
+    if 'date_from' in filters:
+        q = q.filter(Availability.date >= filters['date_from'])
+    if 'date_to' in filters:
+        q = q.filter(Availability.date <= filters['date_to'])
+    rows = q.order_by(Availability.date, Availability.start_time).limit(MAX_BATCH).all()
+    return jsonify(items=[availability_json(av) for av in rows])
+
+
+def _parse_window(item):
+    try:
+        av_date = validation.parse_date(item.get('date'))
+        start = validation.parse_time(item.get('start_time'))
+        end = validation.parse_time(item.get('end_time'))
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError("use date YYYY-MM-DD and start_time/end_time HH:MM")
+    if end <= start:
+        raise ValueError("end_time must be after start_time")
+    return av_date, start, end
+
+
+@bp.route('/availability/batch', methods=['POST'])
+@api_role_required('admin', 'doctor')
+def create_availability():
+    """Add many availability windows in one transaction."""
+    principal = auth.current_principal()
+    items, err = batch_items('windows')
+    if err:
+        return err
+    if principal.role == 'doctor':
+        doctor_id = principal.doctor_id
+    else:
+        doctor_id = json_body().get('doctor_id')
+        if not isinstance(doctor_id, int) or not db.session.get(Doctor, doctor_id):
+            return error("doctor_id of an existing doctor is required.", 404)
+    now = datetime.utcnow()
+    results, rows = [], []
+    for i, item in enumerate(items):
+        try:
+            av_date, start, end = _parse_window(item)
+        except ValueError as e:
+            results.append({'index': i, 'ok': False, 'error': str(e)})
+            continue
+        rows.append(Availability(doctor_id=doctor_id, date=av_date, start_time=start, end_time=end, created_at=now))
+        results.append({'index': i, 'ok': True})
+    if rows:
+        db.session.add_all(rows)
+        db.session.commit()
+        created = iter(rows)
+        for r in results:
+            if r['ok']:
+                r['id'] = next(created).id
+    return jsonify(results=results, created=len(rows)), 201 if rows else 400
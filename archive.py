@@ -0,0 +1,103 @@
+"""
+Hot/cold split for appointments.
+
+Completed, cancelled and no-show appointments dated before the horizon
+(config.ARCHIVE_HORIZON_DAYS) are copied to appointments_archive and
+deleted from appointments, ARCHIVE_BATCH_SIZE rows per transaction, so
+the app keeps serving while it runs and the hot table and its indexes
+only hold recent and upcoming work. Pending appointments are never
+moved. History views and exports read both tables (queries.history_page,
+exports.appointments_select), so archiving is invisible to users.
+
+    python archive.py                     # config horizon
+    python archive.py --horizon-days 180 --batch 5000
+    python archive.py --dry-run           # count only
+"""
+import argparse
+import sys
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import bindparam, create_engine, text
+import cache
+import config
+import engine_profile
+import migrations
+import stats
+
+COLUMNS = 'id, patient_id, doctor_id, date, time, reason, notes, status, created_at, completed_at'
+
+#appointments.id is AUTOINCREMENT (migration 10), so moved ids are never
+#handed out again
+_CANDIDATES = text(
+    "SELECT id FROM appointments WHERE status IN ('completed', 'cancelled', 'no-show') AND date < :cutoff "
+    "LIMIT :limit"
+)
+_COPY = text(
+    f"INSERT INTO appointments_archive ({COLUMNS}, archived_at) "
+    f"SELECT {COLUMNS}, :now FROM appointments WHERE id IN :ids"
+).bindparams(bindparam('ids', expanding=True))
+_DELETE = text("DELETE FROM appointments WHERE id IN :ids").bindparams(bindparam('ids', expanding=True))
+
+
+def cutoff_for(horizon_days=None, today=None):
+    horizon_days = config.ARCHIVE_HORIZON_DAYS if horizon_days is None else horizon_days
+    return (today or date.today()) - timedelta(days=horizon_days)
+
+
+def count_candidates(engine, cutoff):
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT COUNT(*) FROM appointments WHERE status IN ('completed', 'cancelled', 'no-show') AND date < :cutoff"
+        ), {'cutoff': cutoff.isoformat()}).scalar()
+
+
+def archive(engine, horizon_days=None, batch_size=None, pause=0.0, today=None, log=None):
+    """Move finished appointments older than the horizon; returns how many moved."""
+    cutoff = cutoff_for(horizon_days, today)
+    batch_size = batch_size or config.ARCHIVE_BATCH_SIZE
+    log = log or (lambda msg: None)
+    moved = 0
+    while True:
+        with engine.begin() as conn:
+            ids = conn.execute(_CANDIDATES, {'cutoff': cutoff.isoformat(), 'limit': batch_size}).scalars().all()
+            if ids:
+                conn.execute(_COPY, {'ids': ids, 'now': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')})
+                conn.execute(_DELETE, {'ids': ids})
+        if not ids:
+            break
+        moved += len(ids)
+        log(f"archived {moved} appointments")
+        if pause:
+            #let queued writers in between batches
+            time.sleep(pause)
+    if moved:
+        #rows left through Core, which the session hooks don't see
+        cache.bump('appointments', 'appointments_archive')
+        stats.invalidate()
+    return moved
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move old finished appointments to the archive table.")
+    parser.add_argument('--horizon-days', type=int, default=config.ARCHIVE_HORIZON_DAYS)
+    parser.add_argument('--batch', type=int, default=config.ARCHIVE_BATCH_SIZE, help='rows per transaction')
+    parser.add_argument('--pause', type=float, default=0.0, help='seconds to sleep between batches')
+    parser.add_argument('--dry-run', action='store_true', help='only count what would move')
+    args = parser.parse_args(argv)
+
+    engine = create_engine(config.DATABASE_URI)
+    engine_profile.install(engine)
+    migrations.upgrade(engine)
+    cutoff = cutoff_for(args.horizon_days)
+    if args.dry_run:
+        print(f"{count_candidates(engine, cutoff)} appointments before {cutoff} would be archived")
+        return 0
+    start = time.perf_counter()
+    moved = archive(engine, args.horizon_days, args.batch, args.pause,
+                    log=lambda msg: print(msg, file=sys.stderr))
+    print(f"archived {moved} appointments dated before {cutoff} in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Request authentication.
+
+The session only carries user_id. `current_principal()` resolves it once
+per request into a Principal (user, role, doctor/patient id and the few
+profile fields the dashboards show) and stores it on g.principal. The
+lookup is one joined query, cached per user and keyed on the versions
+of the users/doctors/patients tables, so any commit touching those
+tables (profile edits, admin_toggle_user_active, deletes) is seen on
+the very next request in this process; other worker processes see it
+once PRINCIPAL_TTL runs out.
+
+Deactivated or deleted users are logged out by `role_required`.
+"""
+from collections import namedtuple
+from functools import wraps
+from flask import g, session, flash, redirect, url_for
+from sqlalchemy import select
+from models import db, User, Doctor, Patient
+import cache
+import config
+
+Principal = namedtuple('Principal', 'user_id name email role is_active doctor_id patient_id contact age')
+
+_TABLES = ('users', 'doctors', 'patients')
+_principals = cache.Cache(maxsize=config.PRINCIPAL_CACHE_SIZE, ttl=config.PRINCIPAL_TTL)
+
+ROLE_MESSAGES = {
+    'admin': "Admin access required.",
+    'doctor': "Doctor access required.",
+    'patient': "Patient access required.",
+}
+
+
+def load_principal(user_id):
+    row = db.session.execute(
+        select(User.id, User.name, User.email, User.role, User.is_active, Doctor.id, Patient.id,
+               Doctor.contact, Patient.contact, Patient.age)
+        .outerjoin(Doctor, Doctor.user_id == User.id)
+        .outerjoin(Patient, Patient.user_id == User.id)
+        .where(User.id == user_id)
+    ).first()
+    if row is None:
+        return None
+    uid, name, email, role, is_active, doctor_id, patient_id, doctor_contact, patient_contact, age = row
+    return Principal(uid, name, email, role, bool(is_active), doctor_id, patient_id,
+                     doctor_contact or patient_contact, age)
+
+
+def get_principal(user_id):
+    key = (user_id, cache.table_version(*_TABLES))
+    return _principals.get_or_set(key, lambda: load_principal(user_id))
+
+
+def current_principal():
+    """The logged-in user's Principal, or None."""
+    if 'principal' not in g:
+        user_id = session.get('user_id')
+        g.principal = get_principal(user_id) if user_id else None
+    return g.principal
+
+
+def login(user):
+    session['user_id'] = user.id
+    session['role'] = user.role or 'patient'
+
+
+def logout():
+    session.clear()
+    g.pop('principal', None)
+
+
+def _forget_principal():
+    #g belongs to the app context, which can outlive one request (tests,
+    #scripts holding an app context), so never carry a principal over
+    g.pop('principal', None)
+
+
+def init_app(app):
+    app.before_request(_forget_principal)
+
+
+def role_required(*roles, message=None):
+    """
+    Allow the view only for logged-in, active users with one of `roles`.
+    Anyone else is flashed a message and sent to the login page.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            principal = current_principal()
+            if principal is None and session.get('user_id'):
+                logout()
+                flash("Your account no longer exists. Please log in again.", "danger")
+                return redirect(url_for('login'))
+            if principal is not None and not principal.is_active:
+                logout()
+                flash("This account has been deactivated. Contact admin.", "danger")
+                return redirect(url_for('login'))
+            if principal is None or principal.role not in roles:
+                flash(message or ROLE_MESSAGES.get(roles[0], "Please log in."), "danger")
+                return redirect(url_for('login'))
+            if principal.role == 'doctor' and principal.doctor_id is None:
+                flash("Doctor profile not found.", "danger")
+                return redirect(url_for('login'))
+            if principal.role == 'patient' and principal.patient_id is None:
+                flash("Patient profile not found.", "danger")
+                return redirect(url_for('login'))
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
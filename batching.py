@@ -0,0 +1,49 @@
+"""
+Batching helpers.
+
+chunks() splits any iterable into lists for executemany/IN batches.
+
+batched() runs the set-based writes of maintenance.py and bulk.py. The
+statement must cap itself with `LIMIT :limit` (usually as
+`WHERE id IN (SELECT id ... LIMIT :limit)`); it is re-run, each time in
+its own transaction, until a batch comes back short, sleeping `pause`
+seconds in between so queued writers get the SQLite lock.
+"""
+import time
+from itertools import islice
+
+
+def chunks(items, size):
+    """Yield lists of up to `size` items, consuming `items` lazily."""
+    it = iter(items)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def batched(engine, stmt, params, batch_size, pause, on_rows=None):
+    """
+    Run `stmt` in batches of `batch_size` rows; returns the total rows
+    touched. With `on_rows`, `stmt` has a RETURNING clause and
+    on_rows(conn, rows) is called inside each batch's transaction; a
+    callable it returns is run once that batch has committed.
+    """
+    total = 0
+    while True:
+        after_commit = None
+        with engine.begin() as conn:
+            result = conn.execute(stmt, dict(params, limit=batch_size))
+            if on_rows is None:
+                n = result.rowcount
+            else:
+                rows = result.fetchall()
+                n = len(rows)
+                after_commit = on_rows(conn, rows) if rows else None
+        if after_commit is not None:
+            after_commit()
+        total += n
+        if n < batch_size:
+            return total
+        time.sleep(pause)
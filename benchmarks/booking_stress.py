@@ -0,0 +1,86 @@
+"""
+Concurrent booking stress check.
+
+Starts N threads, each logged in as a different patient, releases them
+together at one doctor slot through POST /patient/book_appointment and
+checks that exactly one appointment exists afterwards. Exits non-zero on
+a double booking or an unexpected error.
+
+    python benchmarks/booking_stress.py [--threads 32] [--rounds 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_tmp = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = "sqlite:///" + os.path.join(_tmp, "stress.db")
+
+from app import create_app, init_schema  # noqa: E402
+from models import db, User, Patient, Doctor, Appointment  # noqa: E402
+
+app = create_app()
+init_schema(app)
+
+
+def seed(n_patients):
+    doctor = Doctor(user=User(name='Dr Stress', email='dr@stress', role='doctor', password_hash='x'))
+    patients = [Patient(user=User(name=f'P{i}', email=f'p{i}@stress', role='patient', password_hash='x'))
+                for i in range(n_patients)]
+    db.session.add_all([doctor] + patients)
+    db.session.commit()
+    return doctor.id, [p.user_id for p in patients]
+
+
+def hammer(doctor_id, user_ids, slot_date):
+    barrier = threading.Barrier(len(user_ids))
+    outcomes = []
+
+    def worker(uid):
+        client = app.test_client()
+        with client.session_transaction() as s:
+            s['user_id'] = uid
+            s['role'] = 'patient'
+        barrier.wait()
+        resp = client.post('/patient/book_appointment', data={
+            'doctor_id': doctor_id, 'date': slot_date.isoformat(), 'time': '10:00', 'reason': 'stress'})
+        outcomes.append(resp.headers.get('Location', ''))
+
+    threads = [threading.Thread(target=worker, args=(uid,)) for uid in user_ids]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    with app.app_context():
+        doctor_id, user_ids = seed(args.threads)
+    failed = False
+    for r in range(args.rounds):
+        slot_date = date.today() + timedelta(days=r + 1)
+        start = time.perf_counter()
+        outcomes = hammer(doctor_id, user_ids, slot_date)
+        elapsed = time.perf_counter() - start
+        with app.app_context():
+            booked = Appointment.query.filter_by(doctor_id=doctor_id, date=slot_date).count()
+        won = sum(1 for loc in outcomes if loc.endswith('/patient/dashboard'))
+        ok = booked == 1 and won == 1
+        failed = failed or not ok
+        print(f"round {r + 1}: {len(outcomes)} requests in {elapsed * 1000:.0f} ms, "
+              f"{won} won, {booked} row(s) stored - {'ok' if ok else 'FAILED'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
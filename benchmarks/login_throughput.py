@@ -0,0 +1,83 @@
+"""
+Login throughput with password checks inline versus in the hashing pool.
+
+Seeds users with the configured hash method, then has --threads client
+threads POST /login for --seconds and reports logins per second overall
+and per core.
+
+    python benchmarks/login_throughput.py [--threads 8] [--seconds 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_tmp = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = "sqlite:///" + os.path.join(_tmp, "login.db")
+#measure the routes themselves, not the admission limits
+os.environ['RATE_LIMIT_ENABLED'] = '0'
+
+from app import create_app, init_schema  # noqa: E402
+from models import db, User  # noqa: E402
+import config  # noqa: E402
+import hashing  # noqa: E402
+
+app = create_app()
+init_schema(app)
+
+PASSWORD = 'bench-password'
+
+
+def seed(n):
+    pwhash = hashing.hash_password(PASSWORD)
+    db.session.add_all([User(name=f'U{i}', email=f'u{i}@bench', role='admin', password_hash=pwhash)
+                        for i in range(n)])
+    db.session.commit()
+
+
+def run(threads, seconds):
+    done = [0] * threads
+    deadline = time.perf_counter() + seconds
+
+    def worker(i):
+        client = app.test_client()
+        while time.perf_counter() < deadline:
+            resp = client.post('/login', data={'email': f'u{i}@bench', 'password': PASSWORD})
+            if resp.status_code == 302 and 'dashboard' in resp.headers.get('Location', ''):
+                done[i] += 1
+            client.get('/logout')
+
+    ts = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    return sum(done)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    pool_workers = config.PASSWORD_HASH_WORKERS or cores
+    with app.app_context():
+        seed(args.threads)
+    print(f"method {config.PASSWORD_HASH_METHOD}, {args.threads} client threads, {cores} core(s)")
+    print(f"{'mode':<16}{'logins/s':>10}{'per core':>10}")
+    for mode, workers in (('inline', 0), (f'pool x{pool_workers}', pool_workers)):
+        config.PASSWORD_HASH_WORKERS = workers
+        hashing.shutdown()
+        n = run(args.threads, args.seconds)
+        rate = n / args.seconds
+        print(f"{mode:<16}{rate:>10.1f}{rate / cores:>10.1f}")
+    hashing.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Latency for a normal user while a script floods login, with and without
+admission control.
+
+--attackers threads POST /login with wrong passwords from one address
+(each attempt costs a full password hash) while one well-behaved client
+logs in and loads its dashboard every --pause seconds. Reports the
+well-behaved client's p50/p95/max latency and what the flood got back.
+
+    python benchmarks/overload.py [--attackers 16] [--seconds 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_tmp = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = "sqlite:///" + os.path.join(_tmp, "overload.db")
+
+from app import create_app, init_schema  # noqa: E402
+from models import db, User  # noqa: E402
+import hashing  # noqa: E402
+
+PASSWORD = 'bench-password'
+
+
+def seed(app):
+    with app.app_context():
+        db.session.add(User(name='Normal', email='normal@bench', role='admin',
+                            password_hash=hashing.hash_password(PASSWORD)))
+        db.session.commit()
+
+
+def run(app, attackers, seconds, pause):
+    deadline = time.perf_counter() + seconds
+    flood = Counter()
+    latencies = []
+
+    def attacker():
+        client = app.test_client()
+        client.environ_base['REMOTE_ADDR'] = '203.0.113.7'
+        while time.perf_counter() < deadline:
+            resp = client.post('/login', data={'email': 'normal@bench', 'password': 'wrong'})
+            flood[resp.status_code] += 1
+
+    def normal():
+        client = app.test_client()
+        client.environ_base['REMOTE_ADDR'] = '198.51.100.2'
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            client.post('/login', data={'email': 'normal@bench', 'password': PASSWORD})
+            client.get('/admin/dashboard')
+            latencies.append((time.perf_counter() - start) * 1000)
+            client.get('/logout')
+            time.sleep(pause)
+
+    threads = [threading.Thread(target=attacker) for _ in range(attackers)]
+    threads.append(threading.Thread(target=normal))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    return latencies, flood
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--attackers', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--pause', type=float, default=0.5, help='seconds between the normal client\'s logins')
+    args = parser.parse_args()
+
+    print(f"{'limits':<8}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}  flood responses")
+    for enabled in (False, True):
+        app = create_app({'RATE_LIMIT_ENABLED': enabled})
+        if not enabled:
+            init_schema(app)
+            seed(app)
+        latencies, flood = run(app, args.attackers, args.seconds, args.pause)
+        p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0
+        summary = ', '.join(f"{code}: {n}" for code, n in sorted(flood.items()))
+        print(f"{'on' if enabled else 'off':<8}{statistics.median(latencies):>9.1f}{p95:>9.1f}"
+              f"{latencies[-1]:>9.1f}  {summary}")
+    hashing.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
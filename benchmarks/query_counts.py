@@ -0,0 +1,103 @@
+"""
+Query counts per list route.
+
+Seeds a throwaway database at two sizes and renders each list page
+through the test client. Every route must issue the same number of
+statements at both sizes; a count that grows with the row count is an
+N+1 and fails the run. Counts are for a cold cache.
+
+    python benchmarks/query_counts.py
+"""
+import os
+import sys
+import tempfile
+from datetime import date, time, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_tmp = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = "sqlite:///" + os.path.join(_tmp, "bench.db")
+
+from app import create_app, init_schema  # noqa: E402
+from models import db, User, Patient, Doctor, Appointment  # noqa: E402
+from queries import QueryCounter  # noqa: E402
+import stats  # noqa: E402
+
+app = create_app()
+init_schema(app)
+
+ROUTES = [
+    ('admin', '/admin/dashboard'),
+    ('admin', '/admin/manage_doctors'),
+    ('admin', '/admin/manage_patients'),
+    ('admin', '/admin/view_all_appointments'),
+    ('admin', '/admin/view_patient_history?patient_id=1'),
+    ('doctor', '/doctor/dashboard'),
+    ('doctor', '/doctor/view_patient_history?patient_id=1'),
+    ('patient', '/patient/dashboard'),
+    ('patient', '/patient/book_appointment'),
+    ('patient', '/patient/appointment_history'),
+]
+
+
+def seed(n):
+    db.drop_all()
+    db.create_all()
+    stats.invalidate()
+    admin = User(name='Admin', email='admin@bench', role='admin', password_hash='x')
+    db.session.add(admin)
+    doctors, patients = [], []
+    for i in range(n):
+        du = User(name=f'Doctor {i}', email=f'd{i}@bench', role='doctor', password_hash='x')
+        pu = User(name=f'Patient {i}', email=f'p{i}@bench', role='patient', password_hash='x')
+        doctors.append(Doctor(user=du, specialization='General'))
+        patients.append(Patient(user=pu, age=30))
+    db.session.add_all(doctors + patients)
+    db.session.flush()
+    today = date.today()
+    for i in range(n):
+        for k in range(3):
+            db.session.add(Appointment(
+                patient_id=patients[0].id if k == 0 else patients[i].id,
+                doctor_id=doctors[0].id if k == 0 else doctors[i].id,
+                date=today + timedelta(days=k),
+                time=time(8 + i % 10, (i // 10) % 60),
+                status='pending',
+            ))
+    db.session.commit()
+    return {
+        'admin': admin.id,
+        'doctor': doctors[0].user_id,
+        'patient': patients[0].user_id,
+    }
+
+
+def measure(n):
+    with app.app_context():
+        users = seed(n)
+        client = app.test_client()
+        counts = {}
+        for role, url in ROUTES:
+            with client.session_transaction() as s:
+                s['user_id'] = users[role]
+                s['role'] = role
+            with QueryCounter(db.engine) as qc:
+                resp = client.get(url)
+            if resp.status_code != 200:
+                raise SystemExit(f"{url} returned {resp.status_code}")
+            counts[url] = qc.count
+        return counts
+
+
+def main():
+    small, large = measure(5), measure(50)
+    failed = False
+    print(f"{'route':<48}{'n=5':>6}{'n=50':>6}")
+    for url in small:
+        flag = '' if large[url] <= small[url] else '  <-- grows with rows'
+        failed = failed or bool(flag)
+        print(f"{url:<48}{small[url]:>6}{large[url]:>6}{flag}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+End-to-end route benchmark.
+
+Drives every page in views.py through the Flask test client against a
+seeded database and reports, per route, p50/p95/p99 latency, SQL
+statements per request and peak Python memory per request.
+
+    python benchmarks/routes.py                      # seeds a temporary database
+    python benchmarks/routes.py --db /tmp/big.db     # database made with seed.py
+    python benchmarks/routes.py --requests 200 --only dashboard
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--db', help='existing seeded sqlite file (default: seed a temporary one)')
+    parser.add_argument('--requests', type=int, default=50, help='timed requests per route')
+    parser.add_argument('--memory-requests', type=int, default=5, help='requests per route traced for memory')
+    parser.add_argument('--doctors', type=int, default=100)
+    parser.add_argument('--patients', type=int, default=5000)
+    parser.add_argument('--appointments', type=int, default=50000)
+    parser.add_argument('--only', help='substring filter on route names')
+    return parser.parse_args()
+
+
+args = parse_args()
+if args.db:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.abspath(args.db)
+else:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'routes.db')
+
+#measure the routes themselves, not the admission limits
+os.environ['RATE_LIMIT_ENABLED'] = '0'
+
+from sqlalchemy import func  # noqa: E402
+from app import create_app, init_schema  # noqa: E402
+from models import db, User, Doctor, Patient, Appointment  # noqa: E402
+from queries import QueryCounter  # noqa: E402
+import hashing  # noqa: E402
+import seed  # noqa: E402
+
+app = create_app()
+init_schema(app)
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def pick_subjects():
+    today = date.today()
+    admin = User.query.filter_by(role='admin').first()
+    doctor_id = db.session.query(Appointment.doctor_id).filter(
+        Appointment.date == today, Appointment.doctor_id.isnot(None)
+    ).group_by(Appointment.doctor_id).order_by(func.count().desc()).limit(1).scalar()
+    doctor = db.session.get(Doctor, doctor_id) if doctor_id else Doctor.query.first()
+    patient_id = db.session.query(Appointment.patient_id).group_by(
+        Appointment.patient_id).order_by(func.count().desc()).limit(1).scalar()
+    patient = db.session.get(Patient, patient_id)
+    pending = [a.id for a in Appointment.query.filter_by(doctor_id=doctor.id, status='pending').limit(500)]
+    return {
+        'admin': admin.id, 'admin_email': admin.email,
+        'doctor': doctor.user_id, 'doctor_id': doctor.id,
+        'patient': patient.user_id, 'patient_id': patient.id,
+        'pending': pending,
+    }
+
+
+def build_routes(s):
+    """(name, role, method, request builder taking the iteration number)."""
+    far = date.today() + timedelta(days=3650)
+    month_ago = (date.today() - timedelta(days=30)).isoformat()
+    pending = s['pending'] or [0]
+    get = lambda url: (lambda i: (url, None))  # noqa: E731
+    return [
+        ('login', None, 'POST', lambda i: ('/login', {'email': s['admin_email'], 'password': seed.SEED_PASSWORD})),
+        ('admin dashboard', 'admin', 'GET', get('/admin/dashboard')),
+        ('manage doctors', 'admin', 'GET', get('/admin/manage_doctors')),
+        ('manage patients', 'admin', 'GET', get('/admin/manage_patients')),
+        ('all appointments', 'admin', 'GET', get('/admin/view_all_appointments')),
+        ('all appointments pending', 'admin', 'GET', get('/admin/view_all_appointments?status=pending')),
+        ('admin patient history', 'admin', 'GET', get(f"/admin/view_patient_history?patient_id={s['patient_id']}")),
+        ('export csv (30 days)', 'admin', 'GET', get(
+            f"/admin/export/appointments.csv?date_from={month_ago}&date_to={date.today().isoformat()}")),
+        ('doctor dashboard', 'doctor', 'GET', get('/doctor/dashboard')),
+        ('doctor patient history', 'doctor', 'GET', get(f"/doctor/view_patient_history?patient_id={s['patient_id']}")),
+        ('complete form', 'doctor', 'GET', lambda i: (f"/doctor/complete_appointment?appointment_id={pending[i % len(pending)]}", None)),
+        ('complete submit', 'doctor', 'POST', lambda i: ('/doctor/complete_appointment', {
+            'appointment_id': pending[i % len(pending)], 'status': 'completed', 'notes': 'bench'})),
+        ('patient dashboard', 'patient', 'GET', get('/patient/dashboard')),
+        ('patient history', 'patient', 'GET', get('/patient/appointment_history')),
+        ('booking form', 'patient', 'GET', get('/patient/book_appointment')),
+        ('booking submit', 'patient', 'POST', lambda i: ('/patient/book_appointment', {
+            'doctor_id': s['doctor_id'], 'date': (far + timedelta(days=i // 16)).isoformat(),
+            'time': f'{9 + (i % 16) // 2:02d}:{(i % 2) * 30:02d}', 'reason': 'bench'})),
+        ('patient export ndjson', 'patient', 'GET', get('/patient/export/history.ndjson')),
+        ('available slots', 'patient', 'GET', get(f"/patient/available_slots?doctor_id={s['doctor_id']}&days=14")),
+    ]
+
+
+def client_for(role, subjects):
+    client = app.test_client()
+    if role:
+        with client.session_transaction() as sess:
+            sess['user_id'] = subjects[role]
+            sess['role'] = role
+    return client
+
+
+def run_route(client, method, build, i):
+    url, data = build(i)
+    resp = client.post(url, data=data) if method == 'POST' else client.get(url)
+    #drain streamed bodies so exports are measured end to end
+    resp.get_data()
+    ok = resp.status_code == 200 or (method == 'POST' and resp.status_code == 302)
+    return ok
+
+
+def main():
+    if not args.db:
+        print(f"seeding {args.doctors} doctors, {args.patients} patients, {args.appointments} appointments...",
+              file=sys.stderr)
+        with app.app_context():
+            seed.seed(db.engine, args.doctors, args.patients, args.appointments)
+    with app.app_context():
+        subjects = pick_subjects()
+    routes = build_routes(subjects)
+    if args.only:
+        routes = [r for r in routes if args.only in r[0]]
+
+    print(f"{'route':<26}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'peak KiB':>10}{'errors':>8}")
+    for name, role, method, build in routes:
+        client = client_for(role, subjects)
+        #warm caches/connections once, like a live worker would be
+        run_route(client, method, build, 0)
+        latencies, queries, errors = [], [], 0
+        for i in range(1, args.requests + 1):
+            if role is None:
+                client = client_for(role, subjects)
+            with app.app_context():
+                with QueryCounter(db.engine) as qc:
+                    start = time.perf_counter()
+                    ok = run_route(client, method, build, i)
+                    latencies.append((time.perf_counter() - start) * 1000)
+            queries.append(qc.count)
+            errors += not ok
+        peak = 0
+        tracemalloc.start()
+        for i in range(args.requests + 1, args.requests + 1 + args.memory_requests):
+            if role is None:
+                client = client_for(role, subjects)
+            tracemalloc.reset_peak()
+            run_route(client, method, build, i)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        latencies.sort()
+        print(f"{name:<26}{percentile(latencies, 50):>9.2f}{percentile(latencies, 95):>9.2f}"
+              f"{percentile(latencies, 99):>9.2f}{sum(queries) / len(queries):>9.1f}{peak / 1024:>10.0f}{errors:>8}")
+    hashing.shutdown()
+
+
+if __name__ == '__main__':
+    main()
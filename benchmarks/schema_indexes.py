@@ -0,0 +1,104 @@
+"""
+Before/after timings for the lookup indexes added by migration 2.
+
+Builds a throwaway database at schema version 1, seeds it, times the
+dashboard queries and prints their plans, then applies migration 2 and
+repeats. Later migrations are left out: they measure other things, and
+the random seed data can double-book slots, which migration 3 refuses.
+
+    python benchmarks/schema_indexes.py [--doctors 200] [--patients 20000] [--appointments 200000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import create_engine, text  # noqa: E402
+import migrations  # noqa: E402
+
+TODAY = date(2025, 6, 1)
+
+QUERIES = [
+    ('doctor dashboard', "SELECT * FROM appointments WHERE doctor_id = :doctor AND date = :day ORDER BY time"),
+    ('patient upcoming', "SELECT * FROM appointments WHERE patient_id = :patient AND date >= :day ORDER BY date, time"),
+    ('admin recent', "SELECT * FROM appointments ORDER BY date DESC, time DESC LIMIT 10"),
+    ('slot conflict', "SELECT id FROM appointments WHERE doctor_id = :doctor AND date = :day AND time = '09:00:00.000000'"),
+    ('stale pending', "SELECT count(*) FROM appointments WHERE status = 'pending' AND date < :day"),
+    ('availability', "SELECT * FROM availabilities WHERE doctor_id = :doctor AND date BETWEEN :day AND :until"),
+    ('by specialization', "SELECT id FROM doctors WHERE specialization = 'Cardiology'"),
+]
+SPECIALIZATIONS = ['Cardiology', 'Dermatology', 'Pediatrics', 'Neurology', 'Orthopedics', 'General']
+
+
+def seed(engine, n_doctors, n_patients, n_appointments):
+    rnd = random.Random(42)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO users (id, name, email, password_hash, role, is_active) VALUES (:id, :name, :email, 'x', :role, 1)"
+        ), [{'id': i, 'name': f'User {i}', 'email': f'u{i}@bench', 'role': 'doctor' if i <= n_doctors else 'patient'}
+            for i in range(1, n_doctors + n_patients + 1)])
+        conn.execute(text("INSERT INTO doctors (id, user_id, specialization) VALUES (:id, :id, :spec)"),
+                     [{'id': i, 'spec': rnd.choice(SPECIALIZATIONS)} for i in range(1, n_doctors + 1)])
+        conn.execute(text("INSERT INTO patients (id, user_id) VALUES (:id, :uid)"),
+                     [{'id': i, 'uid': n_doctors + i} for i in range(1, n_patients + 1)])
+        conn.execute(text(
+            "INSERT INTO appointments (patient_id, doctor_id, date, time, status) VALUES (:p, :d, :day, :t, :s)"
+        ), [{'p': rnd.randint(1, n_patients), 'd': rnd.randint(1, n_doctors),
+             'day': (TODAY + timedelta(days=rnd.randint(-365, 60))).isoformat(),
+             't': f'{rnd.randint(8, 17):02d}:{rnd.choice((0, 15, 30, 45)):02d}:00.000000',
+             's': rnd.choice(('pending', 'completed', 'completed', 'cancelled'))}
+            for _ in range(n_appointments)])
+        conn.execute(text(
+            "INSERT INTO availabilities (doctor_id, date, start_time, end_time) VALUES (:d, :day, '09:00:00.000000', '17:00:00.000000')"
+        ), [{'d': d, 'day': (TODAY + timedelta(days=k)).isoformat()} for d in range(1, n_doctors + 1) for k in range(-30, 30)])
+
+
+def run(engine, repeat):
+    params = {'doctor': 7, 'patient': 11, 'day': TODAY.isoformat(), 'until': (TODAY + timedelta(days=14)).isoformat()}
+    results = {}
+    with engine.connect() as conn:
+        for name, sql in QUERIES:
+            plan = '; '.join(row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql), params))
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                conn.execute(text(sql), params).fetchall()
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = (statistics.median(timings), plan)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--doctors', type=int, default=200)
+    parser.add_argument('--patients', type=int, default=20000)
+    parser.add_argument('--appointments', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    engine = create_engine('sqlite:///' + path)
+    migrations.upgrade(engine, target=1)
+    seed(engine, args.doctors, args.patients, args.appointments)
+    before = run(engine, args.repeat)
+    migrations.upgrade(engine, target=2)
+    after = run(engine, args.repeat)
+
+    print(f"schema v1 -> v{migrations.current_version(engine)}, "
+          f"{args.appointments} appointments, median of {args.repeat} runs\n")
+    print(f"{'query':<20}{'before ms':>11}{'after ms':>10}{'speedup':>9}")
+    for name, _ in QUERIES:
+        b, a = before[name][0], after[name][0]
+        print(f"{name:<20}{b:>11.3f}{a:>10.3f}{b / a if a else float('inf'):>8.1f}x")
+    print()
+    for name, _ in QUERIES:
+        print(f"{name}\n  before: {before[name][1]}\n  after:  {after[name][1]}")
+
+
+if __name__ == '__main__':
+    main()
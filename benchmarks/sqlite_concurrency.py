@@ -0,0 +1,113 @@
+"""
+Read/write throughput with several worker processes, default SQLite
+settings versus the configured engine profile (config.SQLITE_PRAGMAS).
+
+Each worker stands in for a gunicorn worker: it opens its own engine and
+runs a mix of dashboard reads and booking inserts for a fixed time.
+
+    python benchmarks/sqlite_concurrency.py [--workers 4] [--seconds 5] [--write-ratio 0.2]
+"""
+import argparse
+import multiprocessing as mp
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.exc import IntegrityError, OperationalError  # noqa: E402
+import config  # noqa: E402
+import engine_profile  # noqa: E402
+import migrations  # noqa: E402
+
+DOCTORS = 50
+PATIENTS = 2000
+TODAY = date(2025, 6, 1)
+
+READ = text("SELECT * FROM appointments WHERE doctor_id = :d AND date = :day ORDER BY time")
+WRITE = text("INSERT INTO appointments (patient_id, doctor_id, date, time, status) "
+             "VALUES (:p, :d, :day, :t, 'pending')")
+
+
+def make_engine(path, profile):
+    engine = create_engine('sqlite:///' + path, **engine_profile.engine_options('sqlite:///' + path))
+    if profile:
+        engine_profile.install(engine, config.SQLITE_PRAGMAS)
+    return engine
+
+
+def prepare(path):
+    engine = create_engine('sqlite:///' + path)
+    migrations.upgrade(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, name, email, password_hash, role, is_active) "
+                          "VALUES (:id, 'u', :email, 'x', 'patient', 1)"),
+                     [{'id': i, 'email': f'u{i}@bench'} for i in range(1, DOCTORS + PATIENTS + 1)])
+        conn.execute(text("INSERT INTO doctors (id, user_id) VALUES (:id, :id)"),
+                     [{'id': i} for i in range(1, DOCTORS + 1)])
+        conn.execute(text("INSERT INTO patients (id, user_id) VALUES (:id, :uid)"),
+                     [{'id': i, 'uid': DOCTORS + i} for i in range(1, PATIENTS + 1)])
+    engine.dispose()
+
+
+def worker(path, profile, seconds, write_ratio, seed, out):
+    rnd = random.Random(seed)
+    engine = make_engine(path, profile)
+    reads = writes = locked = conflicts = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        params = {'d': rnd.randint(1, DOCTORS), 'day': (TODAY + timedelta(days=rnd.randint(0, 30))).isoformat()}
+        try:
+            if rnd.random() < write_ratio:
+                params.update(p=rnd.randint(1, PATIENTS),
+                              t=f'{rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}:00.000000')
+                with engine.begin() as conn:
+                    conn.execute(WRITE, params)
+                writes += 1
+            else:
+                with engine.connect() as conn:
+                    conn.execute(READ, params).fetchall()
+                reads += 1
+        except IntegrityError:
+            conflicts += 1
+        except OperationalError:
+            locked += 1
+    engine.dispose()
+    out.put((reads, writes, locked, conflicts))
+
+
+def run(profile, workers, seconds, write_ratio):
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    prepare(path)
+    out = mp.Queue()
+    procs = [mp.Process(target=worker, args=(path, profile, seconds, write_ratio, i, out)) for i in range(workers)]
+    for p in procs:
+        p.start()
+    totals = [0, 0, 0, 0]
+    for _ in procs:
+        for i, v in enumerate(out.get()):
+            totals[i] += v
+    for p in procs:
+        p.join()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    args = parser.parse_args()
+
+    print(f"{args.workers} workers, {args.seconds:g}s, {args.write_ratio:.0%} writes")
+    print(f"{'settings':<10}{'reads/s':>10}{'writes/s':>10}{'locked':>8}{'conflicts':>10}")
+    for name, profile in (('defaults', False), ('profile', True)):
+        reads, writes, locked, conflicts = run(profile, args.workers, args.seconds, args.write_ratio)
+        print(f"{name:<10}{reads / args.seconds:>10.0f}{writes / args.seconds:>10.0f}{locked:>8}{conflicts:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Worker start-up cost and memory sharing under a preloading server.
+
+Cold start: fresh interpreters import app, call create_app() and serve
+one request; the import, factory, first-request and total wall times are
+reported (median of --runs).
+
+Preload/fork: one process creates the app and serves a warm-up request,
+as `gunicorn --preload` does in its master, then forks --workers
+children which each serve --requests requests. Per worker it reports
+PSS and the private (unshared) memory from /proc/<pid>/smaps_rollup,
+with and without gc.freeze() before the fork (wsgi.py freezes).
+
+    python benchmarks/startup.py [--runs 5] [--workers 4] [--requests 200]
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+COLD = """
+import json, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+application = app.create_app()
+t2 = time.perf_counter()
+application.test_client().get('/')
+t3 = time.perf_counter()
+print(json.dumps({'import': t1 - t0, 'create_app': t2 - t1, 'first_request': t3 - t2}))
+"""
+
+
+def cold_start(runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, '-c', COLD], cwd=ROOT, capture_output=True, text=True, check=True)
+        sample = json.loads(out.stdout.strip().splitlines()[-1])
+        sample['process'] = time.perf_counter() - start
+        samples.append(sample)
+    return {k: statistics.median(s[k] for s in samples) for k in samples[0]}
+
+
+def smaps_rollup(pid):
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return fields
+
+
+def preload_fork(workers, requests, freeze):
+    from app import create_app
+    app = create_app()
+    app.test_client().get('/')
+    if freeze:
+        gc.freeze()
+    children = []
+    for _ in range(workers):
+        r, w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(r)
+            client = app.test_client()
+            for _ in range(requests):
+                client.get('/')
+                client.get('/login')
+            gc.collect()
+            mem = smaps_rollup('self')
+            os.write(w, json.dumps(mem).encode())
+            os.close(w)
+            os._exit(0)
+        os.close(w)
+        children.append((pid, r))
+    results = []
+    for pid, r in children:
+        with os.fdopen(r) as f:
+            results.append(json.loads(f.read()))
+        os.waitpid(pid, 0)
+    if freeze:
+        gc.unfreeze()
+    return {
+        'pss_kb': statistics.median(m['Pss'] for m in results),
+        'private_kb': statistics.median(m['Private_Clean'] + m['Private_Dirty'] for m in results),
+        'shared_kb': statistics.median(m['Shared_Clean'] + m['Shared_Dirty'] for m in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'startup.db'))
+
+    cold = cold_start(args.runs)
+    print(f"cold start (median of {args.runs}):")
+    for key in ('import', 'create_app', 'first_request', 'process'):
+        print(f"  {key:<14}{cold[key] * 1000:>8.1f} ms")
+
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        print("no /proc/self/smaps_rollup here; skipping the preload/fork measurement")
+        return 0
+    print(f"preload + fork, {args.workers} workers x {args.requests * 2} requests (median per worker):")
+    print(f"  {'':<14}{'PSS':>10}{'private':>10}{'shared':>10}")
+    for freeze in (False, True):
+        mem = preload_fork(args.workers, args.requests, freeze)
+        label = 'gc.freeze' if freeze else 'no freeze'
+        print(f"  {label:<14}{mem['pss_kb'] / 1024:>8.1f}MB{mem['private_kb'] / 1024:>8.1f}MB"
+              f"{mem['shared_kb'] / 1024:>8.1f}MB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
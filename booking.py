@@ -0,0 +1,60 @@
+"""
+Appointment booking.
+
+The slot check is the insert itself: ux_appointments_active_slot allows
+one non-cancelled appointment per (doctor_id, date, time), so two
+concurrent bookings cannot both commit and no request has to be
+serialised in Python. A lost race surfaces as SlotTaken; any other
+integrity error (a patient or doctor that no longer exists) is raised
+as is. A busy SQLite writer lock is retried with jittered backoff.
+"""
+import random
+import time as _time
+from sqlalchemy.exc import IntegrityError, OperationalError
+from models import db, Appointment
+
+RETRIES = 4
+BACKOFF = 0.02
+#how SQLite reports a clash on ux_appointments_active_slot (the message
+#names the columns, not the index)
+SLOT_CLASH = 'UNIQUE constraint failed: appointments.doctor_id, appointments.date, appointments.time'
+
+
+class SlotTaken(Exception):
+    """The doctor already has a live appointment at that date & time."""
+
+
+def _is_lock_error(exc):
+    msg = str(exc.orig if hasattr(exc, 'orig') else exc).lower()
+    return 'locked' in msg or 'busy' in msg
+
+
+def _is_slot_clash(exc):
+    return SLOT_CLASH in str(exc.orig if hasattr(exc, 'orig') else exc)
+
+
+def book(patient_id, doctor_id, appt_date, appt_time, reason=None, retries=RETRIES):
+    """Insert a pending appointment, raising SlotTaken if the slot is already held."""
+    for attempt in range(retries + 1):
+        appt = Appointment(
+            patient_id=patient_id,
+            doctor_id=doctor_id,
+            date=appt_date,
+            time=appt_time,
+            reason=reason,
+            status='pending'
+        )
+        db.session.add(appt)
+        try:
+            db.session.commit()
+            return appt
+        except IntegrityError as e:
+            db.session.rollback()
+            if _is_slot_clash(e):
+                raise SlotTaken() from None
+            raise
+        except OperationalError as e:
+            db.session.rollback()
+            if attempt == retries or not _is_lock_error(e):
+                raise
+            _time.sleep(BACKOFF * (2 ** attempt) * (1 + random.random()))
@@ -0,0 +1,155 @@
+"""
+Set-based admin operations for clean-ups such as a clinic closure.
+
+  * deactivate / reactivate many users at once
+  * delete patients together with their appointments (live and archived)
+  * move all of a doctor's future pending appointments to another doctor,
+    or cancel them
+
+Each is an UPDATE/DELETE over at most BULK_BATCH_SIZE rows per
+transaction, so a large clean-up never holds the SQLite write lock for
+long and bookings keep going in between batches. Nothing is loaded into
+the ORM; appointments are deleted ahead of their patients in batches and
+the ON DELETE CASCADE foreign keys catch anything booked meanwhile.
+
+The admin pages call these; the CLI is for scripted clean-ups:
+
+    python bulk.py deactivate 12 13 14         # user ids (reactivate likewise)
+    python bulk.py delete-patients 40 41
+    python bulk.py reassign 7 --to 9           # doctor 7's future appointments
+    python bulk.py cancel 7
+"""
+import argparse
+import sys
+from datetime import date
+from sqlalchemy import bindparam, create_engine, text
+import batching
+import cache
+import config
+import engine_profile
+import events
+import migrations
+import stats
+
+_SET_ACTIVE = text(
+    "UPDATE users SET is_active = :active WHERE id IN :ids AND is_active != :active"
+).bindparams(bindparam('ids', expanding=True))
+_PATIENT_APPOINTMENTS = text(
+    "DELETE FROM appointments WHERE id IN ("
+    "SELECT id FROM appointments WHERE patient_id IN :ids LIMIT :limit) "
+    f"RETURNING {events.CHANGED_COLUMNS}"
+).bindparams(bindparam('ids', expanding=True))
+_PATIENT_ARCHIVE = text(
+    "DELETE FROM appointments_archive WHERE id IN ("
+    "SELECT id FROM appointments_archive WHERE patient_id IN :ids LIMIT :limit)"
+).bindparams(bindparam('ids', expanding=True))
+_PATIENTS = text("DELETE FROM patients WHERE id IN :ids").bindparams(bindparam('ids', expanding=True))
+#a slot the new doctor already has taken stays with the old doctor, so
+#the admin can deal with it by hand
+_REASSIGN = text(
+    "UPDATE appointments SET doctor_id = :to WHERE id IN ("
+    "SELECT a.id FROM appointments a WHERE a.doctor_id = :doctor AND a.status = 'pending' AND a.date >= :today "
+    "AND NOT EXISTS (SELECT 1 FROM appointments b WHERE b.doctor_id = :to AND b.date = a.date "
+    "AND b.time IS a.time AND b.status != 'cancelled') LIMIT :limit) "
+    f"RETURNING {events.CHANGED_COLUMNS}"
+)
+_CANCEL = text(
+    "UPDATE appointments SET status = 'cancelled' WHERE id IN ("
+    "SELECT id FROM appointments WHERE doctor_id = :doctor AND status = 'pending' AND date >= :today LIMIT :limit) "
+    f"RETURNING {events.CHANGED_COLUMNS}"
+)
+_FUTURE = text(
+    "SELECT COUNT(*) FROM appointments WHERE doctor_id = :doctor AND status = 'pending' AND date >= :today"
+)
+
+
+def set_users_active(engine, user_ids, active, batch_size=None):
+    """Deactivate or reactivate users; returns how many changed."""
+    total = 0
+    for ids in batching.chunks(sorted({int(i) for i in user_ids}), batch_size or config.BULK_BATCH_SIZE):
+        with engine.begin() as conn:
+            total += conn.execute(_SET_ACTIVE, {'ids': ids, 'active': bool(active)}).rowcount
+    if total:
+        cache.bump('users')
+    return total
+
+
+def delete_patients(engine, patient_ids, batch_size=None, pause=None):
+    """Delete patients and all their appointments; returns (patients, appointments) deleted."""
+    batch_size = batch_size or config.BULK_BATCH_SIZE
+    pause = config.BULK_PAUSE if pause is None else pause
+    patients = appointments = 0
+    for ids in batching.chunks(sorted({int(i) for i in patient_ids}), batch_size):
+        appointments += batching.batched(engine, _PATIENT_APPOINTMENTS, {'ids': ids}, batch_size, pause,
+                                         events.core_changes(kind='deleted'))
+        appointments += batching.batched(engine, _PATIENT_ARCHIVE, {'ids': ids}, batch_size, pause)
+        with engine.begin() as conn:
+            patients += conn.execute(_PATIENTS, {'ids': ids}).rowcount
+    if patients or appointments:
+        cache.bump('patients', 'appointments', 'appointments_archive')
+        stats.invalidate()
+    return patients, appointments
+
+
+def reassign_future_appointments(engine, doctor_id, to_doctor_id, today=None, batch_size=None, pause=None):
+    """
+    Move doctor_id's pending appointments from today on to to_doctor_id.
+    Returns (moved, left): appointments whose slot the new doctor already
+    has booked are left where they are.
+    """
+    params = {'doctor': doctor_id, 'to': to_doctor_id, 'today': (today or date.today()).isoformat()}
+    #the old doctor's dashboard drops the moved rows
+    moved = batching.batched(engine, _REASSIGN, params, batch_size or config.BULK_BATCH_SIZE,
+                             config.BULK_PAUSE if pause is None else pause,
+                             events.core_changes([f"doctor:{doctor_id}"]))
+    with engine.connect() as conn:
+        left = conn.execute(_FUTURE, params).scalar()
+    if moved:
+        cache.bump('appointments')
+    return moved, left
+
+
+def cancel_future_appointments(engine, doctor_id, today=None, batch_size=None, pause=None):
+    """Cancel doctor_id's pending appointments from today on; returns how many."""
+    n = batching.batched(engine, _CANCEL, {'doctor': doctor_id, 'today': (today or date.today()).isoformat()},
+                         batch_size or config.BULK_BATCH_SIZE, config.BULK_PAUSE if pause is None else pause,
+                         events.core_changes())
+    if n:
+        cache.bump('appointments')
+        stats.invalidate()
+    return n
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk user, patient and appointment clean-ups.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name in ('deactivate', 'reactivate'):
+        sub.add_parser(name, help=f'{name} users').add_argument('user_ids', type=int, nargs='+')
+    sub.add_parser('delete-patients', help='delete patients and their appointments').add_argument(
+        'patient_ids', type=int, nargs='+')
+    reassign = sub.add_parser('reassign', help="move a doctor's future pending appointments")
+    reassign.add_argument('doctor_id', type=int)
+    reassign.add_argument('--to', type=int, required=True, dest='to_doctor_id')
+    sub.add_parser('cancel', help="cancel a doctor's future pending appointments").add_argument(
+        'doctor_id', type=int)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(config.DATABASE_URI)
+    engine_profile.install(engine)
+    migrations.upgrade(engine)
+    if args.command in ('deactivate', 'reactivate'):
+        n = set_users_active(engine, args.user_ids, args.command == 'reactivate')
+        print(f"{n} users {args.command}d")
+    elif args.command == 'delete-patients':
+        patients, appointments = delete_patients(engine, args.patient_ids)
+        print(f"{patients} patients and {appointments} appointments deleted")
+    elif args.command == 'reassign':
+        moved, left = reassign_future_appointments(engine, args.doctor_id, args.to_doctor_id)
+        print(f"{moved} appointments moved, {left} left (slot already taken)")
+    else:
+        print(f"{cancel_future_appointments(engine, args.doctor_id)} appointments cancelled")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
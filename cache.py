@@ -0,0 +1,110 @@
+"""
+In-process caching helpers.
+
+`Cache` is a small thread-safe LRU with an optional TTL. `table_version`
+returns a counter per table that is bumped after every commit that
+inserted, updated or deleted ORM rows of that table, so cached values
+can be keyed on the versions of the tables they were built from and
+never need to be hunted down and invalidated by hand. Writes that
+bypass the ORM (bulk/Core statements) call `bump()` themselves.
+
+Versions are per process: other workers' writes are only picked up when
+an entry's TTL runs out, so anything shared across workers should be
+cached with a TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_MISSING = object()
+
+
+class Cache:
+    def __init__(self, maxsize=None, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            value, expires = item
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+
+    def get_or_set(self, key, factory, ttl=None):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value, ttl)
+        return value
+
+    def invalidate(self, key=_MISSING):
+        with self._lock:
+            if key is _MISSING:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+#--------------
+#Table versions
+#--------------
+_versions = {}
+_versions_lock = threading.Lock()
+
+
+def table_version(*tables):
+    """Current version of each table, as a tuple usable in cache keys."""
+    return tuple(_versions.get(t, 0) for t in tables)
+
+
+def bump(*tables):
+    with _versions_lock:
+        for t in tables:
+            _versions[t] = _versions.get(t, 0) + 1
+
+
+def _tables(objs):
+    return {obj.__table__.name for obj in objs if hasattr(obj, '__table__')}
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_written_tables(session, flush_context):
+    touched = _tables(session.new) | _tables(session.deleted) | _tables(
+        obj for obj in session.dirty if session.is_modified(obj, include_collections=False))
+    if touched:
+        session.info.setdefault('written_tables', set()).update(touched)
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_written_tables(session):
+    touched = session.info.pop('written_tables', None)
+    if touched:
+        bump(*touched)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_written_tables(session):
+    session.info.pop('written_tables', None)
@@ -0,0 +1,123 @@
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INSTANCE_DIR = os.path.join(BASE_DIR, "instance")
+DATABASE_URI = os.environ.get(
+    'DATABASE_URL', "sqlite:///" + os.path.join(INSTANCE_DIR, "hospital.db").replace("\\", "/"))
+
+#flask: set SECRET_KEY in production, the fallback is only fit for local use
+SECRET_KEY = os.environ.get('SECRET_KEY', 'demo@1920')
+DEBUG = os.environ.get('FLASK_DEBUG', '0').lower() in ('1', 'true', 'yes')
+HOST = os.environ.get('HOST', '0.0.0.0')
+PORT = int(os.environ.get('PORT', 5000))
+
+#SQLite connection profile, applied as PRAGMAs on every new connection
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'wal'),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'normal'),
+    #negative = KiB, so -20000 is ~20 MB of page cache per connection
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -20000)),
+    'foreign_keys': os.environ.get('SQLITE_FOREIGN_KEYS', 'on'),
+    'temp_store': os.environ.get('SQLITE_TEMP_STORE', 'memory'),
+}
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 3600))
+
+#password hashing: werkzeug method string, e.g. "scrypt:32768:8:1" or
+#"pbkdf2:sha256:600000"; stored hashes using anything else are upgraded
+#on the next successful login
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+#processes doing the hashing; 0 hashes inline on the request thread
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+
+#instrumentation: /metrics endpoint, for a logged-in admin or a scraper
+#sending "Authorization: Bearer METRICS_TOKEN" (anyone else gets 403),
+#and a log of statements slower than SLOW_QUERY_MS (0 disables it)
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') not in ('0', 'false', 'no')
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 0))
+SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG') or None
+
+#logged-in principal cache (auth.py); the TTL bounds how long another
+#worker process can keep serving a deactivated user
+PRINCIPAL_TTL = int(os.environ.get('PRINCIPAL_TTL', 60))
+PRINCIPAL_CACHE_SIZE = int(os.environ.get('PRINCIPAL_CACHE_SIZE', 10000))
+
+#admin dashboard counts (stats.py); the TTL bounds how long another
+#worker's writes, or bulk SQL that didn't invalidate, go uncounted
+STATS_TTL_SECONDS = int(os.environ.get('STATS_TTL_SECONDS', 300))
+
+#rendered-fragment cache (fragments.py); the TTL bounds how stale another
+#worker process's copy can be
+FRAGMENT_TTL = int(os.environ.get('FRAGMENT_TTL', 300))
+FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE', 256))
+
+#archiving (archive.py): completed/cancelled appointments older than
+#this many days move to appointments_archive, ARCHIVE_BATCH_SIZE rows
+#per transaction
+ARCHIVE_HORIZON_DAYS = int(os.environ.get('ARCHIVE_HORIZON_DAYS', 365))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 1000))
+
+#maintenance sweeper (maintenance.py): past-due pending appointments
+#become no-shows and availability older than AVAILABILITY_KEEP_DAYS is
+#pruned, MAINTENANCE_BATCH_SIZE rows per transaction. Workers run it on
+#a background thread every MAINTENANCE_INTERVAL seconds (0 = off, use
+#the CLI from cron instead), one at a time through MAINTENANCE_LOCK_FILE
+MAINTENANCE_INTERVAL = float(os.environ.get('MAINTENANCE_INTERVAL', 0))
+MAINTENANCE_LOCK_FILE = os.environ.get('MAINTENANCE_LOCK_FILE') or os.path.join(INSTANCE_DIR, 'maintenance.lock')
+MAINTENANCE_BATCH_SIZE = int(os.environ.get('MAINTENANCE_BATCH_SIZE', 500))
+MAINTENANCE_PAUSE = float(os.environ.get('MAINTENANCE_PAUSE', 0.05))
+AVAILABILITY_KEEP_DAYS = int(os.environ.get('AVAILABILITY_KEEP_DAYS', 30))
+
+#expanded recurring-availability windows (slots.py), per doctor and date
+#range; the TTL bounds how long another worker's rule edits go unseen
+RULE_CACHE_TTL = int(os.environ.get('RULE_CACHE_TTL', 300))
+RULE_CACHE_SIZE = int(os.environ.get('RULE_CACHE_SIZE', 4096))
+
+#analytics rollups (analytics.py): dirty days recomputed per transaction
+ANALYTICS_BATCH_DAYS = int(os.environ.get('ANALYTICS_BATCH_DAYS', 31))
+
+#live dashboard events (events.py): 'memory' for a single worker process,
+#'sqlite' to share events between workers through appointment_events
+#(gunicorn.conf.py defaults to it when running several workers),
+#which maintenance.py prunes after EVENT_RETENTION_MINUTES
+EVENT_BROKER = os.environ.get('EVENT_BROKER', 'memory')
+EVENT_POLL_INTERVAL = float(os.environ.get('EVENT_POLL_INTERVAL', 0.5))
+EVENT_QUEUE_SIZE = int(os.environ.get('EVENT_QUEUE_SIZE', 256))
+EVENT_BACKLOG = int(os.environ.get('EVENT_BACKLOG', 1000))
+EVENT_HEARTBEAT = float(os.environ.get('EVENT_HEARTBEAT', 15))
+#how long one stream holds a server thread before the browser reconnects
+EVENT_STREAM_SECONDS = int(os.environ.get('EVENT_STREAM_SECONDS', 300))
+EVENT_RETENTION_MINUTES = int(os.environ.get('EVENT_RETENTION_MINUTES', 60))
+
+#admission control (ratelimit.py). RATE_LIMITS is a comma-separated list
+#of "[METHOD ]endpoint=requests/seconds[/burst]" token buckets, kept per
+#logged-in user or per client IP; CONCURRENCY_LIMITS is "endpoint=n",
+#requests of that endpoint in flight per worker process. 'file' shares
+#the buckets between the workers on one host through RATE_LIMIT_FILE
+#reverse proxies in front of the app that append to X-Forwarded-For; the
+#client address (and so the per-IP rate limit key) is taken that many
+#hops from the right. 0 trusts no header: use it when clients connect directly
+PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 0))
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') not in ('0', 'false', 'no')
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+RATE_LIMIT_FILE = os.environ.get('RATE_LIMIT_FILE') or os.path.join(INSTANCE_DIR, 'ratelimit.db')
+RATE_LIMITS = os.environ.get('RATE_LIMITS', (
+    'POST login=10/60/5, POST register=5/300/3, '
+    'view_all_appointments=60/60/10, admin_view_patient_history=60/60/10, '
+    'doctor_view_patient_history=60/60/10, patient_appointment_history=30/60/10, '
+    'admin_export_appointments=6/60/2, patient_export_history=6/60/2, earliest_slots=60/60/20'
+))
+CONCURRENCY_LIMITS = os.environ.get('CONCURRENCY_LIMITS', (
+    'view_all_appointments=4, admin_export_appointments=2, patient_export_history=2, admin_analytics=2'
+))
+#how long a request may wait for a free slot before it gets a 503
+CONCURRENCY_WAIT_MS = float(os.environ.get('CONCURRENCY_WAIT_MS', 50))
+
+#bulk admin operations (bulk.py): rows per transaction, and the pause
+#between batches that lets queued bookings take the write lock
+BULK_BATCH_SIZE = int(os.environ.get('BULK_BATCH_SIZE', 500))
+BULK_PAUSE = float(os.environ.get('BULK_PAUSE', 0.01))
@@ -1,14 +1,24 @@
-from app import app, db
-from models import User
-
-with app.app_context():
-    email = "admin@example.com"
-    existing = User.query.filter_by(email=email).first()
-    if existing:
-        print("Admin already exists:", existing.email)
-    else:
-        u = User(name="Admin User", email=email, role="admin")
-        u.set_password("admin123")
-        db.session.add(u)
-        db.session.commit()
-        print("Admin created:", email, "password=admin123") 
\ No newline at end of file
+from app import create_app
+from models import db, User
+import hashing
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        email = "admin@example.com"
+        existing = User.query.filter_by(email=email).first()
+        if existing:
+            print("Admin already exists:", existing.email)
+        else:
+            u = User(name="Admin User", email=email, role="admin")
+            u.set_password("admin123")
+            db.session.add(u)
+            db.session.commit()
+            print("Admin created:", email, "password=admin123")
+    hashing.shutdown()
+
+
+#the password hashing pool re-imports this script in its server process
+if __name__ == '__main__':
+    main()
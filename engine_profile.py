@@ -0,0 +1,63 @@
+"""
+Database engine profile.
+
+Pool sizing goes into SQLALCHEMY_ENGINE_OPTIONS; for SQLite every new
+DBAPI connection is also given the PRAGMAs from config.SQLITE_PRAGMAS:
+WAL so readers don't block the writer, a busy timeout instead of an
+immediate "database is locked", relaxed fsync, a larger page cache and
+foreign key enforcement so ON DELETE CASCADE / SET NULL actually run.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+import config
+
+#order matters: journal_mode first, it needs no open transaction
+PRAGMA_ORDER = ('journal_mode', 'busy_timeout', 'synchronous', 'cache_size', 'foreign_keys', 'temp_store')
+
+
+def _is_memory(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(uri=None):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database."""
+    url = make_url(uri or config.DATABASE_URI)
+    if _is_memory(url):
+        return {}
+    return {
+        'pool_size': config.DB_POOL_SIZE,
+        'max_overflow': config.DB_MAX_OVERFLOW,
+        'pool_timeout': config.DB_POOL_TIMEOUT,
+        'pool_recycle': config.DB_POOL_RECYCLE,
+        'pool_pre_ping': False,
+    }
+
+
+def apply_pragmas(dbapi_conn, pragmas):
+    cursor = dbapi_conn.cursor()
+    try:
+        for name in PRAGMA_ORDER:
+            value = pragmas.get(name)
+            if value is not None:
+                cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def install(engine, pragmas=None):
+    """Apply the SQLite PRAGMAs to every connection `engine` opens."""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = config.SQLITE_PRAGMAS if pragmas is None else pragmas
+    if _is_memory(engine.url):
+        #WAL isn't available for in-memory databases
+        pragmas = {k: v for k, v in pragmas.items() if k != 'journal_mode'}
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_conn, connection_record):
+        apply_pragmas(dbapi_conn, pragmas)
+
+
+def init_app(app, db):
+    with app.app_context():
+        install(db.engine, app.config.get('SQLITE_PRAGMAS'))
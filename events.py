@@ -0,0 +1,372 @@
+"""
+Live appointment events for the dashboards (server-sent events).
+
+Every committed change to an Appointment becomes an event
+
+    {"id": 17, "type": "created" | "updated" | "deleted", "appointment": {...}}
+
+addressed to its doctor and patient (and, after a reassignment, to the
+previous ones). ORM writes are picked up by session hooks; the set-based
+Core writes in maintenance.py and bulk.py return the changed rows and
+pass them to core_changes(). /events/appointments streams a doctor's or patient's
+events and the dashboards patch their rows in place instead of being
+reloaded.
+
+EVENT_BROKER picks how events travel:
+
+  memory  in-process fan-out after commit; fine for a single worker
+  sqlite  events are written to appointment_events inside the committing
+          transaction, and one poller thread per worker reads new rows
+          every EVENT_POLL_INTERVAL and fans them out locally, so all
+          workers see every worker's commits
+
+Each subscriber has a bounded queue. One that falls behind is dropped;
+its browser reconnects with Last-Event-ID and the missed events are
+replayed from the broker's backlog (recent events in memory, or the
+appointment_events rows maintenance.py hasn't pruned yet).
+
+Streams end after EVENT_STREAM_SECONDS so a worker thread is never held
+forever; EventSource reconnects on its own. Each open stream holds a
+thread for that long, so a sync worker would be blocked by one
+dashboard: gunicorn.conf.py runs gthread workers, with GUNICORN_THREADS
+sized for the dashboards left open.
+"""
+import json
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import bindparam, event, inspect, text
+from sqlalchemy.orm import Session
+from models import Appointment
+import config
+
+RETRY_MS = 3000
+
+_broker = None
+_broker_lock = threading.Lock()
+
+_PATIENT_NAMES = text(
+    "SELECT p.id, u.name FROM patients p JOIN users u ON u.id = p.user_id WHERE p.id IN :ids"
+).bindparams(bindparam('ids', expanding=True))
+_DOCTOR_NAMES = text(
+    "SELECT d.id, u.name FROM doctors d JOIN users u ON u.id = d.user_id WHERE d.id IN :ids"
+).bindparams(bindparam('ids', expanding=True))
+
+
+class Subscription:
+    def __init__(self, keys, maxsize=None):
+        self.keys = frozenset(keys)
+        self.dropped = False
+        self._queue = queue.Queue(config.EVENT_QUEUE_SIZE if maxsize is None else maxsize)
+
+    def put(self, event):
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            self.dropped = True
+            return False
+
+    def get(self, timeout=None):
+        """Next event, or None if none arrived within `timeout` seconds."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class MemoryBroker:
+    def __init__(self, backlog=None, queue_size=None):
+        self._lock = threading.Lock()
+        self._subs = defaultdict(set)
+        self._backlog = deque(maxlen=backlog or config.EVENT_BACKLOG)
+        self.queue_size = queue_size
+        self._seq = 0
+
+    def subscribe(self, keys, last_id=None):
+        sub = Subscription(keys, self.queue_size)
+        with self._lock:
+            for key in sub.keys:
+                self._subs[key].add(sub)
+            missed = self._missed(sub.keys, last_id) if last_id is not None else []
+        for e in missed:
+            sub.put(e)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            for key in sub.keys:
+                subs = self._subs.get(key)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._subs[key]
+
+    def _missed(self, keys, last_id):
+        return [e for e in self._backlog if e['id'] > last_id and keys.intersection(e['keys'])]
+
+    def record(self, conn, events):
+        """Called from the flush; the memory broker waits for the commit."""
+        return False
+
+    def publish(self, events):
+        #ids, backlog and targets under one lock, so a subscriber joining
+        #meanwhile gets each event either replayed or delivered, not both
+        with self._lock:
+            for e in events:
+                self._seq += 1
+                e['id'] = self._seq
+                self._backlog.append(e)
+            targets = self._targets(events)
+        self._deliver(targets)
+
+    def _targets(self, events):
+        return [(sub, e) for e in events for key in e['keys'] for sub in self._subs.get(key, ())]
+
+    def _deliver(self, targets):
+        for sub, e in targets:
+            if not sub.put(e):
+                self.unsubscribe(sub)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len({sub for subs in self._subs.values() for sub in subs})
+
+
+class SQLiteBroker(MemoryBroker):
+    """Cross-process broker over the appointment_events table."""
+
+    def __init__(self, engine, interval=None, backlog=None, queue_size=None):
+        super().__init__(backlog, queue_size)
+        self.engine = engine
+        self.interval = config.EVENT_POLL_INTERVAL if interval is None else interval
+        self._last_id = None
+        self._poller = None
+
+    def record(self, conn, events):
+        _write_outbox(conn, events)
+        return True
+
+    def publish(self, events):
+        #already in the table; the poller delivers them
+        pass
+
+    def subscribe(self, keys, last_id=None):
+        self._start()
+        return super().subscribe(keys, last_id)
+
+    def _missed(self, keys, last_id):
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(
+                "SELECT id, keys, payload FROM appointment_events WHERE id > :last AND id <= :upto "
+                "ORDER BY id LIMIT :limit"
+            ), {'last': last_id, 'upto': self._last_id, 'limit': self._backlog.maxlen}).fetchall()
+        return [e for e in map(_from_row, rows) if keys.intersection(e['keys'])]
+
+    def _start(self):
+        with self._lock:
+            if self._poller is not None:
+                return
+            with self.engine.connect() as conn:
+                self._last_id = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM appointment_events")).scalar()
+            self._poller = threading.Thread(target=self._poll, name='appointment-events', daemon=True)
+            self._poller.start()
+
+    def _poll(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                with self.engine.connect() as conn:
+                    rows = conn.execute(text(
+                        "SELECT id, keys, payload FROM appointment_events WHERE id > :last ORDER BY id LIMIT 500"
+                    ), {'last': self._last_id}).fetchall()
+            except Exception:
+                continue
+            if rows:
+                events = [_from_row(row) for row in rows]
+                with self._lock:
+                    self._last_id = rows[-1][0]
+                    targets = self._targets(events)
+                self._deliver(targets)
+
+
+def _write_outbox(conn, events):
+    now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+    conn.execute(text(
+        "INSERT INTO appointment_events (keys, payload, created_at) VALUES (:keys, :payload, :now)"
+    ), [{'keys': ' '.join(e['keys']), 'payload': json.dumps(_public(e)), 'now': now} for e in events])
+
+
+def _public(e):
+    return {'type': e['type'], 'appointment': e['appointment']}
+
+
+def _from_row(row):
+    id_, keys, payload = row
+    e = json.loads(payload)
+    e['id'] = id_
+    e['keys'] = keys.split()
+    return e
+
+
+def broker():
+    return _broker
+
+
+def init_app(app, db):
+    global _broker
+    settings = app.config
+    with _broker_lock:
+        if _broker is None:
+            if settings['EVENT_BROKER'] == 'sqlite':
+                with app.app_context():
+                    _broker = SQLiteBroker(db.engine, settings['EVENT_POLL_INTERVAL'],
+                                           settings['EVENT_BACKLOG'], settings['EVENT_QUEUE_SIZE'])
+            else:
+                _broker = MemoryBroker(settings['EVENT_BACKLOG'], settings['EVENT_QUEUE_SIZE'])
+
+
+#-----------------
+#Collecting events
+#-----------------
+def _value(state, attr):
+    hist = state.attrs[attr].history
+    if hist.deleted and hist.deleted[0] is not None:
+        return hist.deleted[0]
+    return None
+
+
+def _event_for(kind, obj):
+    state = inspect(obj)
+    values = state.dict
+    t = values.get('time')
+    day = values.get('date')
+    appt = {
+        'id': values.get('id'),
+        'doctor_id': values.get('doctor_id'),
+        'patient_id': values.get('patient_id'),
+        'date': day.isoformat() if day else None,
+        'time': t.strftime('%H:%M') if t else None,
+        'status': values.get('status'),
+        'reason': values.get('reason'),
+    }
+    keys = {f"doctor:{appt['doctor_id']}", f"patient:{appt['patient_id']}"}
+    if kind == 'updated':
+        #a reassigned appointment also leaves the previous owner's view
+        for attr in ('doctor_id', 'patient_id'):
+            old = _value(state, attr)
+            if old is not None:
+                keys.add(f"{attr[:-3]}:{old}")
+    keys.discard('doctor:None')
+    keys.discard('patient:None')
+    return {'type': kind, 'appointment': appt, 'keys': sorted(keys)}
+
+
+def _add_names(conn, events):
+    patient_ids = {e['appointment']['patient_id'] for e in events if e['appointment']['patient_id']}
+    doctor_ids = {e['appointment']['doctor_id'] for e in events if e['appointment']['doctor_id']}
+    patients = dict(conn.execute(_PATIENT_NAMES, {'ids': list(patient_ids)}).fetchall()) if patient_ids else {}
+    doctors = dict(conn.execute(_DOCTOR_NAMES, {'ids': list(doctor_ids)}).fetchall()) if doctor_ids else {}
+    for e in events:
+        e['appointment']['patient_name'] = patients.get(e['appointment']['patient_id'])
+        e['appointment']['doctor_name'] = doctors.get(e['appointment']['doctor_id'])
+
+
+#Core writes (maintenance.py, bulk.py) bypass the session hooks; they
+#return these columns and hand the rows to core_changes()
+CHANGED_COLUMNS = 'id, patient_id, doctor_id, date, time, status, reason'
+
+
+def _row_event(kind, row, extra_keys):
+    id_, patient_id, doctor_id, day, t, status, reason = row
+    appt = {
+        'id': id_,
+        'doctor_id': doctor_id,
+        'patient_id': patient_id,
+        'date': str(day)[:10],
+        'time': str(t)[:5] if t else None,
+        'status': status,
+        'reason': reason,
+    }
+    keys = {f"patient:{patient_id}", *extra_keys}
+    if doctor_id is not None:
+        keys.add(f"doctor:{doctor_id}")
+    return {'type': kind, 'appointment': appt, 'keys': sorted(keys)}
+
+
+def core_changes(extra_keys=(), kind='updated'):
+    """
+    on_rows callback for batching.batched() over an UPDATE/DELETE ...
+    RETURNING CHANGED_COLUMNS: each row becomes a `kind` event, also
+    addressed to `extra_keys` (e.g. the doctor appointments were moved
+    away from).
+    """
+    def on_rows(conn, rows):
+        events = [_row_event(kind, row, extra_keys) for row in rows]
+        if _broker is None:
+            #a CLI run: only the sqlite outbox reaches the app's workers
+            if config.EVENT_BROKER == 'sqlite':
+                _add_names(conn, events)
+                _write_outbox(conn, events)
+            return None
+        _add_names(conn, events)
+        if _broker.record(conn, events):
+            return None
+        return lambda: _broker.publish(events)
+    return on_rows
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_events(session, flush_context):
+    if _broker is None:
+        return
+    events = [_event_for('created', obj) for obj in session.new if isinstance(obj, Appointment)]
+    events += [_event_for('updated', obj) for obj in session.dirty
+               if isinstance(obj, Appointment) and session.is_modified(obj, include_collections=False)]
+    events += [_event_for('deleted', obj) for obj in session.deleted if isinstance(obj, Appointment)]
+    events = [e for e in events if e['keys']]
+    if not events:
+        return
+    conn = session.connection()
+    _add_names(conn, events)
+    if not _broker.record(conn, events):
+        session.info.setdefault('appointment_events', []).extend(events)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_events(session):
+    events = session.info.pop('appointment_events', None)
+    if events and _broker is not None:
+        _broker.publish(events)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_events(session):
+    session.info.pop('appointment_events', None)
+
+
+#---------
+#Streaming
+#---------
+def format_event(e):
+    return f"id: {e['id']}\nevent: appointment\ndata: {json.dumps(_public(e))}\n\n"
+
+
+def stream(key, last_id=None):
+    """SSE body for one subscriber key ('doctor:<id>' / 'patient:<id>')."""
+    sub = _broker.subscribe({key}, last_id)
+    #runs under stream_with_context, so the app's settings are at hand
+    settings = current_app.config
+    deadline = time.monotonic() + settings['EVENT_STREAM_SECONDS']
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while not sub.dropped and time.monotonic() < deadline:
+            e = sub.get(timeout=settings['EVENT_HEARTBEAT'])
+            #a comment line keeps proxies from timing the stream out and
+            #surfaces a gone client on the next write
+            yield format_event(e) if e is not None else ": ping\n\n"
+    finally:
+        _broker.unsubscribe(sub)
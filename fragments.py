@@ -0,0 +1,52 @@
+"""
+Rendered-fragment cache for the doctor directory.
+
+The doctor <select> on the booking and appointment pages and the
+manage_doctors table are rendered from partial templates and cached as
+HTML in a bounded LRU. Keys include the versions of the doctors and
+users tables (cache.table_version), so adding, editing or deactivating a
+doctor changes the key and the next view re-renders; a warm booking page
+doesn't touch the doctors table at all. The TTL covers writes made by
+other worker processes.
+
+Cached partials must only depend on what goes into their key, never on
+session or the logged-in user.
+"""
+from flask import render_template, request
+from markupsafe import Markup
+import cache
+import config
+import queries
+
+DOCTOR_TABLES = ('doctors', 'users')
+
+_fragments = cache.Cache(maxsize=config.FRAGMENT_CACHE_SIZE, ttl=config.FRAGMENT_TTL)
+
+
+def cached(name, tables, key, render):
+    """HTML from render(), cached under (name, key, versions of tables)."""
+    return Markup(_fragments.get_or_set((name, key, cache.table_version(*tables)), render))
+
+
+def doctor_options(selected=None, detailed=False):
+    """<option> elements for every doctor, `selected` preselected."""
+    return cached('doctor_options', DOCTOR_TABLES, (selected, detailed), lambda: render_template(
+        '_doctor_options.html', doctors=queries.all_doctors(), selected=selected, detailed=detailed))
+
+
+def specialization_options(selected=None):
+    """<option> elements for every specialization in use."""
+    return cached('specialization_options', DOCTOR_TABLES, selected, lambda: render_template(
+        '_specialization_options.html', specializations=queries.specializations(), selected=selected))
+
+
+def doctor_table():
+    """The manage_doctors table and pager for the current request's filter/cursor."""
+    args = request.args
+    key = tuple(sorted(args.items(multi=True)))
+
+    def render():
+        page = queries.doctors_page(args.get('specialization', '').strip() or None,
+                                    args.get('cursor'), args.get('dir', 'next'))
+        return render_template('_doctor_table.html', doctors=page.items, page=page)
+    return cached('doctor_table', DOCTOR_TABLES, key, render)
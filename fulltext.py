@@ -0,0 +1,111 @@
+"""
+Full-text search over patients and appointments.
+
+Backed by FTS5 tables kept in sync by triggers: patient_search (user
+name and email, patient contact/address/notes), appointment_search
+(appointment reason/notes) and archive_search (the same for archived
+appointments, which keep their ids). Results are ranked by bm25 with the
+name and email weighted highest, and paginated with a keyset cursor on
+(rank, id), so each page is one MATCH query plus one query per table
+loading the rows it shows.
+
+User input never reaches FTS5 syntax: every word becomes a quoted
+prefix term, and all terms must match.
+"""
+import re
+from sqlalchemy import text
+from models import db, Patient, Appointment, ArchivedAppointment
+import queries
+
+#bm25 column weights, in table column order
+PATIENT_WEIGHTS = (10.0, 5.0, 2.0, 1.0, 1.0)
+APPOINTMENT_WEIGHTS = (2.0, 1.0)
+KINDS = ('patients', 'appointments')
+
+SEARCH_KEYSET = queries.Keyset(columns=None, row_key=lambda r: (r[1], r[0]), parsers=(float, int))
+
+
+def match_expression(q):
+    """'jo smi@x' -> '"jo"* "smi"* "x"*', or None when there is nothing to search for."""
+    terms = re.findall(r'\w+', q or '')
+    if not terms:
+        return None
+    return ' '.join(f'"{t}"*' for t in terms[:16])
+
+
+def _matches(table, weights, extra_join='', extra_where=''):
+    """SELECT of (id, rank) for the rows of one FTS table matching :match."""
+    return (f"SELECT {table}.rowid AS id, bm25({table}, {', '.join(map(str, weights))}) AS rank "
+            f"FROM {table} {extra_join} WHERE {table} MATCH :match {extra_where}")
+
+
+def _ranked_ids(inner, match, cursor, direction, per_page, params=None):
+    """One page of (id, rank) from the `inner` _matches() query (or a UNION ALL of them), best first."""
+    values = SEARCH_KEYSET.decode(cursor) if cursor else None
+    backwards = direction == 'prev' and values is not None
+    sql = f"SELECT id, rank FROM ({inner})"
+    binds = dict(params or {}, match=match, limit=per_page + 1)
+    if values is not None:
+        sql += " WHERE (rank, id) < (:rank, :id)" if backwards else " WHERE (rank, id) > (:rank, :id)"
+        binds.update(rank=values[0], id=values[1])
+    sql += " ORDER BY rank DESC, id DESC" if backwards else " ORDER BY rank, id"
+    rows = db.session.execute(text(sql + " LIMIT :limit"), binds).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+    if not rows:
+        return rows, None, None
+    has_next = True if backwards else has_more
+    has_prev = has_more if backwards else values is not None
+    return (rows, SEARCH_KEYSET.encode(rows[-1]) if has_next else None,
+            SEARCH_KEYSET.encode(rows[0]) if has_prev else None)
+
+
+def _page(rows, next_cursor, prev_cursor, load):
+    ids = [r[0] for r in rows]
+    found = {obj.id: obj for obj in load(ids)} if ids else {}
+    #rows deleted between the two queries just drop out
+    return queries.Page([found[i] for i in ids if i in found], next_cursor, prev_cursor)
+
+
+def search_patients(q, cursor=None, direction='next', per_page=queries.PAGE_SIZE):
+    match = match_expression(q)
+    if match is None:
+        return queries.Page([])
+    rows, next_cursor, prev_cursor = _ranked_ids(
+        _matches('patient_search', PATIENT_WEIGHTS), match, cursor, direction, per_page)
+    return _page(rows, next_cursor, prev_cursor,
+                 lambda ids: queries.patients_query().filter(Patient.id.in_(ids)))
+
+
+def search_appointments(q, doctor_id=None, patient_id=None, cursor=None, direction='next',
+                        per_page=queries.PAGE_SIZE):
+    """
+    Live and archived appointments whose reason/notes match, optionally
+    limited to one doctor's or patient's.
+    """
+    match = match_expression(q)
+    if match is None:
+        return queries.Page([])
+    where, params = '', {}
+    if doctor_id is not None:
+        where += " AND a.doctor_id = :doctor_id"
+        params['doctor_id'] = doctor_id
+    if patient_id is not None:
+        where += " AND a.patient_id = :patient_id"
+        params['patient_id'] = patient_id
+    arms = []
+    for table, content in (('appointment_search', 'appointments'), ('archive_search', 'appointments_archive')):
+        join = f"JOIN {content} a ON a.id = {table}.rowid" if where else ''
+        arms.append(_matches(table, APPOINTMENT_WEIGHTS, join, where))
+    rows, next_cursor, prev_cursor = _ranked_ids(
+        ' UNION ALL '.join(arms), match, cursor, direction, per_page, params)
+
+    def load(ids):
+        live = queries.appointments_query().filter(Appointment.id.in_(ids)).all()
+        missing = set(ids).difference(a.id for a in live)
+        if not missing:
+            return live
+        return live + queries.archived_appointments_query().filter(ArchivedAppointment.id.in_(missing)).all()
+    return _page(rows, next_cursor, prev_cursor, load)
@@ -0,0 +1,51 @@
+"""
+gunicorn settings, picked up automatically when gunicorn is started from
+this directory:
+
+    gunicorn wsgi:app
+
+The dashboards keep an /events/appointments stream open for up to
+EVENT_STREAM_SECONDS, which ties up whatever serves it for that long. A
+sync worker would be one request per process, so each worker runs a
+thread pool instead and an open stream costs one thread. Size
+GUNICORN_THREADS above the dashboards a worker is expected to hold open,
+plus headroom for ordinary requests; or set EVENT_STREAM_SECONDS lower
+so streams hand their thread back sooner (browsers reconnect on their
+own).
+
+With more than one worker, events have to travel through the database to
+reach streams held by the other workers, so EVENT_BROKER defaults to
+'sqlite' here and a worker refuses to boot with the 'memory' broker.
+"""
+import os
+
+#the app is built once in the master and forked, see wsgi.py
+preload_app = True
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', 5000)}"
+
+if workers > 1:
+    #read by config.py when the app is loaded, which is after this file
+    os.environ.setdefault('EVENT_BROKER', 'sqlite')
+
+
+def post_fork(server, worker):
+    #the sweeper opens database connections, so it starts in each worker
+    #rather than in the preloaded master; MAINTENANCE_LOCK_FILE keeps it
+    #to one sweeping worker at a time
+    import maintenance
+    import wsgi
+    #also catches -w on the command line and FLASK_EVENT_BROKER; a worker
+    #failing to boot stops gunicorn
+    if server.cfg.workers > 1 and wsgi.app.config['EVENT_BROKER'] == 'memory':
+        raise RuntimeError("EVENT_BROKER=memory only reaches streams in the publishing worker; "
+                           "use EVENT_BROKER=sqlite with more than one worker")
+    maintenance.start(wsgi.app)
+
+
+def worker_exit(server, worker):
+    #stop this worker's password hashing processes with it
+    import hashing
+    hashing.shutdown()
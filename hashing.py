@@ -0,0 +1,97 @@
+"""
+Password hashing service.
+
+Hashing is the most CPU-expensive thing a request does, so it runs in a
+bounded process pool: the request thread just waits on the result (and
+releases the GIL while it does), letting the worker's other threads keep
+serving. Method and cost come from config.PASSWORD_HASH_METHOD;
+needs_rehash() tells login when a stored hash predates the current
+setting.
+
+The pool's processes come from a forkserver rather than a plain fork:
+they are started lazily from request threads, and forking a threaded
+process can copy a lock some other thread was holding. The forkserver
+imports the main script once (as multiprocessing does), so scripts that
+hash passwords keep their work under `if __name__ == '__main__'`.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from werkzeug.security import generate_password_hash, check_password_hash
+import config
+
+#queued jobs allowed per pool process before callers block
+QUEUE_PER_WORKER = 4
+
+_pool = None
+_pool_pid = None
+_slots = None
+_lock = threading.Lock()
+
+
+def _get_pool():
+    """The pool for this process, rebuilt after a fork (e.g. gunicorn --preload)."""
+    global _pool, _pool_pid, _slots
+    if config.PASSWORD_HASH_WORKERS <= 0:
+        return None
+    with _lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=config.PASSWORD_HASH_WORKERS,
+                                        mp_context=multiprocessing.get_context('forkserver'))
+            _pool_pid = os.getpid()
+            _slots = threading.BoundedSemaphore(config.PASSWORD_HASH_WORKERS * QUEUE_PER_WORKER)
+        return _pool
+
+
+def _run(fn, *args):
+    global _pool
+    pool = _get_pool()
+    if pool is None:
+        return fn(*args)
+    with _slots:
+        try:
+            return pool.submit(fn, *args).result()
+        except BrokenProcessPool:
+            with _lock:
+                _pool = None
+            return fn(*args)
+
+
+def hash_password(password, method=None):
+    return _run(generate_password_hash, password, method or config.PASSWORD_HASH_METHOD)
+
+
+def verify_password(pwhash, password):
+    return _run(check_password_hash, pwhash, password)
+
+
+def hash_many(passwords, method=None):
+    """Hash a batch across the whole pool, preserving order."""
+    method = method or config.PASSWORD_HASH_METHOD
+    pool = _get_pool()
+    if pool is None:
+        return [generate_password_hash(p, method) for p in passwords]
+    return list(pool.map(generate_password_hash, passwords, [method] * len(passwords), chunksize=16))
+
+
+@lru_cache(maxsize=8)
+def _method_prefix(method):
+    #werkzeug fills in default cost parameters, so hash once to learn them
+    return generate_password_hash('', method).split('$', 1)[0]
+
+
+def needs_rehash(pwhash, method=None):
+    if not pwhash or '$' not in pwhash:
+        return True
+    return pwhash.split('$', 1)[0] != _method_prefix(method or config.PASSWORD_HASH_METHOD)
+
+
+def shutdown():
+    global _pool
+    with _lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
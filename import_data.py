@@ -0,0 +1,275 @@
+"""
+Bulk import of patients, doctors and appointments from CSV or JSONL.
+
+    python import_data.py patients patients.csv
+    python import_data.py doctors doctors.jsonl --batch 2000
+    python import_data.py appointments appointments.csv
+
+Rows are streamed and validated with the same rules as the form routes
+(validation.py); bad rows are reported with their line number and
+skipped. Each batch is checked for existing emails with one query and
+inserted with executemany in a single transaction. Explicit passwords
+are hashed across the hashing pool; rows without one get the route's
+default password, hashed once per import since it is the same
+well-known value for all of them.
+
+Columns:
+  patients      name, email, [password], [age], [gender], [contact], [address], [notes]
+  doctors       name, email, [password], [specialization], [contact]
+  appointments  patient_email, doctor_email, date, [time], [reason], [status], [notes]
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from datetime import datetime
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from models import db, User, Patient, Doctor, Appointment
+import batching
+import cache
+import hashing
+import queries
+import stats
+import validation
+
+BATCH_SIZE = 5000
+DEFAULT_PASSWORDS = {'patients': 'patient123', 'doctors': 'changeme123'}
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_rows(path):
+    """
+    Yield (line_no, dict) from a .csv or .jsonl/.ndjson file without
+    loading it all; a line that isn't a JSON object yields a RowError in
+    place of the dict so it is reported like any other bad row.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith(('.jsonl', '.ndjson')):
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield line_no, RowError(f'invalid JSON: {e}')
+                    continue
+                yield line_no, row if isinstance(row, dict) else RowError('expected a JSON object')
+        else:
+            #line 1 is the header
+            for line_no, row in enumerate(csv.DictReader(f), 2):
+                yield line_no, row
+
+
+#----------
+#Validation
+#----------
+def _text(row, key):
+    value = row.get(key)
+    return validation.optional(str(value)) if value is not None else None
+
+
+def validate_person(row):
+    name = _text(row, 'name')
+    email = validation.normalize_email(row.get('email'))
+    if not name or not email:
+        raise RowError('name and email are required')
+    return name, email
+
+
+def validate_patient(row):
+    name, email = validate_person(row)
+    return {
+        'name': name, 'email': email, 'password': _text(row, 'password'),
+        'age': validation.parse_age(str(row.get('age') or '')),
+        'gender': _text(row, 'gender'), 'contact': _text(row, 'contact'),
+        'address': _text(row, 'address'), 'notes': _text(row, 'notes'),
+    }
+
+
+def validate_doctor(row):
+    name, email = validate_person(row)
+    return {
+        'name': name, 'email': email, 'password': _text(row, 'password'),
+        'specialization': _text(row, 'specialization'), 'contact': _text(row, 'contact'),
+    }
+
+
+def validate_appointment(row):
+    patient_email = validation.normalize_email(row.get('patient_email'))
+    doctor_email = validation.normalize_email(row.get('doctor_email'))
+    if not patient_email or not doctor_email:
+        raise RowError('patient_email and doctor_email are required')
+    try:
+        appt_date = validation.parse_date(row.get('date'))
+    except ValueError:
+        raise RowError('invalid date, use YYYY-MM-DD')
+    appt_time = None
+    if _text(row, 'time'):
+        try:
+            appt_time = validation.parse_time(row.get('time'))
+        except ValueError:
+            raise RowError('invalid time, use HH:MM')
+    status = (_text(row, 'status') or 'pending').lower()
+    if status not in queries.APPOINTMENT_STATUSES:
+        raise RowError(f'unknown status {status!r}')
+    return {
+        'patient_email': patient_email, 'doctor_email': doctor_email,
+        'date': appt_date, 'time': appt_time, 'status': status,
+        'reason': _text(row, 'reason'), 'notes': _text(row, 'notes'),
+    }
+
+
+#--------
+#Importer
+#--------
+class Importer:
+    def __init__(self, kind, batch_size=BATCH_SIZE, dry_run=False, out=sys.stderr):
+        self.kind = kind
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.out = out
+        self.inserted = 0
+        self.skipped = 0
+        self._seen_emails = set()
+        self._default_hash = None
+
+    def reject(self, line_no, reason):
+        self.skipped += 1
+        print(f"line {line_no}: {reason}", file=self.out)
+
+    def run(self, rows):
+        validate = {'patients': validate_patient, 'doctors': validate_doctor,
+                    'appointments': validate_appointment}[self.kind]
+        for batch in batching.chunks(rows, self.batch_size):
+            valid = []
+            for line_no, row in batch:
+                if isinstance(row, RowError):
+                    self.reject(line_no, row)
+                    continue
+                try:
+                    valid.append((line_no, validate(row)))
+                except RowError as e:
+                    self.reject(line_no, e)
+            if valid:
+                if self.kind == 'appointments':
+                    self._insert_appointments(valid)
+                else:
+                    self._insert_people(valid)
+        if not self.dry_run:
+            cache.bump('users', 'patients', 'doctors', 'appointments')
+            stats.invalidate()
+        return self.inserted, self.skipped
+
+    def _passwords(self, records):
+        explicit = [r['password'] for r in records if r['password']]
+        hashed = iter(hashing.hash_many(explicit)) if explicit else iter(())
+        if self._default_hash is None and any(not r['password'] for r in records):
+            self._default_hash = hashing.hash_password(DEFAULT_PASSWORDS[self.kind])
+        return [next(hashed) if r['password'] else self._default_hash for r in records]
+
+    def _insert_people(self, valid):
+        emails = [r['email'] for _, r in valid]
+        taken = set(db.session.execute(select(User.email).where(User.email.in_(emails))).scalars())
+        records = []
+        for line_no, r in valid:
+            if r['email'] in taken or r['email'] in self._seen_emails:
+                self.reject(line_no, f"email {r['email']} already exists")
+                continue
+            self._seen_emails.add(r['email'])
+            records.append(r)
+        if not records or self.dry_run:
+            return
+        role = 'patient' if self.kind == 'patients' else 'doctor'
+        now = datetime.utcnow()
+        hashes = self._passwords(records)
+        db.session.execute(insert(User), [
+            {'name': r['name'], 'email': r['email'], 'password_hash': h, 'role': role,
+             'created_at': now, 'is_active': True}
+            for r, h in zip(records, hashes)
+        ])
+        ids = dict(db.session.execute(
+            select(User.email, User.id).where(User.email.in_([r['email'] for r in records]))
+        ).all())
+        if self.kind == 'patients':
+            db.session.execute(insert(Patient), [
+                {'user_id': ids[r['email']], 'age': r['age'], 'gender': r['gender'],
+                 'contact': r['contact'], 'address': r['address'], 'notes': r['notes']}
+                for r in records
+            ])
+        else:
+            db.session.execute(insert(Doctor), [
+                {'user_id': ids[r['email']], 'specialization': r['specialization'], 'contact': r['contact']}
+                for r in records
+            ])
+        db.session.commit()
+        self.inserted += len(records)
+
+    def _lookup(self, model, emails):
+        return dict(db.session.execute(
+            select(User.email, model.id).join(model, model.user_id == User.id).where(User.email.in_(emails))
+        ).all())
+
+    def _insert_appointments(self, valid):
+        patients = self._lookup(Patient, {r['patient_email'] for _, r in valid})
+        doctors = self._lookup(Doctor, {r['doctor_email'] for _, r in valid})
+        now = datetime.utcnow()
+        records = []
+        for line_no, r in valid:
+            if r['patient_email'] not in patients:
+                self.reject(line_no, f"no patient with email {r['patient_email']}")
+            elif r['doctor_email'] not in doctors:
+                self.reject(line_no, f"no doctor with email {r['doctor_email']}")
+            else:
+                records.append((line_no, {
+                    'patient_id': patients[r['patient_email']], 'doctor_id': doctors[r['doctor_email']],
+                    'date': r['date'], 'time': r['time'], 'status': r['status'],
+                    'reason': r['reason'], 'notes': r['notes'], 'created_at': now,
+                }))
+        if not records or self.dry_run:
+            return
+        try:
+            db.session.execute(insert(Appointment), [rec for _, rec in records])
+            db.session.commit()
+            self.inserted += len(records)
+        except IntegrityError:
+            #a double-booked slot somewhere in the batch: redo it row by row
+            #so only the clashing rows are dropped
+            db.session.rollback()
+            for line_no, rec in records:
+                try:
+                    with db.session.begin_nested():
+                        db.session.execute(insert(Appointment), rec)
+                    self.inserted += 1
+                except IntegrityError:
+                    self.reject(line_no, "doctor already has an appointment in that slot")
+            db.session.commit()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import patients, doctors or appointments.")
+    parser.add_argument('kind', choices=('patients', 'doctors', 'appointments'))
+    parser.add_argument('path', help='.csv, .jsonl or .ndjson file')
+    parser.add_argument('--batch', type=int, default=BATCH_SIZE, help='rows per transaction')
+    parser.add_argument('--dry-run', action='store_true', help='validate only, insert nothing')
+    args = parser.parse_args(argv)
+
+    from app import create_app
+    app = create_app()
+    rows = read_rows(args.path)
+    start = time.perf_counter()
+    with app.app_context():
+        importer = Importer(args.kind, args.batch, args.dry_run)
+        inserted, skipped = importer.run(rows)
+    elapsed = time.perf_counter() - start
+    print(f"{args.kind}: {inserted} inserted, {skipped} skipped in {elapsed:.1f}s")
+    hashing.shutdown()
+    return 0 if not skipped else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
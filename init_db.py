@@ -1,9 +1,4 @@
-import os
-from app import app
-from models import db
+from app import create_app, init_schema
+import config
 
-os.makedirs("instance", exist_ok=True)
-
-with app.app_context():
-    db.create_all()
-    print("Database tables created in instance/hospital.db")
\ No newline at end of file
+print(f"Database schema at version {init_schema(create_app())} in {config.DATABASE_URI}")
@@ -0,0 +1,254 @@
+"""
+Per-request performance instrumentation.
+
+For every request this records wall time, the number and total time of
+SQL statements (engine cursor events) and template render time (Flask's
+template signals), keyed by endpoint. The numbers go out two ways:
+
+  * a Server-Timing header on each response, readable in the browser
+    devtools network tab:  app;dur=12.1, db;dur=3.4;desc="2 queries", tpl;dur=1.9
+  * a Prometheus text endpoint at /metrics with a request counter and
+    histograms for request time, SQL time, SQL statements per request
+    and template time; it names routes and timings, so only a logged-in
+    admin or a request bearing METRICS_TOKEN may read it
+
+Statements slower than SLOW_QUERY_MS are logged to the
+"hospital.slow_query" logger with the endpoint and path that issued
+them (and appended to SLOW_QUERY_LOG if set).
+
+Metrics live in process memory, so with several worker processes each
+one reports its own series.
+"""
+import hmac
+import logging
+import os
+import threading
+import time
+from functools import partial
+from flask import (g, has_request_context, request, Response, abort, before_render_template,
+                   current_app, template_rendered)
+from sqlalchemy import event
+import auth
+import config
+
+slow_log = logging.getLogger('hospital.slow_query')
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_str(names, values):
+    return ','.join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+
+
+class Counter:
+    def __init__(self, name, help, labels):
+        self.name, self.help, self.labels = name, help, labels
+        self.values = {}
+
+    def inc(self, key, amount=1):
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for key, value in sorted(self.values.items()):
+            yield f"{self.name}{{{_label_str(self.labels, key)}}} {value}"
+
+
+class Histogram:
+    def __init__(self, name, help, labels, buckets):
+        self.name, self.help, self.labels = name, help, labels
+        self.buckets = tuple(buckets)
+        #key -> [per-bucket counts (+Inf last), sum, count]
+        self.values = {}
+
+    def observe(self, key, value):
+        entry = self.values.get(key)
+        if entry is None:
+            entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        entry[0][i] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for key, (counts, total, n) in sorted(self.values.items()):
+            labels = _label_str(self.labels, key)
+            running = 0
+            for bound, c in zip(self.buckets + ('+Inf',), counts):
+                running += c
+                yield f'{self.name}_bucket{{{labels},le="{bound}"}} {running}'
+            yield f"{self.name}_sum{{{labels}}} {total:.6f}"
+            yield f"{self.name}_count{{{labels}}} {n}"
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter('hospital_http_requests_total', 'Requests handled.',
+                                ('endpoint', 'method', 'status'))
+        self.request_time = Histogram('hospital_http_request_duration_seconds', 'Wall time per request.',
+                                      ('endpoint',), DURATION_BUCKETS)
+        self.sql_time = Histogram('hospital_sql_duration_seconds', 'Total SQL time per request.',
+                                  ('endpoint',), DURATION_BUCKETS)
+        self.sql_count = Histogram('hospital_sql_queries_per_request', 'SQL statements per request.',
+                                   ('endpoint',), QUERY_BUCKETS)
+        self.template_time = Histogram('hospital_template_render_seconds', 'Template render time per request.',
+                                       ('endpoint',), DURATION_BUCKETS)
+        self.slow_queries = Counter('hospital_slow_queries_total', 'Statements slower than SLOW_QUERY_MS.',
+                                    ('endpoint',))
+
+    def record(self, endpoint, method, status, t):
+        with self.lock:
+            self.requests.inc((endpoint, method, status))
+            self.request_time.observe((endpoint,), t['wall'])
+            self.sql_time.observe((endpoint,), t['sql_time'])
+            self.sql_count.observe((endpoint,), t['sql_count'])
+            self.template_time.observe((endpoint,), t['tpl_time'])
+
+    def render(self):
+        with self.lock:
+            lines = []
+            for metric in (self.requests, self.request_time, self.sql_time, self.sql_count,
+                           self.template_time, self.slow_queries):
+                lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+def _timings():
+    """This request's accumulator, or None outside a request."""
+    if has_request_context():
+        return g.get('_timings')
+    return None
+
+
+def _endpoint():
+    return request.endpoint or '<unmatched>'
+
+
+#--------------
+#Engine events
+#--------------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(slow_ms, conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['_query_start'].pop()
+    t = _timings()
+    if t is not None:
+        t['sql_count'] += 1
+        t['sql_time'] += elapsed
+    if slow_ms and elapsed * 1000 >= slow_ms:
+        where = f"{_endpoint()} {request.method} {request.path}" if has_request_context() else '<no request>'
+        slow_log.warning("%.1f ms [%s] %s", elapsed * 1000, where, ' '.join(statement.split()))
+        if has_request_context():
+            with metrics.lock:
+                metrics.slow_queries.inc((_endpoint(),))
+
+
+def install_engine(engine, slow_ms=None):
+    slow_ms = config.SLOW_QUERY_MS if slow_ms is None else slow_ms
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', partial(_after_cursor_execute, slow_ms))
+
+
+#--------------
+#Request hooks
+#--------------
+def _start_request():
+    g._timings = {'start': time.perf_counter(), 'sql_count': 0, 'sql_time': 0.0,
+                  'tpl_time': 0.0, 'tpl_start': None}
+
+
+def _on_before_render(sender, template, context, **extra):
+    t = _timings()
+    if t is not None:
+        t['tpl_start'] = time.perf_counter()
+
+
+def _on_rendered(sender, template, context, **extra):
+    t = _timings()
+    if t is not None and t['tpl_start'] is not None:
+        t['tpl_time'] += time.perf_counter() - t['tpl_start']
+        t['tpl_start'] = None
+
+
+def _server_timing(response):
+    t = _timings()
+    if t is None:
+        return response
+    wall = (time.perf_counter() - t['start']) * 1000
+    #app is the total; db and tpl can overlap when a template triggers
+    #lazy loads while rendering
+    response.headers['Server-Timing'] = ', '.join((
+        f"db;dur={t['sql_time'] * 1000:.1f};desc=\"{t['sql_count']} queries\"",
+        f"tpl;dur={t['tpl_time'] * 1000:.1f}",
+        f"app;dur={wall:.1f}",
+    ))
+    g._status = response.status_code
+    if response.is_streamed:
+        #the body is generated after this request's teardown; record when
+        #the server closes the response so exports are timed end to end
+        t['streamed'] = True
+        endpoint, method, status = _endpoint(), request.method, response.status_code
+        response.call_on_close(lambda: _record(endpoint, method, status, t))
+    return response
+
+
+def _record(endpoint, method, status, t):
+    t['wall'] = time.perf_counter() - t['start']
+    metrics.record(endpoint, method, status, t)
+
+
+def _finish_request(exc):
+    t = _timings()
+    if t is None or t.get('streamed'):
+        return
+    _record(_endpoint(), request.method, g.get('_status', 500 if exc is not None else 200), t)
+
+
+def _may_read_metrics():
+    token = current_app.config['METRICS_TOKEN']
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    principal = auth.current_principal()
+    return principal is not None and principal.is_active and principal.role == 'admin'
+
+
+def metrics_view():
+    if not _may_read_metrics():
+        abort(403)
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app, db):
+    path = app.config['SLOW_QUERY_LOG']
+    #the logger is global, so a second app in the process reuses the handler
+    if path and not any(getattr(h, 'baseFilename', None) == os.path.abspath(path) for h in slow_log.handlers):
+        handler = logging.FileHandler(path)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        slow_log.addHandler(handler)
+    with app.app_context():
+        install_engine(db.engine, app.config['SLOW_QUERY_MS'])
+    app.before_request(_start_request)
+    app.after_request(_server_timing)
+    app.teardown_request(_finish_request)
+    before_render_template.connect(_on_before_render, app)
+    template_rendered.connect(_on_rendered, app)
+    if app.config['METRICS_ENABLED']:
+        app.add_url_rule('/metrics', 'metrics', metrics_view)
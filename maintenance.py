@@ -0,0 +1,187 @@
+"""
+Background maintenance sweeps.
+
+  * pending appointments dated before today become 'no-show'
+  * availability windows, and weekly rules that ended, older than
+    AVAILABILITY_KEEP_DAYS are deleted
+  * live-dashboard events older than EVENT_RETENTION_MINUTES are deleted
+
+All are set-based UPDATE/DELETE statements over at most
+MAINTENANCE_BATCH_SIZE rows, each in its own transaction with a short
+pause in between, so the sweeper holds the SQLite write lock for
+milliseconds at a time and bookings queue behind it only briefly.
+
+Run it in-process or from cron / a terminal. In-process, start(app)
+runs a daemon thread when MAINTENANCE_INTERVAL > 0; gunicorn.conf.py
+calls it after each worker forks, and the workers take turns through
+MAINTENANCE_LOCK_FILE so only one of them sweeps at a time. create_app()
+never starts it, so the preloaded master opens no connections.
+
+    python maintenance.py               # one sweep
+    python maintenance.py --loop        # sweep every MAINTENANCE_INTERVAL seconds
+"""
+import argparse
+import fcntl
+import logging
+import os
+import sys
+import threading
+from datetime import date, datetime, timedelta
+from sqlalchemy import create_engine, text
+import batching
+import cache
+import config
+import engine_profile
+import events
+import migrations
+import stats
+
+log = logging.getLogger('hospital.maintenance')
+
+_NO_SHOWS = text(
+    "UPDATE appointments SET status = 'no-show' WHERE id IN ("
+    "SELECT id FROM appointments WHERE status = 'pending' AND date < :today LIMIT :limit) "
+    f"RETURNING {events.CHANGED_COLUMNS}"
+)
+_OLD_AVAILABILITY = text(
+    "DELETE FROM availabilities WHERE id IN ("
+    "SELECT id FROM availabilities WHERE date < :cutoff LIMIT :limit)"
+)
+_OLD_EVENTS = text(
+    "DELETE FROM appointment_events WHERE id IN ("
+    "SELECT id FROM appointment_events WHERE created_at < :cutoff LIMIT :limit)"
+)
+_OLD_RULES = text(
+    "DELETE FROM availability_rules WHERE id IN ("
+    "SELECT id FROM availability_rules WHERE valid_until < :cutoff LIMIT :limit)"
+)
+
+
+def mark_no_shows(engine, today=None, batch_size=None, pause=None):
+    """Set past-due pending appointments to 'no-show'; returns how many changed."""
+    today = today or date.today()
+    n = batching.batched(engine, _NO_SHOWS, {'today': today.isoformat()},
+                         batch_size or config.MAINTENANCE_BATCH_SIZE,
+                         config.MAINTENANCE_PAUSE if pause is None else pause, events.core_changes())
+    if n:
+        cache.bump('appointments')
+        stats.invalidate()
+    return n
+
+
+def prune_availability(engine, today=None, keep_days=None, batch_size=None, pause=None):
+    """Delete availability windows and ended rules older than keep_days; returns how many went."""
+    keep_days = config.AVAILABILITY_KEEP_DAYS if keep_days is None else keep_days
+    cutoff = (today or date.today()) - timedelta(days=keep_days)
+    n = batching.batched(engine, _OLD_AVAILABILITY, {'cutoff': cutoff.isoformat()},
+                         batch_size or config.MAINTENANCE_BATCH_SIZE,
+                         config.MAINTENANCE_PAUSE if pause is None else pause)
+    rules = batching.batched(engine, _OLD_RULES, {'cutoff': cutoff.isoformat()},
+                             batch_size or config.MAINTENANCE_BATCH_SIZE,
+                             config.MAINTENANCE_PAUSE if pause is None else pause)
+    if n:
+        cache.bump('availabilities')
+    if rules:
+        cache.bump('availability_rules')
+    return n + rules
+
+
+def prune_events(engine, batch_size=None, pause=None):
+    """Delete live-dashboard events past EVENT_RETENTION_MINUTES; returns how many went."""
+    cutoff = datetime.utcnow() - timedelta(minutes=config.EVENT_RETENTION_MINUTES)
+    return batching.batched(engine, _OLD_EVENTS, {'cutoff': cutoff.strftime('%Y-%m-%d %H:%M:%S.%f')},
+                            batch_size or config.MAINTENANCE_BATCH_SIZE,
+                            config.MAINTENANCE_PAUSE if pause is None else pause)
+
+
+def sweep(engine, today=None):
+    no_shows = mark_no_shows(engine, today)
+    pruned = prune_availability(engine, today)
+    prune_events(engine)
+    if no_shows or pruned:
+        log.info("maintenance: %d no-shows marked, %d availability windows pruned", no_shows, pruned)
+    return no_shows, pruned
+
+
+class Sweeper:
+    """
+    Runs sweep() every `interval` seconds on a daemon thread. With a
+    lock_path, only the process holding an flock on it sweeps; the lock
+    goes with the process, so another one picks it up if that one dies.
+    """
+
+    def __init__(self, engine, interval=None, lock_path=None):
+        self.engine = engine
+        self.interval = config.MAINTENANCE_INTERVAL if interval is None else interval
+        self.lock_path = lock_path
+        self._lock = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='maintenance-sweeper', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _holds_lock(self):
+        if self.lock_path is None or self._lock is not None:
+            return True
+        f = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._lock = f
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self._holds_lock():
+                    sweep(self.engine)
+            except Exception:
+                log.exception("maintenance sweep failed")
+            self._stop.wait(self.interval)
+
+
+def start(app):
+    """Start the sweeper thread for app if MAINTENANCE_INTERVAL is set; call it after forking."""
+    interval, lock_path = app.config['MAINTENANCE_INTERVAL'], app.config['MAINTENANCE_LOCK_FILE']
+    if interval > 0 and 'maintenance' not in app.extensions:
+        from models import db
+        os.makedirs(os.path.dirname(lock_path) or '.', exist_ok=True)
+        with app.app_context():
+            app.extensions['maintenance'] = Sweeper(db.engine, interval, lock_path).start()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mark no-shows and prune old availability.")
+    parser.add_argument('--loop', action='store_true', help='keep sweeping every --interval seconds')
+    parser.add_argument('--interval', type=float, default=config.MAINTENANCE_INTERVAL or 300)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+
+    engine = create_engine(config.DATABASE_URI)
+    engine_profile.install(engine)
+    migrations.upgrade(engine)
+    if not args.loop:
+        no_shows, pruned = sweep(engine)
+        print(f"{no_shows} no-shows marked, {pruned} availability windows pruned")
+        return 0
+    try:
+        Sweeper(engine, args.interval)._run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
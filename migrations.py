@@ -0,0 +1,503 @@
+"""
+Versioned schema migrations.
+
+Each migration is a (version, name, statements) entry applied in its
+own transaction, DDL included, so one that fails part way leaves nothing
+behind and is simply retried on the next run; the versions that have run are recorded in the
+schema_version table, so an existing instance/hospital.db is brought up
+to date in place instead of relying on db.create_all().
+
+    python migrations.py            # upgrade to latest
+    python migrations.py status     # show current version
+"""
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import create_engine, inspect, text
+
+
+class MigrationError(Exception):
+    pass
+
+
+#v1 is the schema db.create_all() produced before migrations existed, so
+#databases created that way adopt it as a no-op.
+BASELINE = [
+    """CREATE TABLE IF NOT EXISTS users (
+        id INTEGER NOT NULL,
+        name VARCHAR(120) NOT NULL,
+        email VARCHAR(150) NOT NULL,
+        password_hash VARCHAR(256) NOT NULL,
+        role VARCHAR(20) NOT NULL,
+        created_at DATETIME,
+        is_active BOOLEAN DEFAULT 1 NOT NULL,
+        PRIMARY KEY (id)
+    )""",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email ON users (email)",
+    """CREATE TABLE IF NOT EXISTS doctors (
+        id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        specialization VARCHAR(120),
+        contact VARCHAR(50),
+        availability TEXT,
+        PRIMARY KEY (id),
+        UNIQUE (user_id),
+        FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE
+    )""",
+    """CREATE TABLE IF NOT EXISTS patients (
+        id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        age INTEGER,
+        gender VARCHAR(20),
+        contact VARCHAR(50),
+        address TEXT,
+        notes TEXT,
+        PRIMARY KEY (id),
+        UNIQUE (user_id),
+        FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE
+    )""",
+    """CREATE TABLE IF NOT EXISTS appointments (
+        id INTEGER NOT NULL,
+        patient_id INTEGER NOT NULL,
+        doctor_id INTEGER,
+        date DATE NOT NULL,
+        time TIME,
+        reason TEXT,
+        notes TEXT,
+        status VARCHAR(30) NOT NULL,
+        created_at DATETIME,
+        completed_at DATETIME,
+        PRIMARY KEY (id),
+        FOREIGN KEY(patient_id) REFERENCES patients (id) ON DELETE CASCADE,
+        FOREIGN KEY(doctor_id) REFERENCES doctors (id) ON DELETE SET NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS availabilities (
+        id INTEGER NOT NULL,
+        doctor_id INTEGER NOT NULL,
+        date DATE NOT NULL,
+        start_time TIME NOT NULL,
+        end_time TIME NOT NULL,
+        created_at DATETIME,
+        PRIMARY KEY (id),
+        FOREIGN KEY(doctor_id) REFERENCES doctors (id) ON DELETE CASCADE
+    )""",
+]
+
+#doctors.user_id / patients.user_id are UNIQUE and already indexed by sqlite
+APPOINTMENT_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_appointments_doctor_date_time ON appointments (doctor_id, date, time)",
+    "CREATE INDEX IF NOT EXISTS ix_appointments_patient_date_time ON appointments (patient_id, date, time)",
+    "CREATE INDEX IF NOT EXISTS ix_appointments_date_time ON appointments (date, time)",
+    "CREATE INDEX IF NOT EXISTS ix_appointments_status_date ON appointments (status, date)",
+]
+LOOKUP_INDEXES = APPOINTMENT_INDEXES + [
+    "CREATE INDEX IF NOT EXISTS ix_availabilities_doctor_date ON availabilities (doctor_id, date)",
+    "CREATE INDEX IF NOT EXISTS ix_doctors_specialization ON doctors (specialization)",
+    "ANALYZE",
+]
+
+
+def _check_no_double_bookings(conn):
+    dupes = conn.execute(text(
+        "SELECT doctor_id, date, time, COUNT(*) FROM appointments "
+        "WHERE status != 'cancelled' AND doctor_id IS NOT NULL AND time IS NOT NULL "
+        "GROUP BY doctor_id, date, time HAVING COUNT(*) > 1"
+    )).fetchall()
+    if dupes:
+        listed = ', '.join(f"doctor {d} on {day} at {t}" for d, day, t, _ in dupes[:5])
+        raise MigrationError(
+            f"{len(dupes)} slot(s) are double-booked ({listed}); cancel the extra "
+            "appointments before adding the active-slot unique index"
+        )
+
+
+#one live appointment per doctor slot; cancelled rows free the slot
+_ACTIVE_SLOT = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_appointments_active_slot ON appointments (doctor_id, date, time) "
+    "WHERE status != 'cancelled'"
+)
+ACTIVE_SLOT_INDEX = [_check_no_double_bookings, _ACTIVE_SLOT]
+
+#keep appointment_search in step with appointments
+APPOINTMENT_SEARCH_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS appointments_search_ai AFTER INSERT ON appointments BEGIN
+        INSERT INTO appointment_search (rowid, reason, notes) VALUES (new.id, new.reason, new.notes);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS appointments_search_au AFTER UPDATE OF reason, notes ON appointments BEGIN
+        INSERT INTO appointment_search (appointment_search, rowid, reason, notes)
+        VALUES ('delete', old.id, old.reason, old.notes);
+        INSERT INTO appointment_search (rowid, reason, notes) VALUES (new.id, new.reason, new.notes);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS appointments_search_ad AFTER DELETE ON appointments BEGIN
+        INSERT INTO appointment_search (appointment_search, rowid, reason, notes)
+        VALUES ('delete', old.id, old.reason, old.notes);
+    END""",
+]
+
+
+def _require_fts5(conn):
+    if not conn.execute(text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar():
+        raise MigrationError("this SQLite build has no FTS5; full-text search needs it")
+
+
+#patient_search holds its own copy of the user/patient columns (they
+#span two tables); appointment_search is an external-content index over
+#appointments. Triggers keep both in step with every insert, update and
+#delete, including Core/bulk writes that bypass the ORM.
+FULL_TEXT_SEARCH = [
+    _require_fts5,
+    "CREATE VIRTUAL TABLE IF NOT EXISTS patient_search USING fts5("
+    "name, email, contact, address, notes, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    """CREATE TRIGGER IF NOT EXISTS patients_search_ai AFTER INSERT ON patients BEGIN
+        INSERT INTO patient_search (rowid, name, email, contact, address, notes)
+        SELECT new.id, u.name, u.email, new.contact, new.address, new.notes FROM users u WHERE u.id = new.user_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS patients_search_au AFTER UPDATE OF user_id, contact, address, notes ON patients BEGIN
+        DELETE FROM patient_search WHERE rowid = old.id;
+        INSERT INTO patient_search (rowid, name, email, contact, address, notes)
+        SELECT new.id, u.name, u.email, new.contact, new.address, new.notes FROM users u WHERE u.id = new.user_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS patients_search_ad AFTER DELETE ON patients BEGIN
+        DELETE FROM patient_search WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS users_search_au AFTER UPDATE OF name, email ON users BEGIN
+        DELETE FROM patient_search WHERE rowid IN (SELECT id FROM patients WHERE user_id = new.id);
+        INSERT INTO patient_search (rowid, name, email, contact, address, notes)
+        SELECT p.id, new.name, new.email, p.contact, p.address, p.notes FROM patients p WHERE p.user_id = new.id;
+    END""",
+    "DELETE FROM patient_search",
+    "INSERT INTO patient_search (rowid, name, email, contact, address, notes) "
+    "SELECT p.id, u.name, u.email, p.contact, p.address, p.notes FROM patients p JOIN users u ON u.id = p.user_id",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS appointment_search USING fts5("
+    "reason, notes, content='appointments', content_rowid='id', tokenize='unicode61 remove_diacritics 2', "
+    "prefix='2 3')",
+    *APPOINTMENT_SEARCH_TRIGGERS,
+    "INSERT INTO appointment_search (appointment_search) VALUES ('rebuild')",
+]
+
+#exports.py merges live and archived rows in (date, time, id) order; this
+#lets the archive side stream in that order instead of sorting
+ARCHIVE_EXPORT_INDEX = [
+    "CREATE INDEX IF NOT EXISTS ix_appointments_archive_date_time_id "
+    "ON appointments_archive (date, time, id)",
+]
+
+#cold storage for finished appointments, filled by archive.py; ids are
+#kept so links and exports stay stable
+ARCHIVE_TABLE = [
+    """CREATE TABLE IF NOT EXISTS appointments_archive (
+        id INTEGER NOT NULL,
+        patient_id INTEGER NOT NULL,
+        doctor_id INTEGER,
+        date DATE NOT NULL,
+        time TIME,
+        reason TEXT,
+        notes TEXT,
+        status VARCHAR(30) NOT NULL,
+        created_at DATETIME,
+        completed_at DATETIME,
+        archived_at DATETIME NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(patient_id) REFERENCES patients (id) ON DELETE CASCADE,
+        FOREIGN KEY(doctor_id) REFERENCES doctors (id) ON DELETE SET NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_appointments_archive_patient_date_time "
+    "ON appointments_archive (patient_id, date, time)",
+    "CREATE INDEX IF NOT EXISTS ix_appointments_archive_doctor_date_time "
+    "ON appointments_archive (doctor_id, date, time)",
+    "CREATE INDEX IF NOT EXISTS ix_appointments_archive_status ON appointments_archive (status)",
+    *ARCHIVE_EXPORT_INDEX,
+]
+
+#lets maintenance.py find expired availability without a full scan
+MAINTENANCE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_availabilities_date ON availabilities (date)",
+]
+
+#weekly recurring availability, expanded on demand by slots.py
+AVAILABILITY_RULES = [
+    """CREATE TABLE IF NOT EXISTS availability_rules (
+        id INTEGER NOT NULL,
+        doctor_id INTEGER NOT NULL,
+        weekdays INTEGER NOT NULL,
+        start_time TIME NOT NULL,
+        end_time TIME NOT NULL,
+        valid_from DATE NOT NULL,
+        valid_until DATE,
+        skip_dates TEXT,
+        created_at DATETIME,
+        PRIMARY KEY (id),
+        FOREIGN KEY(doctor_id) REFERENCES doctors (id) ON DELETE CASCADE
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_availability_rules_doctor ON availability_rules (doctor_id)",
+]
+
+#mark the days an appointment write touches for analytics.py
+APPOINTMENT_ROLLUP_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS appointments_rollup_ai AFTER INSERT ON appointments BEGIN
+        INSERT OR IGNORE INTO rollup_dirty_days (day) VALUES (new.date);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS appointments_rollup_au
+    AFTER UPDATE OF date, time, doctor_id, status, created_at, completed_at ON appointments BEGIN
+        INSERT OR IGNORE INTO rollup_dirty_days (day) VALUES (old.date), (new.date);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS appointments_rollup_ad AFTER DELETE ON appointments BEGIN
+        INSERT OR IGNORE INTO rollup_dirty_days (day) VALUES (old.date);
+    END""",
+]
+
+
+def _rule_days(ref):
+    #a rule's range can be open-ended, so it dirties the days in range that
+    #the rollups cover at all (the same set analytics.mark_all_dirty uses)
+    span = f"BETWEEN {ref}.valid_from AND COALESCE({ref}.valid_until, '9999-12-31')"
+    return (
+        "INSERT OR IGNORE INTO rollup_dirty_days (day) "
+        f"SELECT date FROM appointments WHERE date {span} "
+        f"UNION SELECT date FROM appointments_archive WHERE date {span} "
+        f"UNION SELECT date FROM availabilities WHERE date {span} "
+        f"UNION SELECT day FROM daily_rollups WHERE day {span}"
+    )
+
+
+#weekly rules add capacity to every matching day, so a rule-only change
+#has to reach analytics.py too. Created after APPOINTMENT_ID_SEQUENCE:
+#they name appointments, which that migration drops and renames into place
+RULE_ROLLUP_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS availability_rules_rollup_ai AFTER INSERT ON availability_rules BEGIN
+        {_rule_days('new')};
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS availability_rules_rollup_au AFTER UPDATE ON availability_rules BEGIN
+        {_rule_days('old')};
+        {_rule_days('new')};
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS availability_rules_rollup_ad AFTER DELETE ON availability_rules BEGIN
+        {_rule_days('old')};
+    END""",
+]
+
+#per-day, per-doctor reporting rollups for analytics.py; the triggers
+#only record which days need recomputing, so writes stay cheap
+ANALYTICS_ROLLUPS = [
+    """CREATE TABLE IF NOT EXISTS daily_rollups (
+        day DATE NOT NULL,
+        doctor_id INTEGER NOT NULL,
+        total INTEGER NOT NULL,
+        pending INTEGER NOT NULL,
+        completed INTEGER NOT NULL,
+        cancelled INTEGER NOT NULL,
+        no_show INTEGER NOT NULL,
+        booked_minutes INTEGER NOT NULL,
+        available_minutes INTEGER NOT NULL,
+        lead_hist TEXT NOT NULL,
+        completion_hist TEXT NOT NULL,
+        PRIMARY KEY (day, doctor_id)
+    )""",
+    "CREATE TABLE IF NOT EXISTS rollup_dirty_days (day DATE NOT NULL PRIMARY KEY) WITHOUT ROWID",
+    *APPOINTMENT_ROLLUP_TRIGGERS,
+    """CREATE TRIGGER IF NOT EXISTS appointments_archive_rollup_ad AFTER DELETE ON appointments_archive BEGIN
+        INSERT OR IGNORE INTO rollup_dirty_days (day) VALUES (old.date);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS availabilities_rollup_ai AFTER INSERT ON availabilities BEGIN
+        INSERT OR IGNORE INTO rollup_dirty_days (day) VALUES (new.date);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS availabilities_rollup_au AFTER UPDATE ON availabilities BEGIN
+        INSERT OR IGNORE INTO rollup_dirty_days (day) VALUES (old.date), (new.date);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS availabilities_rollup_ad AFTER DELETE ON availabilities BEGIN
+        INSERT OR IGNORE INTO rollup_dirty_days (day) VALUES (old.date);
+    END""",
+    "INSERT OR IGNORE INTO rollup_dirty_days (day) SELECT date FROM appointments "
+    "UNION SELECT date FROM appointments_archive UNION SELECT date FROM availabilities",
+]
+
+#outbox for events.SQLiteBroker; AUTOINCREMENT so ids (the SSE
+#Last-Event-ID) never go backwards after pruning
+APPOINTMENT_EVENTS = [
+    """CREATE TABLE IF NOT EXISTS appointment_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        keys TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        created_at DATETIME NOT NULL
+    )""",
+]
+
+def _check_no_shared_ids(conn):
+    shared = conn.execute(text(
+        "SELECT a.id FROM appointments a JOIN appointments_archive r ON r.id = a.id ORDER BY a.id LIMIT 6"
+    )).scalars().all()
+    if shared:
+        listed = ', '.join(map(str, shared[:5]))
+        raise MigrationError(
+            f"appointment id(s) {listed}{', ...' if len(shared) > 5 else ''} exist in both appointments and "
+            "appointments_archive; delete or renumber the live copies before upgrading"
+        )
+
+
+#AUTOINCREMENT so ids are never handed out twice: without it SQLite gives
+#the next appointment max(id) + 1, which after the newest rows are deleted
+#or archived can be an id already in appointments_archive. The sequence
+#starts above both tables. SQLite can't add AUTOINCREMENT in place, so the
+#table is rebuilt and its indexes and triggers recreated.
+APPOINTMENT_ID_SEQUENCE = [
+    _check_no_shared_ids,
+    #left over from a run that died before _transaction() existed
+    "DROP TABLE IF EXISTS appointments_new",
+    """CREATE TABLE appointments_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+        patient_id INTEGER NOT NULL,
+        doctor_id INTEGER,
+        date DATE NOT NULL,
+        time TIME,
+        reason TEXT,
+        notes TEXT,
+        status VARCHAR(30) NOT NULL,
+        created_at DATETIME,
+        completed_at DATETIME,
+        FOREIGN KEY(patient_id) REFERENCES patients (id) ON DELETE CASCADE,
+        FOREIGN KEY(doctor_id) REFERENCES doctors (id) ON DELETE SET NULL
+    )""",
+    "INSERT INTO appointments_new (id, patient_id, doctor_id, date, time, reason, notes, status, created_at, "
+    "completed_at) SELECT id, patient_id, doctor_id, date, time, reason, notes, status, created_at, completed_at "
+    "FROM appointments",
+    #dropping the table drops its indexes and triggers without firing them
+    "DROP TABLE appointments",
+    "ALTER TABLE appointments_new RENAME TO appointments",
+    *APPOINTMENT_INDEXES,
+    _ACTIVE_SLOT,
+    *APPOINTMENT_SEARCH_TRIGGERS,
+    *APPOINTMENT_ROLLUP_TRIGGERS,
+    "DELETE FROM sqlite_sequence WHERE name = 'appointments'",
+    "INSERT INTO sqlite_sequence (name, seq) SELECT 'appointments', MAX("
+    "(SELECT COALESCE(MAX(id), 0) FROM appointments), (SELECT COALESCE(MAX(id), 0) FROM appointments_archive))",
+    "ANALYZE appointments",
+]
+
+#archive.py deletes rows from appointments, which takes them out of
+#appointment_search; archive_search indexes them where they land so
+#fulltext.search_appointments still finds them
+ARCHIVE_SEARCH = [
+    _require_fts5,
+    "CREATE VIRTUAL TABLE IF NOT EXISTS archive_search USING fts5("
+    "reason, notes, content='appointments_archive', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    """CREATE TRIGGER IF NOT EXISTS appointments_archive_search_ai AFTER INSERT ON appointments_archive BEGIN
+        INSERT INTO archive_search (rowid, reason, notes) VALUES (new.id, new.reason, new.notes);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS appointments_archive_search_au
+    AFTER UPDATE OF reason, notes ON appointments_archive BEGIN
+        INSERT INTO archive_search (archive_search, rowid, reason, notes)
+        VALUES ('delete', old.id, old.reason, old.notes);
+        INSERT INTO archive_search (rowid, reason, notes) VALUES (new.id, new.reason, new.notes);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS appointments_archive_search_ad AFTER DELETE ON appointments_archive BEGIN
+        INSERT INTO archive_search (archive_search, rowid, reason, notes)
+        VALUES ('delete', old.id, old.reason, old.notes);
+    END""",
+    "INSERT INTO archive_search (archive_search) VALUES ('rebuild')",
+]
+
+MIGRATIONS = [
+    (1, 'baseline schema', BASELINE),
+    (2, 'lookup indexes', LOOKUP_INDEXES),
+    (3, 'active slot uniqueness', ACTIVE_SLOT_INDEX),
+    (4, 'full-text search', FULL_TEXT_SEARCH),
+    (5, 'appointment archive', ARCHIVE_TABLE),
+    (6, 'maintenance indexes', MAINTENANCE_INDEXES),
+    (7, 'recurring availability', AVAILABILITY_RULES),
+    (8, 'analytics rollups', ANALYTICS_ROLLUPS),
+    (9, 'appointment events', APPOINTMENT_EVENTS),
+    (10, 'appointment id sequence', APPOINTMENT_ID_SEQUENCE),
+    #databases that were already past 5 when the index joined ARCHIVE_TABLE
+    (11, 'archive export index', ARCHIVE_EXPORT_INDEX + ["ANALYZE"]),
+    #and the days of existing rules, whose edits may have left rollups stale
+    (12, 'availability rule rollup triggers', RULE_ROLLUP_TRIGGERS + [
+        "INSERT OR IGNORE INTO rollup_dirty_days (day) SELECT d.day FROM ("
+        "SELECT date AS day FROM appointments UNION SELECT date FROM appointments_archive "
+        "UNION SELECT date FROM availabilities UNION SELECT day FROM daily_rollups) d "
+        "WHERE EXISTS (SELECT 1 FROM availability_rules r "
+        "WHERE d.day BETWEEN r.valid_from AND COALESCE(r.valid_until, '9999-12-31'))",
+    ]),
+    (13, 'archive full-text search', ARCHIVE_SEARCH),
+]
+
+LATEST = MIGRATIONS[-1][0]
+
+
+def _ensure_version_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        "version INTEGER NOT NULL PRIMARY KEY, name VARCHAR(120) NOT NULL, applied_at DATETIME NOT NULL)"
+    ))
+
+
+def current_version(engine):
+    if not inspect(engine).has_table('schema_version'):
+        return 0
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+
+
+@contextmanager
+def _transaction(engine):
+    """
+    engine.begin() with the CREATE/DROP statements inside the transaction:
+    pysqlite only opens one ahead of INSERT/UPDATE/DELETE and autocommits
+    any DDL before that, so here it is told to keep out and BEGIN is
+    issued explicitly.
+    """
+    with engine.connect() as conn:
+        if engine.dialect.name != 'sqlite':
+            with conn.begin():
+                yield conn
+            return
+        dbapi_conn = conn.connection.driver_connection
+        level = dbapi_conn.isolation_level
+        dbapi_conn.isolation_level = None
+        try:
+            with conn.begin():
+                conn.exec_driver_sql('BEGIN')
+                yield conn
+        finally:
+            dbapi_conn.isolation_level = level
+
+
+def upgrade(engine, target=None):
+    """Apply pending migrations up to `target` (default: latest). Returns the versions applied."""
+    target = LATEST if target is None else target
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+    applied = []
+    for version, name, steps in MIGRATIONS:
+        if version > target:
+            break
+        with _transaction(engine) as conn:
+            done = conn.execute(text("SELECT 1 FROM schema_version WHERE version = :v"), {'v': version}).first()
+            if done:
+                continue
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(text(step))
+            conn.execute(
+                text("INSERT INTO schema_version (version, name, applied_at) VALUES (:v, :n, :t)"),
+                {'v': version, 'n': name, 't': datetime.utcnow()}
+            )
+        applied.append(version)
+    return applied
+
+
+if __name__ == '__main__':
+    import os
+    import config
+    os.makedirs(config.INSTANCE_DIR, exist_ok=True)
+    engine = create_engine(config.DATABASE_URI)
+    cmd = sys.argv[1] if len(sys.argv) > 1 else 'upgrade'
+    if cmd == 'status':
+        print(f"schema version {current_version(engine)} (latest {LATEST})")
+    elif cmd == 'upgrade':
+        applied = upgrade(engine)
+        print(f"applied {applied}" if applied else "already up to date", f"- schema version {current_version(engine)}")
+    else:
+        sys.exit(f"unknown command {cmd!r}; use 'upgrade' or 'status'")
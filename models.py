@@ -1,6 +1,6 @@
 from datetime import date, datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_sqlalchemy import SQLAlchemy
+import hashing
 
 db = SQLAlchemy()
 
@@ -19,14 +19,19 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     # Relationships..
-    doctor = db.relationship("Doctor", backref="user",uselist=False, cascade="all, delete")
-    patient = db.relationship("Patient", backref="user",uselist=False, cascade="all, delete")
+    #passive_deletes: the ON DELETE CASCADE foreign keys remove the profile
+    #(and a patient's appointments) instead of the ORM loading them first
+    doctor = db.relationship("Doctor", backref="user",uselist=False, cascade="all, delete", passive_deletes=True)
+    patient = db.relationship("Patient", backref="user",uselist=False, cascade="all, delete", passive_deletes=True)
 
     def set_password(self, password: str):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hashing.hash_password(password)
     
     def check_password(self, password: str) -> bool:
-        return check_password_hash(self.password_hash, password)
+        return hashing.verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self) -> bool:
+        return hashing.needs_rehash(self.password_hash)
     
     def __repr__(self):
         return f"<User {self.id} {self.email} ({self.role})>"
@@ -39,7 +44,7 @@ class Doctor(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, unique=True)
-    specialization = db.Column(db.String(120), nullable=True)
+    specialization = db.Column(db.String(120), nullable=True, index=True)
     contact = db.Column(db.String(50), nullable=True)
     #availability can be stored as JSON/text or separate table; keep simple:
     availability = db.Column(db.Text, nullable=True)
@@ -65,7 +70,8 @@ class Patient(db.Model):
     #optional
     notes = db.Column(db.Text, nullable=True)
     #Appointment req from patients
-    appointments = db.relationship("Appointment", backref="patient", lazy=True, cascade="all, delete-orphan")
+    appointments = db.relationship("Appointment", backref="patient", lazy=True, cascade="all, delete-orphan",
+                                   passive_deletes=True)
 
     def __repr__(self):
         return f"<Patient {self.id} user_id={self.user_id}>"
@@ -75,6 +81,17 @@ class Appointment(db.Model):
 
 
     __tablename__ = "appointments"
+    #kept in step with migrations.LOOKUP_INDEXES
+    __table_args__ = (
+        db.Index("ix_appointments_doctor_date_time", "doctor_id", "date", "time"),
+        db.Index("ix_appointments_patient_date_time", "patient_id", "date", "time"),
+        db.Index("ix_appointments_date_time", "date", "time"),
+        db.Index("ix_appointments_status_date", "status", "date"),
+        db.Index("ux_appointments_active_slot", "doctor_id", "date", "time", unique=True,
+                 sqlite_where=db.text("status != 'cancelled'")),
+        #ids stay unique across appointments and appointments_archive
+        {"sqlite_autoincrement": True},
+    )
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey("patients.id", ondelete="CASCADE"), nullable=False)
     doctor_id = db.Column(db.Integer, db.ForeignKey("doctors.id", ondelete="SET NULL"), nullable=True)
@@ -106,8 +123,46 @@ class Appointment(db.Model):
     def __repr__(self):
         return f"<Appointment {self.id} patient_id={self.patient_id} doctor_id={self.doctor_id} date={self.date} status={self.status}>"
     
+class ArchivedAppointment(db.Model):
+    """
+    Finished (completed/cancelled) appointments moved out of the hot table
+    by archive.py. Same columns and ids as Appointment, read-only to the app.
+    """
+    __tablename__ = "appointments_archive"
+    #kept in step with migrations.ARCHIVE_TABLE
+    __table_args__ = (
+        db.Index("ix_appointments_archive_patient_date_time", "patient_id", "date", "time"),
+        db.Index("ix_appointments_archive_doctor_date_time", "doctor_id", "date", "time"),
+        db.Index("ix_appointments_archive_status", "status"),
+        db.Index("ix_appointments_archive_date_time_id", "date", "time", "id"),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey("patients.id", ondelete="CASCADE"), nullable=False)
+    doctor_id = db.Column(db.Integer, db.ForeignKey("doctors.id", ondelete="SET NULL"), nullable=True)
+    date = db.Column(db.Date, nullable=False)
+    time = db.Column(db.Time, nullable=True)
+    reason = db.Column(db.Text, nullable=True)
+    notes = db.Column(db.Text, nullable=True)
+    status = db.Column(db.String(30), nullable=False)
+    created_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+    patient = db.relationship("Patient", lazy=True)
+    doctor = db.relationship("Doctor", lazy=True)
+
+    patient_name = Appointment.patient_name
+    doctor_name = Appointment.doctor_name
+
+    def __repr__(self):
+        return f"<ArchivedAppointment {self.id} patient_id={self.patient_id} date={self.date} status={self.status}>"
+
 class Availability(db.Model):
     __tablename__ = "availabilities"
+    __table_args__ = (
+        db.Index("ix_availabilities_doctor_date", "doctor_id", "date"),
+        db.Index("ix_availabilities_date", "date"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     doctor_id = db.Column(db.Integer, db.ForeignKey("doctors.id", ondelete="CASCADE"), nullable=False)
     date = db.Column(db.Date, nullable=False)
@@ -115,8 +170,51 @@ class Availability(db.Model):
     end_time = db.Column(db.Time, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    doctor = db.relationship("Doctor", backref=db.backref("availabilities", lazy=True, cascade="all, delete-orphan"))
+    doctor = db.relationship("Doctor", backref=db.backref("availabilities", lazy=True, cascade="all, delete-orphan",
+                                                                   passive_deletes=True))
 
     def __repr__(self):
         return f"<Availability {self.id} doctor_id={self.doctor_id} date={self.date} {self.start_time}-{self.end_time}>"
+
+class AvailabilityRule(db.Model):
+    """
+    Recurring weekly window: on every weekday set in `weekdays` (bit 0 =
+    Monday ... bit 6 = Sunday) from valid_from to valid_until (open-ended
+    when NULL), except the dates listed in skip_dates. Expanded into
+    per-day windows by slots.py, only for the range being queried.
+    """
+    __tablename__ = "availability_rules"
+    __table_args__ = (
+        db.Index("ix_availability_rules_doctor", "doctor_id"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey("doctors.id", ondelete="CASCADE"), nullable=False)
+    weekdays = db.Column(db.Integer, nullable=False)
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)
+    valid_from = db.Column(db.Date, nullable=False)
+    valid_until = db.Column(db.Date, nullable=True)
+    #comma-separated YYYY-MM-DD dates with no clinic (holidays, leave)
+    skip_dates = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    doctor = db.relationship("Doctor", backref=db.backref("availability_rules", lazy=True, cascade="all, delete-orphan",
+                                                                   passive_deletes=True))
+
+    WEEKDAY_NAMES = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+    @property
+    def weekday_names(self):
+        return [name for i, name in enumerate(self.WEEKDAY_NAMES) if self.weekdays & (1 << i)]
+
+    @staticmethod
+    def parse_skip_dates(value):
+        return {date.fromisoformat(d) for d in (value or '').split(',') if d}
+
+    @property
+    def skipped(self):
+        return self.parse_skip_dates(self.skip_dates)
+
+    def __repr__(self):
+        return f"<AvailabilityRule {self.id} doctor_id={self.doctor_id} weekdays={self.weekdays:07b} {self.start_time}-{self.end_time}>"
     
\ No newline at end of file
@@ -0,0 +1,286 @@
+"""
+Shared queries for the list pages.
+
+Templates read appt.patient_name / appt.doctor_name and doc.user.*, which
+walk Appointment -> Patient/Doctor -> User. Loading those lazily costs a
+SELECT per row, so every list route goes through the helpers here and
+gets the relationships it renders loaded up front.
+"""
+import base64
+import json
+from datetime import date, time, datetime
+from sqlalchemy import event, func, literal, tuple_
+from sqlalchemy.orm import joinedload
+from models import db, Patient, Doctor, Appointment, ArchivedAppointment
+
+PAGE_SIZE = 50
+APPOINTMENT_STATUSES = ('pending', 'completed', 'cancelled', 'no-show')
+
+
+def appointment_options():
+    """Loader options for anything that renders patient and doctor names."""
+    return (
+        joinedload(Appointment.patient).joinedload(Patient.user),
+        joinedload(Appointment.doctor).joinedload(Doctor.user),
+    )
+
+
+def appointments_query():
+    return Appointment.query.options(*appointment_options())
+
+
+def archived_appointments_query():
+    return ArchivedAppointment.query.options(
+        joinedload(ArchivedAppointment.patient).joinedload(Patient.user),
+        joinedload(ArchivedAppointment.doctor).joinedload(Doctor.user),
+    )
+
+
+def get_appointment(appointment_id):
+    return appointments_query().filter(Appointment.id == appointment_id).first()
+
+
+def recent_appointments(limit=10):
+    return appointments_query().order_by(
+        Appointment.date.desc(), Appointment.time.desc()
+    ).limit(limit).all()
+
+
+def patient_appointments(patient_id, from_date=None):
+    q = appointments_query().filter(Appointment.patient_id == patient_id)
+    if from_date is not None:
+        q = q.filter(Appointment.date >= from_date)
+    return q.order_by(Appointment.date, Appointment.time).all()
+
+
+def doctor_appointments_on(doctor_id, day):
+    return appointments_query().filter(
+        Appointment.doctor_id == doctor_id,
+        Appointment.date == day
+    ).order_by(Appointment.time).all()
+
+
+def doctors_query():
+    return Doctor.query.options(joinedload(Doctor.user))
+
+
+def all_doctors():
+    return doctors_query().order_by(Doctor.id).all()
+
+
+def specializations():
+    rows = db.session.query(Doctor.specialization).filter(Doctor.specialization.isnot(None)).distinct()
+    return sorted(row[0] for row in rows if row[0].strip())
+
+
+def patients_query():
+    return Patient.query.options(joinedload(Patient.user))
+
+
+def get_patient(patient_id):
+    return patients_query().filter(Patient.id == patient_id).first()
+
+
+#----------------
+#Keyset pagination
+#----------------
+class Keyset:
+    """
+    Sort key for keyset pagination. `columns` is the ORDER BY, `row_key`
+    pulls the same values off a result row and `parsers` turn the strings
+    stored in a cursor back into bind values.
+    """
+
+    def __init__(self, columns, row_key, parsers):
+        self.columns = columns
+        self.row_key = row_key
+        self.parsers = parsers
+
+    def encode(self, row):
+        values = [v.isoformat() if hasattr(v, 'isoformat') else v for v in self.row_key(row)]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+    def decode(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            values = json.loads(raw)
+            if len(values) != len(self.parsers):
+                return None
+            return tuple(parse(v) for parse, v in zip(self.parsers, values))
+        except (ValueError, TypeError):
+            return None
+
+
+#NULL times sort as midnight so the row-value comparison never sees a NULL
+APPOINTMENT_KEYSET = Keyset(
+    columns=(Appointment.date, func.coalesce(Appointment.time, time.min), Appointment.id),
+    row_key=lambda a: (a.date, a.time or time.min, a.id),
+    parsers=(date.fromisoformat, time.fromisoformat, int),
+)
+ARCHIVE_KEYSET = Keyset(
+    columns=(ArchivedAppointment.date, func.coalesce(ArchivedAppointment.time, time.min), ArchivedAppointment.id),
+    row_key=APPOINTMENT_KEYSET.row_key,
+    parsers=APPOINTMENT_KEYSET.parsers,
+)
+DOCTOR_KEYSET = Keyset(columns=(Doctor.id,), row_key=lambda d: (d.id,), parsers=(int,))
+PATIENT_KEYSET = Keyset(columns=(Patient.id,), row_key=lambda p: (p.id,), parsers=(int,))
+
+
+class Page:
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def keyset_page(query, keyset, cursor=None, direction='next', per_page=PAGE_SIZE):
+    """
+    One page of `query` ordered by `keyset`, starting after (or, with
+    direction='prev', ending before) the row the cursor points at. Costs
+    a single indexed range scan of per_page + 1 rows however deep the
+    page is.
+    """
+    cols = keyset.columns
+    values = keyset.decode(cursor) if cursor else None
+    backwards = direction == 'prev' and values is not None
+    if values is not None:
+        row = tuple_(*cols)
+        bound = tuple_(*[literal(v, type_=c.type) for c, v in zip(cols, values)])
+        query = query.filter(row < bound if backwards else row > bound)
+    order = [c.desc() for c in cols] if backwards else list(cols)
+    rows = query.order_by(*order).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+    if not rows:
+        return Page(rows)
+    has_next = True if backwards else has_more
+    has_prev = has_more if backwards else values is not None
+    return Page(
+        rows,
+        next_cursor=keyset.encode(rows[-1]) if has_next else None,
+        prev_cursor=keyset.encode(rows[0]) if has_prev else None,
+    )
+
+
+def merged_keyset_page(sources, cursor=None, direction='next', per_page=PAGE_SIZE):
+    """
+    keyset_page over several (query, keyset) sources that share one sort
+    key and cursor format, merged into a single page. Each source costs
+    its own range scan of per_page + 1 rows.
+    """
+    keyset = sources[0][1]
+    values = keyset.decode(cursor) if cursor else None
+    backwards = direction == 'prev' and values is not None
+    pages = [keyset_page(query, ks, cursor, direction, per_page) for query, ks in sources]
+    rows = sorted((row for page in pages for row in page.items), key=keyset.row_key)
+    if backwards:
+        more = len(rows) > per_page or any(page.prev_cursor for page in pages)
+        rows = rows[-per_page:]
+        has_next, has_prev = True, more
+    else:
+        more = len(rows) > per_page or any(page.next_cursor for page in pages)
+        rows = rows[:per_page]
+        has_next, has_prev = more, values is not None
+    if not rows:
+        return Page(rows)
+    return Page(
+        rows,
+        next_cursor=keyset.encode(rows[-1]) if has_next else None,
+        prev_cursor=keyset.encode(rows[0]) if has_prev else None,
+    )
+
+
+def parse_appointment_filters(args):
+    """Read status/doctor/patient/date-range filters off request.args; bad values are dropped."""
+    filters = {}
+    status = (args.get('status') or '').strip().lower()
+    if status:
+        filters['status'] = status
+    for key in ('doctor_id', 'patient_id'):
+        try:
+            filters[key] = int(args.get(key))
+        except (TypeError, ValueError):
+            pass
+    for key in ('date_from', 'date_to'):
+        try:
+            filters[key] = datetime.strptime(args.get(key, ''), '%Y-%m-%d').date()
+        except ValueError:
+            pass
+    return filters
+
+
+def filter_appointments(query, status=None, doctor_id=None, patient_id=None,
+                        date_from=None, date_to=None, model=Appointment):
+    if status:
+        query = query.filter(model.status == status)
+    if doctor_id is not None:
+        query = query.filter(model.doctor_id == doctor_id)
+    if patient_id is not None:
+        query = query.filter(model.patient_id == patient_id)
+    if date_from is not None:
+        query = query.filter(model.date >= date_from)
+    if date_to is not None:
+        query = query.filter(model.date <= date_to)
+    return query
+
+
+def appointments_page(filters=None, cursor=None, direction='next', per_page=PAGE_SIZE):
+    query = filter_appointments(appointments_query(), **(filters or {}))
+    return keyset_page(query, APPOINTMENT_KEYSET, cursor, direction, per_page)
+
+
+def history_page(filters=None, cursor=None, direction='next', per_page=PAGE_SIZE):
+    """Like appointments_page, but archived appointments are included."""
+    filters = filters or {}
+    return merged_keyset_page([
+        (filter_appointments(appointments_query(), **filters), APPOINTMENT_KEYSET),
+        (filter_appointments(archived_appointments_query(), model=ArchivedAppointment, **filters), ARCHIVE_KEYSET),
+    ], cursor, direction, per_page)
+
+
+def doctors_page(specialization=None, cursor=None, direction='next', per_page=PAGE_SIZE):
+    query = doctors_query()
+    if specialization:
+        query = query.filter(Doctor.specialization == specialization)
+    return keyset_page(query, DOCTOR_KEYSET, cursor, direction, per_page)
+
+
+def patients_page(cursor=None, direction='next', per_page=PAGE_SIZE):
+    return keyset_page(patients_query(), PATIENT_KEYSET, cursor, direction, per_page)
+
+
+class QueryCounter:
+    """
+    Counts statements sent to the engine while active, e.g.
+
+        with QueryCounter() as qc:
+            client.get('/admin/view_all_appointments')
+        print(qc.count)
+    """
+
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.count = 0
+        self.statements = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+    def __enter__(self):
+        if self.engine is None:
+            self.engine = db.engine
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+        return False
@@ -0,0 +1,213 @@
+"""
+Admission control for the expensive routes.
+
+Two independent checks run before the view:
+
+  * token buckets (RATE_LIMITS): each "[METHOD ]endpoint=N/S[/B]"
+    rule lets a client make N requests per S seconds with bursts of up
+    to B (default N). Clients are the logged-in user, or the IP address
+    for anonymous requests such as login and register. Behind a reverse
+    proxy set PROXY_FIX_X_FOR, or every anonymous client shares the
+    proxy's address and bucket. Over the limit: 429 with Retry-After.
+  * concurrency caps (CONCURRENCY_LIMITS): "endpoint=N" allows N
+    requests of that endpoint in flight per worker process; a request
+    that can't get a slot within CONCURRENCY_WAIT_MS gets 503.
+
+Rejections are short plain-text (or JSON under /api/) responses built
+without touching the database or templates, so they stay cheap when a
+script is hammering the app.
+
+Buckets live in memory per process (RATE_LIMIT_BACKEND=memory) or in a
+small SQLite file shared by all workers on the host (=file), separate
+from the app database so limiting never waits on its write lock.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import Response, current_app, g, jsonify, request, session
+
+Rule = namedtuple('Rule', 'rate burst')
+
+#buckets idle this long are full again and can be forgotten
+IDLE_SECONDS = 3600
+
+
+def parse_rules(spec):
+    """{(method or None, endpoint): Rule} from a RATE_LIMITS string."""
+    rules = {}
+    for item in (spec or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        target, _, limit = item.partition('=')
+        method, _, endpoint = target.strip().rpartition(' ')
+        parts = [float(p) for p in limit.strip().split('/')]
+        if len(parts) not in (2, 3) or parts[0] <= 0 or parts[1] <= 0:
+            raise ValueError(f"bad rate limit {item!r}; use [METHOD ]endpoint=requests/seconds[/burst]")
+        count, seconds = parts[:2]
+        rules[(method.upper() or None, endpoint)] = Rule(count / seconds, parts[2] if len(parts) == 3 else count)
+    return rules
+
+
+def parse_caps(spec):
+    """{endpoint: max in flight} from a CONCURRENCY_LIMITS string."""
+    caps = {}
+    for item in (spec or '').split(','):
+        if item.strip():
+            endpoint, _, n = item.partition('=')
+            caps[endpoint.strip()] = int(n)
+    return caps
+
+
+class MemoryBackend:
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        """Spend one token; returns (allowed, seconds until one is available)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+
+#SET expressions all see the old row, so refill, spend and the verdict
+#are computed in one atomic statement
+_TAKE = """
+INSERT INTO buckets (key, tokens, updated, allowed) VALUES (:key, :burst - 1, :now, 1)
+ON CONFLICT (key) DO UPDATE SET
+    tokens = min(:burst, tokens + (:now - updated) * :rate)
+             - (min(:burst, tokens + (:now - updated) * :rate) >= 1),
+    allowed = min(:burst, tokens + (:now - updated) * :rate) >= 1,
+    updated = :now
+RETURNING tokens, allowed
+"""
+
+
+class FileBackend:
+    """Buckets in a local SQLite file, shared by every worker process on the host."""
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._calls = 0
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=wal")
+            conn.execute("PRAGMA synchronous=off")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, "
+                "updated REAL NOT NULL, allowed INTEGER NOT NULL) WITHOUT ROWID"
+            )
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def take(self, key, rate, burst):
+        now = time.time()
+        conn = self._conn()
+        tokens, allowed = conn.execute(_TAKE, {'key': key, 'rate': rate, 'burst': burst, 'now': now}).fetchone()
+        self._calls += 1
+        if self._calls % self.PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM buckets WHERE updated < ?", (now - IDLE_SECONDS,))
+        return bool(allowed), 0.0 if allowed else (1 - tokens) / rate
+
+
+class Limiter:
+    def __init__(self, backend, rules, caps, wait=0.0):
+        self.backend = backend
+        self.rules = rules
+        self.wait = wait
+        self.slots = {endpoint: threading.BoundedSemaphore(n) for endpoint, n in caps.items()}
+
+    def rule_for(self, method, endpoint):
+        return self.rules.get((method, endpoint)) or self.rules.get((None, endpoint))
+
+
+def client_key():
+    user_id = session.get('user_id')
+    return f"user:{user_id}" if user_id else f"ip:{request.remote_addr}"
+
+
+def _reject(status, message, retry_after):
+    if request.path.startswith('/api/'):
+        response = jsonify(error=message)
+        response.status_code = status
+    else:
+        response = Response(message + "\n", status, mimetype='text/plain')
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def _admit():
+    limiter = current_app.extensions['ratelimit']
+    endpoint = request.endpoint
+    if endpoint is None:
+        return None
+    rule = limiter.rule_for(request.method, endpoint)
+    if rule is not None:
+        try:
+            allowed, retry_after = limiter.backend.take(f"{endpoint}|{client_key()}", rule.rate, rule.burst)
+        except sqlite3.Error:
+            #a broken limiter file shouldn't take the site down with it
+            current_app.logger.exception("Rate limiter unavailable")
+            allowed = True
+        if not allowed:
+            return _reject(429, "Too many requests. Please slow down.", retry_after)
+    slot = limiter.slots.get(endpoint)
+    if slot is not None:
+        if not slot.acquire(timeout=limiter.wait):
+            return _reject(503, "The server is busy. Please try again shortly.", 1)
+        g.admission_slot = slot
+    return None
+
+
+def _hand_off(response):
+    slot = g.pop('admission_slot', None)
+    if slot is not None:
+        if response.is_streamed:
+            #hold the slot until the body has been sent
+            response.call_on_close(slot.release)
+        else:
+            slot.release()
+    return response
+
+
+def _release(exc):
+    slot = g.pop('admission_slot', None)
+    if slot is not None:
+        slot.release()
+
+
+def init_app(app):
+    settings = app.config
+    if not settings['RATE_LIMIT_ENABLED']:
+        return
+    if settings['RATE_LIMIT_BACKEND'] == 'file':
+        backend = FileBackend(settings['RATE_LIMIT_FILE'])
+    else:
+        backend = MemoryBackend()
+    app.extensions['ratelimit'] = Limiter(
+        backend, parse_rules(settings['RATE_LIMITS']), parse_caps(settings['CONCURRENCY_LIMITS']),
+        settings['CONCURRENCY_WAIT_MS'] / 1000
+    )
+    app.before_request(_admit)
+    app.after_request(_hand_off)
+    app.teardown_request(_release)
@@ -0,0 +1,176 @@
+"""
+Synthetic data generator.
+
+Fills a database with realistic volumes of doctors, patients,
+appointments and availability windows, inserted with executemany in
+large batches. Every seeded user shares the password SEED_PASSWORD
+(hashed once), and admin@seed.local is created as an admin.
+
+    python seed.py --doctors 2000 --patients 1000000 --appointments 3000000
+    DATABASE_URL=sqlite:////tmp/big.db python seed.py --patients 50000
+
+The target database should be empty; the schema is brought up to date
+first.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import create_engine, text
+import batching
+import config
+import engine_profile
+import hashing
+import migrations
+import slots
+
+SEED_PASSWORD = 'password123'
+ADMIN_EMAIL = 'admin@seed.local'
+BATCH_SIZE = 20000
+#09:00-17:00 in 30 minute slots
+SLOTS_PER_DAY = 16
+FIRST_SLOT = 9 * 60
+
+FIRST_NAMES = ['Aarav', 'Ananya', 'Vihaan', 'Diya', 'Arjun', 'Isha', 'Kabir', 'Meera', 'Rohan', 'Saanvi',
+               'James', 'Mary', 'Robert', 'Linda', 'Michael', 'Sarah', 'David', 'Emma', 'Daniel', 'Olivia']
+LAST_NAMES = ['Sharma', 'Patel', 'Gupta', 'Singh', 'Kumar', 'Reddy', 'Iyer', 'Das', 'Khan', 'Mehta',
+              'Smith', 'Johnson', 'Brown', 'Garcia', 'Miller', 'Davis', 'Wilson', 'Moore', 'Clark', 'Lewis']
+SPECIALIZATIONS = ['Cardiology', 'Dermatology', 'Pediatrics', 'Neurology', 'Orthopedics',
+                   'Gastroenterology', 'Oncology', 'Psychiatry', 'Radiology', 'General Medicine']
+REASONS = ['Routine check-up', 'Follow-up visit', 'Chest pain', 'Skin rash', 'Fever and cough',
+           'Back pain', 'Headache', 'Vaccination', 'Lab results review', 'Prescription refill']
+
+
+def _insert(conn, sql, rows, size):
+    n = 0
+    stmt = text(sql)
+    for batch in batching.chunks(rows, size):
+        conn.execute(stmt, batch)
+        n += len(batch)
+    return n
+
+
+def _dt(value):
+    #same text format SQLAlchemy's SQLite DateTime type stores
+    return value.strftime('%Y-%m-%d %H:%M:%S.%f') if value else None
+
+
+def _name(rnd):
+    return f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}"
+
+
+def seed(engine, doctors=200, patients=20000, appointments=100000, days_back=365, days_ahead=60,
+         seed_value=42, batch_size=BATCH_SIZE, today=None, log=None):
+    rnd = random.Random(seed_value)
+    today = today or date.today()
+    first_day = today - timedelta(days=days_back)
+    n_days = days_back + days_ahead + 1
+    log = log or (lambda msg: None)
+    pwhash = hashing.hash_password(SEED_PASSWORD)
+    now = _dt(datetime.utcnow())
+
+    with engine.begin() as conn:
+        if conn.execute(text("SELECT COUNT(*) FROM users")).scalar():
+            raise SystemExit("target database already has users; seed into an empty database")
+
+        started = time.perf_counter()
+        users_sql = ("INSERT INTO users (id, name, email, password_hash, role, created_at, is_active) "
+                     "VALUES (:id, :name, :email, :pw, :role, :created, 1)")
+
+        def user_rows():
+            yield {'id': 1, 'name': 'Seed Admin', 'email': ADMIN_EMAIL, 'pw': pwhash, 'role': 'admin', 'created': now}
+            for i in range(doctors):
+                yield {'id': 2 + i, 'name': 'Dr. ' + _name(rnd), 'email': f'doctor{i + 1}@seed.local',
+                       'pw': pwhash, 'role': 'doctor', 'created': now}
+            for i in range(patients):
+                yield {'id': 2 + doctors + i, 'name': _name(rnd), 'email': f'patient{i + 1}@seed.local',
+                       'pw': pwhash, 'role': 'patient', 'created': now}
+        _insert(conn, users_sql, user_rows(), batch_size)
+        _insert(conn, "INSERT INTO doctors (id, user_id, specialization, contact) VALUES (:id, :uid, :spec, :contact)",
+                ({'id': i + 1, 'uid': 2 + i, 'spec': SPECIALIZATIONS[i % len(SPECIALIZATIONS)],
+                  'contact': f'+91-98{rnd.randint(10000000, 99999999)}'} for i in range(doctors)), batch_size)
+        _insert(conn, "INSERT INTO patients (id, user_id, age, gender, contact, address) "
+                      "VALUES (:id, :uid, :age, :gender, :contact, :address)",
+                ({'id': i + 1, 'uid': 2 + doctors + i, 'age': rnd.randint(1, 95),
+                  'gender': rnd.choice(('Male', 'Female')), 'contact': f'+91-97{rnd.randint(10000000, 99999999)}',
+                  'address': f'{rnd.randint(1, 999)} {rnd.choice(LAST_NAMES)} Road'} for i in range(patients)),
+                batch_size)
+        log(f"{doctors} doctors, {patients} patients in {time.perf_counter() - started:.1f}s")
+
+    #availability: weekday morning and/or afternoon clinics
+    started = time.perf_counter()
+
+    def availability_rows():
+        for d in range(1, doctors + 1):
+            for k in range(n_days):
+                day = first_day + timedelta(days=k)
+                if day.weekday() >= 5 or rnd.random() < 0.2:
+                    continue
+                shift = rnd.random()
+                if shift < 0.8:
+                    yield {'d': d, 'day': day.isoformat(), 's': '09:00:00.000000', 'e': '13:00:00.000000', 'c': now}
+                if shift > 0.3:
+                    yield {'d': d, 'day': day.isoformat(), 's': '13:00:00.000000', 'e': '17:00:00.000000', 'c': now}
+    with engine.begin() as conn:
+        n = _insert(conn, "INSERT INTO availabilities (doctor_id, date, start_time, end_time, created_at) "
+                          "VALUES (:d, :day, :s, :e, :c)", availability_rows(), batch_size)
+    log(f"{n} availability windows in {time.perf_counter() - started:.1f}s")
+
+    #appointments: distinct (doctor, day, slot) triples so the active-slot
+    #unique index is never violated
+    started = time.perf_counter()
+    space = doctors * n_days * SLOTS_PER_DAY
+    appointments = min(appointments, space)
+
+    def appointment_rows():
+        for idx in rnd.sample(range(space), appointments):
+            d, rest = divmod(idx, n_days * SLOTS_PER_DAY)
+            k, slot = divmod(rest, SLOTS_PER_DAY)
+            day = first_day + timedelta(days=k)
+            minutes = FIRST_SLOT + slot * slots.SLOT_MINUTES
+            at = f'{minutes // 60:02d}:{minutes % 60:02d}:00.000000'
+            created = datetime.combine(day, datetime.min.time()) - timedelta(days=rnd.randint(0, 30),
+                                                                            minutes=rnd.randint(0, 1440))
+            roll = rnd.random()
+            completed_at = None
+            if day < today:
+                status = 'completed' if roll < 0.75 else 'cancelled' if roll < 0.9 else 'pending'
+                if status == 'completed':
+                    completed_at = datetime.combine(day, datetime.min.time()) + timedelta(
+                        minutes=minutes + rnd.randint(10, 45))
+            else:
+                status = 'pending' if roll < 0.9 else 'cancelled'
+            yield {'p': rnd.randint(1, patients), 'd': d + 1, 'day': day.isoformat(), 't': at,
+                   'reason': rnd.choice(REASONS), 'status': status, 'created': _dt(created), 'done': _dt(completed_at)}
+    with engine.begin() as conn:
+        n = _insert(conn, "INSERT INTO appointments (patient_id, doctor_id, date, time, reason, status, created_at, "
+                          "completed_at) VALUES (:p, :d, :day, :t, :reason, :status, :created, :done)",
+                    appointment_rows(), batch_size)
+        conn.execute(text("ANALYZE"))
+    log(f"{n} appointments in {time.perf_counter() - started:.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed the database with synthetic data.")
+    parser.add_argument('--doctors', type=int, default=200)
+    parser.add_argument('--patients', type=int, default=20000)
+    parser.add_argument('--appointments', type=int, default=100000)
+    parser.add_argument('--days-back', type=int, default=365)
+    parser.add_argument('--days-ahead', type=int, default=60)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch', type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(config.DATABASE_URI)
+    engine_profile.install(engine)
+    migrations.upgrade(engine)
+    seed(engine, args.doctors, args.patients, args.appointments, args.days_back, args.days_ahead,
+         args.seed, args.batch, log=lambda msg: print(msg, file=sys.stderr))
+    print(f"seeded {config.DATABASE_URI}; log in as {ADMIN_EMAIL} / {SEED_PASSWORD}", file=sys.stderr)
+    hashing.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
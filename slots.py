@@ -0,0 +1,246 @@
+"""
+Free-slot computation.
+
+Bookable slots are a doctor's Availability windows plus their weekly
+AvailabilityRule windows, minus the times already taken by live
+appointments. For a set of doctors and a date range everything is
+fetched in column-only queries per batch of doctors (windows, rules,
+booked times), then each (doctor, day) is handled in memory: windows
+are sorted and merged, booked slots are merged into busy intervals, and
+a single sweep walks both lists emitting the free slot starts.
+
+Rules are expanded only for the range asked for, and the expansion is
+cached per (doctor, range) keyed on the availability_rules table
+version, so repeat lookups of the same fortnight skip the rules query.
+
+earliest_slots() answers "first N openings with any of these doctors":
+it loads the range in chunks of days that double in length, turns each
+doctor's chunk into a lazy, time-ordered slot generator and k-way merges
+them with a heap, stopping at N, so a search that fills up tomorrow
+never reads next month.
+
+Times are handled as minutes since midnight throughout.
+"""
+import heapq
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+from sqlalchemy import or_
+from models import db, Doctor, User, Appointment, Availability, AvailabilityRule
+import batching
+import cache
+import config
+
+SLOT_MINUTES = 30
+#stay well under SQLite's bound-parameter limit
+DOCTOR_BATCH = 500
+ONE_DAY = timedelta(days=1)
+
+_expanded = cache.Cache(maxsize=config.RULE_CACHE_SIZE, ttl=config.RULE_CACHE_TTL)
+
+
+def to_minutes(value):
+    """Minutes since midnight of a time, or of an 'HH:MM[:SS...]' string as SQLite stores them."""
+    if isinstance(value, str):
+        h, m = value.split(':')[:2]
+        return int(h) * 60 + int(m)
+    return value.hour * 60 + value.minute
+
+
+def _as_time(m):
+    return time(m // 60, m % 60)
+
+
+def merge_intervals(intervals):
+    """Sort (start, end) pairs and merge the ones that overlap or touch."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def subtract_slots(windows, booked, slot_minutes=SLOT_MINUTES, not_before=0):
+    """
+    Slot start minutes inside `windows` that don't overlap a booked slot.
+    `booked` holds appointment start minutes; each one blocks
+    [start, start + slot_minutes).
+    """
+    busy = merge_intervals((b, b + slot_minutes) for b in booked)
+    free = []
+    i = 0
+    for w_start, w_end in merge_intervals(windows):
+        t = w_start
+        while t + slot_minutes <= w_end:
+            while i < len(busy) and busy[i][1] <= t:
+                i += 1
+            if i < len(busy) and busy[i][0] < t + slot_minutes:
+                #jump past the busy interval, staying on this window's grid
+                skip = busy[i][1] - t
+                t += -(-skip // slot_minutes) * slot_minutes
+                continue
+            if t >= not_before:
+                free.append(t)
+            t += slot_minutes
+    return free
+
+
+def load_windows(doctor_ids, start, end):
+    """{(doctor_id, date): [(start_min, end_min), ...]} for availability rows in range."""
+    windows = defaultdict(list)
+    rows = db.session.query(
+        Availability.doctor_id, Availability.date, Availability.start_time, Availability.end_time
+    ).filter(
+        Availability.doctor_id.in_(doctor_ids),
+        Availability.date >= start,
+        Availability.date <= end
+    )
+    for doctor_id, day, s, e in rows:
+        windows[(doctor_id, day)].append((to_minutes(s), to_minutes(e)))
+    return windows
+
+
+def expand_rule(weekdays, window, valid_from, valid_until, skipped, start, end):
+    """Dates in [start, end] on which a weekly rule applies, with its window."""
+    day = max(start, valid_from)
+    last = end if valid_until is None else min(end, valid_until)
+    while day <= last:
+        if weekdays >> day.weekday() & 1 and day not in skipped:
+            yield day, window
+        day += ONE_DAY
+
+
+def load_rule_windows(doctor_ids, start, end):
+    """
+    {(doctor_id, date): [(start_min, end_min), ...]} expanded from the
+    doctors' recurring rules, only loading doctors not already cached
+    for this range.
+    """
+    version = cache.table_version('availability_rules')
+    windows = defaultdict(list)
+    missing = []
+    for doctor_id in doctor_ids:
+        by_day = _expanded.get((doctor_id, start, end) + version)
+        if by_day is None:
+            missing.append(doctor_id)
+            continue
+        for day, day_windows in by_day.items():
+            windows[(doctor_id, day)].extend(day_windows)
+    if not missing:
+        return windows
+    expanded = {doctor_id: defaultdict(list) for doctor_id in missing}
+    rows = db.session.query(
+        AvailabilityRule.doctor_id, AvailabilityRule.weekdays, AvailabilityRule.start_time,
+        AvailabilityRule.end_time, AvailabilityRule.valid_from, AvailabilityRule.valid_until,
+        AvailabilityRule.skip_dates
+    ).filter(
+        AvailabilityRule.doctor_id.in_(missing),
+        AvailabilityRule.valid_from <= end,
+        or_(AvailabilityRule.valid_until.is_(None), AvailabilityRule.valid_until >= start)
+    )
+    for doctor_id, weekdays, s, e, valid_from, valid_until, skip_dates in rows:
+        days = expand_rule(weekdays, (to_minutes(s), to_minutes(e)), valid_from, valid_until,
+                           AvailabilityRule.parse_skip_dates(skip_dates), start, end)
+        for day, window in days:
+            expanded[doctor_id][day].append(window)
+    for doctor_id, by_day in expanded.items():
+        #doctors without rules are cached too, as {}
+        _expanded.set((doctor_id, start, end) + version, dict(by_day))
+        for day, day_windows in by_day.items():
+            windows[(doctor_id, day)].extend(day_windows)
+    return windows
+
+
+def load_booked(doctor_ids, start, end):
+    """{(doctor_id, date): [start_min, ...]} for live appointments in range."""
+    booked = defaultdict(list)
+    rows = db.session.query(
+        Appointment.doctor_id, Appointment.date, Appointment.time
+    ).filter(
+        Appointment.doctor_id.in_(doctor_ids),
+        Appointment.date >= start,
+        Appointment.date <= end,
+        Appointment.status != 'cancelled',
+        Appointment.time.isnot(None)
+    )
+    for doctor_id, day, t in rows:
+        booked[(doctor_id, day)].append(to_minutes(t))
+    return booked
+
+
+def free_slots(doctor_ids, start, end, slot_minutes=SLOT_MINUTES, now=None):
+    """
+    {doctor_id: {date: [time, ...]}} of bookable slot starts between
+    `start` and `end` inclusive. Slots earlier than `now` are dropped.
+    """
+    now = now or datetime.now()
+    result = {}
+    for batch in batching.chunks(doctor_ids, DOCTOR_BATCH):
+        windows, booked = _load_range(batch, start, end)
+        for (doctor_id, day), day_windows in sorted(windows.items()):
+            if day < now.date():
+                continue
+            not_before = to_minutes(now) if day == now.date() else 0
+            free = subtract_slots(day_windows, booked.get((doctor_id, day), ()), slot_minutes, not_before)
+            if free:
+                result.setdefault(doctor_id, {})[day] = [_as_time(m) for m in free]
+    return result
+
+
+def _load_range(doctor_ids, start, end):
+    """Windows (availability and rules) and booked times for doctors in [start, end]."""
+    windows = load_windows(doctor_ids, start, end)
+    for key, rule_windows in load_rule_windows(doctor_ids, start, end).items():
+        windows[key].extend(rule_windows)
+    return windows, load_booked(doctor_ids, start, end)
+
+
+def _doctor_slots(doctor_id, days, booked, slot_minutes, now):
+    """(date, start_min, doctor_id) in time order; each day is only worked out when reached."""
+    for day, day_windows in days:
+        not_before = to_minutes(now) if day == now.date() else 0
+        for m in subtract_slots(day_windows, booked.get((doctor_id, day), ()), slot_minutes, not_before):
+            yield day, m, doctor_id
+
+
+def earliest_slots(doctor_ids, start, end, limit, slot_minutes=SLOT_MINUTES, now=None):
+    """
+    The `limit` earliest free slots across `doctor_ids` between `start`
+    and `end`, as [(doctor_id, date, time), ...] ordered by date and
+    time (ties by doctor id).
+    """
+    now = now or datetime.now()
+    start = max(start, now.date())
+    found = []
+    span = 1
+    while start <= end and len(found) < limit:
+        chunk_end = min(end, start + timedelta(days=span - 1))
+        for batch in batching.chunks(doctor_ids, DOCTOR_BATCH):
+            windows, booked = _load_range(batch, start, chunk_end)
+            by_doctor = defaultdict(list)
+            for (doctor_id, day), day_windows in sorted(windows.items()):
+                by_doctor[doctor_id].append((day, day_windows))
+            merged = heapq.merge(*(_doctor_slots(doctor_id, days, booked, slot_minutes, now)
+                                   for doctor_id, days in by_doctor.items()))
+            #a later batch can still beat this one's slots, so keep the
+            #best `limit` of the chunk before moving on
+            found = list(islice(heapq.merge(found, merged), limit))
+        start, span = chunk_end + ONE_DAY, span * 2
+    return [(doctor_id, day, _as_time(m)) for day, m, doctor_id in found]
+
+
+def doctor_ids_for(specialization=None, active_only=False):
+    q = db.session.query(Doctor.id)
+    if specialization:
+        q = q.filter(Doctor.specialization == specialization)
+    if active_only:
+        q = q.join(User, User.id == Doctor.user_id).filter(User.is_active.is_(True))
+    return [row[0] for row in q.order_by(Doctor.id)]
+
+
+def date_range(start=None, days=14):
+    start = start or date.today()
+    return start, start + timedelta(days=max(days, 1) - 1)
@@ -0,0 +1,153 @@
+"""
+Admin dashboard statistics.
+
+Counts of doctors, patients and appointments (total and per status) are
+loaded once with a single aggregate query and from then on kept current
+from the ORM: each flush records the +/- deltas of the rows it wrote,
+and the deltas are applied when the transaction commits (dropped if it
+rolls back). A refresh of the dashboard therefore costs no queries.
+
+Anything the deltas can't account for - another worker's writes, bulk
+SQL, a deleted row whose status wasn't loaded - is covered by the app's
+STATS_TTL_SECONDS and by invalidate(), after which the next read reloads
+the counts.
+"""
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+from flask import current_app
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+from models import db, Doctor, Patient, Appointment, ArchivedAppointment
+import cache
+import queries
+
+_lock = threading.Lock()
+_counts = None
+_loaded_at = 0.0
+#bumped when a commit lands while no counts are held, so a load that
+#raced with it isn't kept
+_missed = 0
+_MISSING = object()
+_recent = cache.Cache(maxsize=4)
+
+
+def _load():
+    row = db.session.execute(select(
+        select(func.count()).select_from(Doctor).scalar_subquery(),
+        select(func.count()).select_from(Patient).scalar_subquery(),
+    )).one()
+    counts = Counter(doctors=row[0], patients=row[1])
+    #archived appointments still count; archive.py only moves them
+    for model in (Appointment, ArchivedAppointment):
+        for status, n in db.session.query(model.status, func.count()).group_by(model.status):
+            counts['appointments'] += n
+            counts['status:' + status] += n
+    return counts
+
+
+def counts():
+    """Counter with doctors, patients, appointments and status:<name> keys."""
+    global _counts, _loaded_at
+    with _lock:
+        if _counts is not None and time.monotonic() - _loaded_at < current_app.config['STATS_TTL_SECONDS']:
+            return Counter(_counts)
+        missed = _missed
+    fresh = _load()
+    with _lock:
+        if missed == _missed:
+            _counts, _loaded_at = fresh, time.monotonic()
+    return Counter(fresh)
+
+
+def status_counts():
+    return {k.split(':', 1)[1]: v for k, v in counts().items() if k.startswith('status:') and v}
+
+
+def invalidate():
+    global _counts
+    with _lock:
+        _counts = None
+    _recent.invalidate()
+
+
+def recent_appointments(limit=10):
+    """
+    Latest appointments as plain rows, rebuilt only when an appointment,
+    patient, doctor or user row has been written since.
+    """
+    key = (limit,) + cache.table_version('appointments', 'patients', 'doctors', 'users')
+
+    def build():
+        return [SimpleNamespace(
+            id=a.id, patient_name=a.patient_name, doctor_name=a.doctor_name,
+            date=a.date, time=a.time, reason=a.reason, status=a.status
+        ) for a in queries.recent_appointments(limit)]
+    return _recent.get_or_set(key, build, current_app.config['STATS_TTL_SECONDS'])
+
+
+#---------------------------
+#Incremental counter updates
+#---------------------------
+def _status_change(obj):
+    hist = inspect(obj).attrs.status.history
+    if not hist.added:
+        return None, None
+    return (hist.deleted[0] if hist.deleted else _MISSING), hist.added[0]
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_deltas(session, flush_context):
+    delta = session.info.setdefault('stats_delta', Counter())
+    for obj in session.new:
+        if isinstance(obj, Doctor):
+            delta['doctors'] += 1
+        elif isinstance(obj, Patient):
+            delta['patients'] += 1
+        elif isinstance(obj, Appointment):
+            delta['appointments'] += 1
+            delta['status:' + obj.status] += 1
+    for obj in session.deleted:
+        if isinstance(obj, Doctor):
+            delta['doctors'] -= 1
+        elif isinstance(obj, Patient):
+            delta['patients'] -= 1
+        elif isinstance(obj, Appointment):
+            status = inspect(obj).dict.get('status')
+            if status is None:
+                session.info['stats_stale'] = True
+                continue
+            delta['appointments'] -= 1
+            delta['status:' + status] -= 1
+    for obj in session.dirty:
+        if isinstance(obj, Appointment):
+            old, new = _status_change(obj)
+            if old is _MISSING:
+                session.info['stats_stale'] = True
+            elif new is not None and old != new:
+                delta['status:' + old] -= 1
+                delta['status:' + new] += 1
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_deltas(session):
+    global _counts, _missed
+    delta = session.info.pop('stats_delta', None)
+    stale = session.info.pop('stats_stale', False)
+    if not delta and not stale:
+        return
+    with _lock:
+        if _counts is None:
+            _missed += 1
+            return
+        if stale:
+            _counts = None
+        else:
+            _counts.update(delta)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_deltas(session):
+    session.info.pop('stats_delta', None)
+    session.info.pop('stats_stale', None)
@@ -0,0 +1,37 @@
+"""
+Field parsing shared by the form routes and the bulk importer, so a row
+is accepted or rejected the same way whichever path it comes in by.
+"""
+from datetime import datetime
+
+DATE_FORMAT = '%Y-%m-%d'
+TIME_FORMAT = '%H:%M'
+
+
+def normalize_email(value):
+    return (value or '').strip().lower()
+
+
+def optional(value):
+    """Stripped string, or None when blank."""
+    value = (value or '').strip()
+    return value if value else None
+
+
+def parse_age(value):
+    """Age as int; blank or non-numeric input is stored as unknown (None)."""
+    value = (value or '').strip()
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def parse_date(value):
+    """YYYY-MM-DD -> date, raising ValueError otherwise."""
+    return datetime.strptime((value or '').strip(), DATE_FORMAT).date()
+
+
+def parse_time(value):
+    """HH:MM (24-hour) -> time, raising ValueError otherwise."""
+    return datetime.strptime((value or '').strip(), TIME_FORMAT).time()
@@ -0,0 +1,813 @@
+"""
+HTML views.
+
+Routes are collected with @route and only attached to an application by
+init_app(), which create_app() in app.py calls, so importing this module
+has no side effects and endpoint names stay the bare function names.
+"""
+from flask import render_template, request, redirect, url_for, flash, session, abort, current_app, jsonify, Response, stream_with_context
+from datetime import datetime, date
+from sqlalchemy.exc import OperationalError
+from models import db, User, Patient, Doctor, Appointment , Availability, AvailabilityRule
+import analytics
+import auth
+import booking
+import bulk
+import events
+import exports
+import fragments
+import queries
+import fulltext
+import slots
+import stats
+import validation
+
+_routes = []
+
+
+def route(rule, **options):
+    def decorator(view):
+        _routes.append((rule, options, view))
+        return view
+    return decorator
+
+
+def init_app(app):
+    for rule, options, view in _routes:
+        app.add_url_rule(rule, view.__name__, view, **options)
+    app.add_template_global(page_url)
+
+
+#--helper:map role to dashboard endpoint
+def dashboard_for_role(role):
+    if role == 'admin':
+        return 'admin_dashboard'
+    if role == 'doctor':
+        return 'doctor_dashboard'
+    return 'patient_dashboard'
+
+#--helper:current page url with a different cursor, keeping the filters
+def page_url(cursor, direction='next'):
+    args = request.args.to_dict()
+    args.update(cursor=cursor, dir=direction)
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+def page_args():
+    return request.args.get('cursor'), request.args.get('dir', 'next')
+
+#----
+#HOME
+#----   
+@route('/')
+def home():
+    if session.get('user_id') and session.get('role'):
+        return redirect(url_for(dashboard_for_role(session.get('role'))))
+    return render_template('home.html')
+
+#----
+#AUTH
+#----
+@route('/login', methods=['GET', 'POST'])
+def login():
+    if session.get('user_id'):
+        role = session.get('role')
+        if role == 'admin':
+            return redirect(url_for('admin_dashboard'))
+        elif role == 'doctor':
+            return redirect(url_for('doctor_dashboard'))
+        else:
+            return redirect(url_for('patient_dashboard'))
+    if request.method == 'POST':
+        email = validation.normalize_email(request.form.get('email'))
+        password = request.form.get('password', '')
+        if not email or not password:
+            flash('Please enter both email and password.', 'warning')
+            return redirect(url_for('login'))
+        #find user by email
+        user = User.query.filter_by(email=email).first()
+        if not user:
+            flash('No account found with that email.', 'danger')
+            return redirect(url_for('login'))
+        if not user.is_active:
+            flash("This account has been deactivated. Contact admin.", "danger")
+            return redirect(url_for('login'))
+        #check pass hash
+        if not user.check_password(password):
+            flash('Incorrect password.', 'danger')
+            return redirect(url_for('login'))
+        #upgrade hashes made with an older method/cost while we have the password
+        if user.password_needs_rehash():
+            try:
+                user.set_password(password)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                current_app.logger.exception("Password rehash failed")
+        #login success
+        auth.login(user)
+        flash('Logged in successfully.', 'success')
+        #redirect acc to role
+        if session['role'] == 'admin':
+            return redirect(url_for('admin_dashboard'))
+        elif session['role'] == 'doctor':
+            return redirect(url_for('doctor_dashboard'))
+        else:
+            return redirect(url_for('patient_dashboard'))
+    # get req 
+    return render_template('login.html')
+
+@route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == "POST":
+        name = request.form.get('name', '').strip()
+        email = validation.normalize_email(request.form.get('email'))
+        password = request.form.get('password', '') 
+        confirm_password = request.form.get('confirm_password', '') 
+        role = request.form.get('role', 'patient').strip().lower()
+        #patient specific
+        age = request.form.get('age', '').strip()
+        gender = request.form.get('gender', '').strip()
+        contact = request.form.get('contact', '').strip()
+        address = request.form.get('address', '').strip()
+        #basic validation
+        if not name or not email or not password or not confirm_password:
+            flash('Please fill in all required fields (name, email, password).', 'warning')
+            return redirect(url_for('register'))
+        if password != confirm_password:
+            flash('Password do not match.', 'danger')
+            return redirect(url_for('register'))
+        #check if already exists
+        existing = User.query.filter_by(email=email).first()
+        if existing:
+            flash('An account with that email already exists. Please login or use another email.', 'danger')
+            return redirect(url_for('register'))
+        #create user
+        try:
+            user = User(name=name, email=email, role=role)
+            user.set_password(password)
+            db.session.add(user)
+            db.session.flush()
+
+            if role == 'patient':
+                patient = Patient(
+                    user_id=user.id,
+                    age=validation.parse_age(age),
+                    gender=validation.optional(gender),
+                    contact=validation.optional(contact),
+                    address=validation.optional(address)
+                )
+                db.session.add(patient)
+            db.session.commit()
+            flash('Registration successful. You can now log in.', 'success')
+            return redirect(url_for('login'))
+        except Exception as e:
+            db.session.rollback()
+            flash('An error occurred while creating the account. Please try again.', 'danger')
+            return redirect(url_for('register'))
+    return render_template('register.html')
+
+@route('/logout')
+def logout():
+    auth.logout()
+    flash('You have been logged out.', 'success')
+    return redirect(url_for('login'))
+
+#-----
+#ADMIN
+#-----
+@route('/admin/dashboard')
+@auth.role_required('admin')
+def admin_dashboard():
+    counts = stats.counts()
+    recent_appointments = stats.recent_appointments(10)
+    return render_template('admin_dashboard.html', total_doctors=counts['doctors'], total_patients=counts['patients'], total_appointments=counts['appointments'],
+                           status_counts=stats.status_counts(), recent_appointments=recent_appointments)
+@route('/admin/manage_doctors', methods=['GET', 'POST'])
+@auth.role_required('admin')
+def manage_doctors():
+    if request.method == 'POST':
+        name = request.form.get('name', '').strip()
+        email = validation.normalize_email(request.form.get('email'))
+        password = request.form.get('password', '').strip()
+        specialization = request.form.get('specialization', '').strip()
+        contact = request.form.get('contact', '').strip()
+        if not name or not email:
+            flash('Name and email are required to add a doctor.', 'warning')
+            return redirect(url_for('manage_doctors'))
+        if User.query.filter_by(email=email).first():
+            flash('A user with that email already exists.', 'danger')
+            return redirect(url_for('manage_doctors'))
+        try:
+            pw = password if password else 'changeme123'
+            user = User(name=name, email=email, role='doctor')
+            user.set_password(pw)
+            db.session.add(user)
+            db.session.flush()
+            doctor = Doctor(user_id=user.id,
+                            specialization=specialization if specialization else None,
+                            contact=contact if contact else None)
+            db.session.add(doctor)
+            db.session.commit()
+            flash('Doctor added successfully.', 'success')
+            return redirect(url_for('manage_doctors'))
+        except Exception as e:
+            db.session.rollback()
+            flash('Failed to add doctor. Try again.', 'danger')
+            return redirect(url_for('manage_doctors'))
+    return render_template('manage_doctors.html', doctor_table=fragments.doctor_table(),
+                           doctor_options=fragments.doctor_options(detailed=True))
+@route('/admin/delete_patient/<int:patient_id>', methods=['POST'])
+@auth.role_required('admin')
+def admin_delete_patient(patient_id):
+    try:
+        deleted, _ = bulk.delete_patients(db.engine, [patient_id])
+    except OperationalError as e:
+        flash(f"Error deleting patient: {str(e)}", "danger")
+        return redirect(url_for('manage_patients'))
+    if deleted:
+        flash("Patient deleted successfully.", "success")
+    else:
+        flash("Patient not found.", "danger")
+    return redirect(url_for('manage_patients'))
+    
+@route('/admin/toggle_user_active/<int:user_id>', methods=['POST'])
+@auth.role_required('admin')
+def admin_toggle_user_active(user_id):
+    user = User.query.get(user_id)
+    if not user:
+        flash("User not found.", "danger")
+        return redirect(request.referrer or url_for('admin_dashboard'))
+    if user.id == auth.current_principal().user_id:
+        flash("You cannot deactivate your own account.", "warning")
+        return redirect(request.referrer or url_for('admin_dashboard'))
+    try:
+        user.is_active = not user.is_active
+        db.session.commit()
+        flash("User reactivated." if user.is_active else "User deactivated (blacklisted).", "success")
+    except Exception:
+        db.session.rollback()
+        flash("Error updating user status.", "danger")
+    return redirect(request.referrer or url_for('admin_dashboard'))
+
+def selected_ids(name):
+    return [int(v) for v in request.form.getlist(name) if v.isdigit()]
+
+@route('/admin/users/bulk_active', methods=['POST'])
+@auth.role_required('admin')
+def admin_bulk_user_active():
+    user_ids = set(selected_ids('user_ids'))
+    action = request.form.get('action')
+    if action not in ('deactivate', 'reactivate') or not user_ids:
+        flash("Select users and an action.", "warning")
+        return redirect(request.referrer or url_for('admin_dashboard'))
+    user_ids.discard(auth.current_principal().user_id)
+    try:
+        n = bulk.set_users_active(db.engine, user_ids, action == 'reactivate')
+        flash(f"{n} user(s) {action}d.", "success")
+    except OperationalError:
+        flash("Error updating user status.", "danger")
+    return redirect(request.referrer or url_for('admin_dashboard'))
+
+@route('/admin/patients/bulk', methods=['POST'])
+@auth.role_required('admin')
+def admin_bulk_patients():
+    patient_ids = selected_ids('patient_ids')
+    action = request.form.get('action')
+    if action not in ('delete', 'deactivate', 'reactivate') or not patient_ids:
+        flash("Select patients and an action.", "warning")
+        return redirect(url_for('manage_patients'))
+    try:
+        if action == 'delete':
+            patients, appointments = bulk.delete_patients(db.engine, patient_ids)
+            flash(f"{patients} patient(s) and {appointments} appointment(s) deleted.", "success")
+        else:
+            user_ids = [uid for (uid,) in db.session.query(Patient.user_id).filter(Patient.id.in_(patient_ids))]
+            n = bulk.set_users_active(db.engine, user_ids, action == 'reactivate')
+            flash(f"{n} patient(s) {action}d.", "success")
+    except OperationalError as e:
+        flash(f"Error updating patients: {str(e)}", "danger")
+    return redirect(url_for('manage_patients'))
+
+@route('/admin/doctors/future_appointments', methods=['POST'])
+@auth.role_required('admin')
+def admin_doctor_future_appointments():
+    doctor = db.session.get(Doctor, request.form.get('doctor_id', type=int) or 0)
+    action = request.form.get('action')
+    if not doctor or action not in ('reassign', 'cancel'):
+        flash("Select a doctor and an action.", "warning")
+        return redirect(url_for('manage_doctors'))
+    try:
+        if action == 'cancel':
+            n = bulk.cancel_future_appointments(db.engine, doctor.id)
+            flash(f"{n} upcoming appointment(s) cancelled.", "success")
+            return redirect(url_for('manage_doctors'))
+        to_doctor = db.session.get(Doctor, request.form.get('to_doctor_id', type=int) or 0)
+        if not to_doctor or to_doctor.id == doctor.id:
+            flash("Select another doctor to take the appointments.", "warning")
+            return redirect(url_for('manage_doctors'))
+        moved, left = bulk.reassign_future_appointments(db.engine, doctor.id, to_doctor.id)
+        flash(f"{moved} upcoming appointment(s) moved.", "success")
+        if left:
+            flash(f"{left} appointment(s) were left in place: the new doctor is already booked at those times.",
+                  "warning")
+    except OperationalError as e:
+        flash(f"Error updating appointments: {str(e)}", "danger")
+    return redirect(url_for('manage_doctors'))
+
+@route('/admin/manage_patients', methods=['GET', 'POST'])
+@auth.role_required('admin')
+def manage_patients():
+    if request.method == 'POST':
+        name = request.form.get('name', '').strip()
+        email = validation.normalize_email(request.form.get('email'))
+        password = request.form.get('password', '').strip()
+        age = request.form.get('age', '').strip()
+        gender = request.form.get('gender', '').strip()
+        contact = request.form.get('contact', '').strip()
+        address = request.form.get('address', '').strip()
+        if not name or not email:
+            flash('Name and email are required to add a patient.', 'warning')
+            return redirect(url_for('manage_patients'))
+        if User.query.filter_by(email=email).first():
+            flash('A user with that email already exists.', 'danger')
+            return redirect(url_for('manage_patients'))
+        try:
+            user = User(name=name, email=email, role='patient')
+            user.set_password(password if password else 'patient123')
+            db.session.add(user)
+            db.session.flush()
+            patient = Patient(
+                user_id=user.id,
+                age=validation.parse_age(age),
+                gender=validation.optional(gender),
+                contact=validation.optional(contact),
+                address=validation.optional(address)
+            )
+            db.session.add(patient)
+            db.session.commit()
+            flash('Patient added successfully.', 'success')
+            return redirect(url_for('manage_patients'))
+        except Exception:
+            db.session.rollback()
+            flash('Error adding patient. Try again.', 'danger')
+            return redirect(url_for('manage_patients'))
+    cursor, direction = page_args()
+    page = queries.patients_page(cursor, direction)
+    return render_template('manage_patients.html', patients=page.items, page=page)
+@route('/admin/view_all_appointments')
+@auth.role_required('admin')
+def view_all_appointments():
+    filters = queries.parse_appointment_filters(request.args)
+    cursor, direction = page_args()
+    page = queries.appointments_page(filters, cursor, direction)
+    return render_template('view_all_appointments.html', appointments=page.items, page=page, filters=filters,
+                           doctor_options=fragments.doctor_options(filters.get('doctor_id')),
+                           statuses=queries.APPOINTMENT_STATUSES)
+@route('/admin/delete_appointment/<int:appointment_id>', methods=['POST'])
+@auth.role_required('admin')
+def admin_delete_appointment(appointment_id):
+    appt = Appointment.query.get(appointment_id)
+    if not appt:
+        flash("Appointment not found.", "danger")
+        return redirect(url_for('view_all_appointments'))
+    try:
+        db.session.delete(appt)
+        db.session.commit()
+        flash("Appointment deleted successfully.", "success")
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Error deleting appointment: {str(e)}", "danger")
+    return redirect(url_for('view_all_appointments'))
+@route('/admin/export/appointments.<fmt>')
+@auth.role_required('admin')
+def admin_export_appointments(fmt):
+    if fmt not in exports.FORMATS:
+        abort(404)
+    filters = queries.parse_appointment_filters(request.args)
+    return export_response(fmt, filters, 'appointments')
+
+def export_response(fmt, filters, name):
+    body = exports.render(fmt, exports.iter_rows(filters))
+    return Response(
+        stream_with_context(body),
+        mimetype=exports.FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename={name}-{date.today().isoformat()}.{fmt}'}
+    )
+@route('/admin/view_patient_history')
+@auth.role_required('admin')
+def admin_view_patient_history():
+    patient_id = request.args.get('patient_id')
+    if not patient_id:
+        flash('No patient selected.', 'warning')
+        return redirect(url_for('admin_dashboard'))
+    patient = queries.get_patient(patient_id)
+    if not patient:
+        flash('Patient not found.', 'danger')
+        return redirect(url_for('admin_dashboard'))
+    filters = queries.parse_appointment_filters(request.args)
+    filters['patient_id'] = patient.id
+    cursor, direction = page_args()
+    page = queries.history_page(filters, cursor, direction)
+    return render_template('view_patient_history.html', patient=patient, history=page.items, page=page)
+
+#------
+#SEARCH
+#------
+@route('/search')
+@auth.role_required('admin', 'doctor', message="Admin or doctor access required.")
+def search():
+    q = request.args.get('q', '').strip()
+    kind = request.args.get('kind', 'patients')
+    if kind not in fulltext.KINDS:
+        kind = 'patients'
+    page = queries.Page([])
+    if q:
+        cursor, direction = page_args()
+        principal = auth.current_principal()
+        try:
+            if kind == 'patients':
+                page = fulltext.search_patients(q, cursor, direction)
+            else:
+                page = fulltext.search_appointments(q, doctor_id=principal.doctor_id, cursor=cursor, direction=direction)
+        except OperationalError:
+            db.session.rollback()
+            current_app.logger.exception("Search failed")
+            flash("Search is unavailable until the database is migrated.", "danger")
+    return render_template('search.html', q=q, kind=kind, results=page.items, page=page)
+
+@route('/admin/analytics')
+@auth.role_required('admin')
+def admin_analytics():
+    by = request.args.get('by', 'week')
+    if by not in analytics.GROUPS:
+        by = 'week'
+    today = date.today()
+    try:
+        start = validation.parse_date(request.args['from']) if request.args.get('from') else today.replace(day=1)
+        end = validation.parse_date(request.args['to']) if request.args.get('to') else today
+    except ValueError:
+        flash("Invalid date format. Use YYYY-MM-DD.", "danger")
+        return redirect(url_for('admin_analytics'))
+    rows = []
+    try:
+        #only days written since the last report are recomputed
+        analytics.refresh(db.engine)
+        rows = analytics.report(db.engine, start, end, by)
+    except OperationalError:
+        current_app.logger.exception("Analytics failed")
+        flash("Analytics are unavailable until the database is migrated.", "danger")
+    return render_template('analytics.html', rows=rows, by=by, groups=analytics.GROUPS, start=start, end=end,
+                           inf=float('inf'))
+
+#------------------
+#LIVE DASHBOARD FEED
+#------------------
+@route('/events/appointments')
+@auth.role_required('doctor', 'patient', message="Please log in.")
+def appointment_events():
+    principal = auth.current_principal()
+    if principal.role == 'doctor':
+        key = f"doctor:{principal.doctor_id}"
+    else:
+        key = f"patient:{principal.patient_id}"
+    last_id = request.headers.get('Last-Event-ID', type=int)
+    #don't hold a read transaction open for the life of the stream
+    db.session.remove()
+    return Response(
+        stream_with_context(events.stream(key, last_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+#---------
+#DR.ROUTES
+#---------
+@route('/doctor/dashboard')
+@auth.role_required('doctor')
+def doctor_dashboard():
+    doctor = auth.current_principal()
+    today = date.today()
+    appointments = queries.doctor_appointments_on(doctor.doctor_id, today)
+    return render_template('doctor_dashboard.html', doctor=doctor, appointments=appointments, today=today)
+@route('/doctor/complete_appointment', methods=['GET', 'POST'])
+@auth.role_required('doctor', message="You must be logged in as a doctor to access this page.")
+def complete_appointment():
+    doctor_id = auth.current_principal().doctor_id
+    if request.method == 'POST':
+        appointment_id = request.form.get('appointment_id')
+        status = request.form.get('status')
+        notes = request.form.get('notes', '')
+        if not appointment_id:
+            flash("Invalid request. Missing appointment id.", "danger")
+            return redirect(url_for('doctor_dashboard'))
+        appointment = Appointment.query.get(appointment_id)
+        if not appointment:
+            flash("Appointment not found.", "danger")
+            return redirect(url_for('doctor_dashboard'))
+        if appointment.doctor_id != doctor_id:
+            flash("You are not authorized to update this appointment.", "danger")
+            return redirect(url_for('doctor_dashboard'))
+        if not status:
+            status = 'completed'
+        try:
+            appointment.status = status
+            appointment.notes = notes.strip() or None
+            if status == 'completed': 
+                appointment.completed_at = datetime.now()
+            db.session.commit()
+            flash("Appointment updated successfully.", "success")
+            return redirect(url_for('doctor_dashboard'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Error updating appointment. Please try again. ({str(e)})", "danger")
+            return redirect(url_for('doctor_dashboard'))
+    appointment_id = request.args.get('appointment_id')
+    if not appointment_id:
+        flash("No appointment selected.", "warning")
+        return redirect(url_for('doctor_dashboard'))
+    appointment = queries.get_appointment(appointment_id)
+    if not appointment:
+        flash("Appointment not found.", "danger")
+        return redirect(url_for('doctor_dashboard'))
+    if appointment.doctor_id != doctor_id:
+        flash("You are not authorized to view this appointmenr.", "danger")
+        return redirect(url_for('doctor_dashboard'))
+
+    return render_template('complete_appointment.html', appointment=appointment)
+@route('/doctor/view_patient_history')
+@auth.role_required('doctor', message="You must be logged in as a doctor to access this page.")
+def doctor_view_patient_history():
+    patient_id = request.args.get('patient_id')
+    if not patient_id:
+        flash('No patient selected.', 'warning')
+        return redirect(url_for('doctor_dashboard'))
+    patient = queries.get_patient(patient_id)
+    if not patient:
+        flash('Patient not found.', 'danger')
+        return redirect(url_for('doctor_dashboard'))
+    filters = queries.parse_appointment_filters(request.args)
+    filters['patient_id'] = patient.id
+    cursor, direction = page_args()
+    page = queries.history_page(filters, cursor, direction)
+    return render_template('view_patient_history.html', patient=patient, history=page.items, page=page)
+@route('/doctor/availability', methods=['GET', "POST"])
+@auth.role_required('doctor', message="You must be logged in as a doctor to access this page.")
+def doctor_availability():
+    if request.method == 'POST':
+        date_str = request.form.get('date', '').strip()
+        start_str = request.form.get('start_time', '').strip()
+        end_str = request.form.get('end_time', '').strip()
+        if not date_str or not start_str or not end_str:
+            flash("Please provide date, start time and end time.", "warning")
+            return redirect(url_for('doctor_availability'))
+        
+        try:
+            av_date = validation.parse_date(date_str)
+        except ValueError:
+            flash("Invalid date format. Use YYYY-MM-DD.", "danger")
+            return redirect(url_for('doctor_availability'))
+        try:
+            av_start = validation.parse_time(start_str)
+            av_end = validation.parse_time(end_str)
+        except ValueError:
+            flash("Invalid time format. Use HH:MM (24-hour).", "danger")
+            return redirect(url_for('doctor_availability'))
+        start_dt = datetime.combine(av_date, av_start)
+        end_dt = datetime.combine(av_date, av_end)
+        if end_dt <= start_dt:
+            flash("End time must be after start time.", "danger")
+            return redirect(url_for('doctor_availability'))
+        try:
+            availability = Availability(
+                doctor_id=auth.current_principal().doctor_id,
+                date=av_date,
+                start_time=av_start,
+                end_time=av_end,
+                created_at=datetime.utcnow()
+            )
+            db.session.add(availability)
+            db.session.commit()
+            flash("Availability added successfully", "success")
+            return redirect(url_for('doctor_dashboard'))
+        except Exception as e:
+            db.session.rollback()
+            flash("Failed to save availability. Please try again.", "danger")
+            return redirect(url_for('doctor_availability'))
+    rules = AvailabilityRule.query.filter_by(doctor_id=auth.current_principal().doctor_id) \
+        .order_by(AvailabilityRule.valid_from, AvailabilityRule.start_time).all()
+    return render_template('doctor_availability.html', rules=rules, weekdays=AvailabilityRule.WEEKDAY_NAMES)
+
+@route('/doctor/availability/rules', methods=['POST'])
+@auth.role_required('doctor', message="You must be logged in as a doctor to access this page.")
+def doctor_add_availability_rule():
+    weekdays = 0
+    for value in request.form.getlist('weekdays'):
+        if value.isdigit() and int(value) < 7:
+            weekdays |= 1 << int(value)
+    if not weekdays:
+        flash("Pick at least one weekday.", "warning")
+        return redirect(url_for('doctor_availability'))
+    try:
+        valid_from = validation.parse_date(request.form.get('valid_from'))
+        valid_until = validation.parse_date(request.form['valid_until']) if request.form.get('valid_until', '').strip() else None
+        skipped = sorted(validation.parse_date(d) for d in request.form.get('skip_dates', '').split(',') if d.strip())
+    except ValueError:
+        flash("Invalid date format. Use YYYY-MM-DD.", "danger")
+        return redirect(url_for('doctor_availability'))
+    try:
+        start = validation.parse_time(request.form.get('start_time'))
+        end = validation.parse_time(request.form.get('end_time'))
+    except ValueError:
+        flash("Invalid time format. Use HH:MM (24-hour).", "danger")
+        return redirect(url_for('doctor_availability'))
+    if end <= start:
+        flash("End time must be after start time.", "danger")
+        return redirect(url_for('doctor_availability'))
+    if valid_until is not None and valid_until < valid_from:
+        flash("The schedule must end on or after its start date.", "danger")
+        return redirect(url_for('doctor_availability'))
+    try:
+        db.session.add(AvailabilityRule(
+            doctor_id=auth.current_principal().doctor_id,
+            weekdays=weekdays,
+            start_time=start,
+            end_time=end,
+            valid_from=valid_from,
+            valid_until=valid_until,
+            skip_dates=','.join(d.isoformat() for d in skipped) or None,
+            created_at=datetime.utcnow()
+        ))
+        db.session.commit()
+        flash("Weekly schedule added successfully", "success")
+    except Exception:
+        db.session.rollback()
+        flash("Failed to save schedule. Please try again.", "danger")
+    return redirect(url_for('doctor_availability'))
+
+@route('/doctor/availability/rules/<int:rule_id>/delete', methods=['POST'])
+@auth.role_required('doctor', message="You must be logged in as a doctor to access this page.")
+def doctor_delete_availability_rule(rule_id):
+    rule = AvailabilityRule.query.filter_by(id=rule_id, doctor_id=auth.current_principal().doctor_id).first()
+    if not rule:
+        flash("Schedule not found.", "warning")
+        return redirect(url_for('doctor_availability'))
+    db.session.delete(rule)
+    db.session.commit()
+    flash("Weekly schedule removed.", "info")
+    return redirect(url_for('doctor_availability'))
+
+#---------
+#PT.ROUTES
+#---------
+@route('/patient/dashboard')
+@auth.role_required('patient')
+def patient_dashboard():
+    patient = auth.current_principal()
+    today = date.today()
+    appointments = queries.patient_appointments(patient.patient_id, from_date=today)
+
+    return render_template('patient_dashboard.html', patient=patient, appointments=appointments, today=today)
+@route('/patient/book_appointment', methods=['GET', 'POST'])
+@auth.role_required('patient', message="Please log in to book an appointment.")
+def book_appointment():
+    patient = auth.current_principal()
+    #Get - render form
+    if request.method == 'GET':
+        return render_template('book_appointment.html', doctor_options=fragments.doctor_options(detailed=True),
+                               specialization_options=fragments.specialization_options(), patient=patient)
+    #Post - handle booking
+    doctor_id = request.form.get('doctor_id')
+    date_str = request.form.get('date')
+    time_str = request.form.get('time')
+    reason = (request.form.get('reason') or "").strip()
+
+    if not doctor_id or not date_str or not time_str:
+        flash("Please select a doctor and provide date & time.", "danger")
+        return redirect(url_for('book_appointment'))
+    try:
+        doctor_id_int = int(doctor_id)
+    except (TypeError, ValueError):
+        flash("Invalid doctor selection.", "danger")
+        return redirect(url_for('book_appointment'))
+    doctor = Doctor.query.get(doctor_id_int)
+    if not doctor:
+        flash("Selected doctor not found.", "danger")
+        return redirect(url_for('book_appointment'))
+    #parse date/time
+    try:
+        appt_date = validation.parse_date(date_str)
+    except ValueError:
+        flash("Invalid date format. Use YYYY-MM-DD.", "danger")
+        return redirect(url_for('book_appointment'))
+    try:
+        appt_time = validation.parse_time(time_str)
+    except ValueError:
+        flash("Invalid time format. Use HH:MM.", "danger")
+        return redirect(url_for('book_appointment'))
+    #insert is the conflict check (unique index on live slots)
+    try:
+        booking.book(patient.patient_id, doctor.id, appt_date, appt_time, reason)
+    except booking.SlotTaken:
+        flash("Selected doctor already has an appointment at that date & time.", "warning")
+        return redirect(url_for('book_appointment'))
+    except Exception as e:
+        db.session.rollback()
+        flash("Could not create appointment. Try again.", "danger")
+        return redirect(url_for('book_appointment'))
+    flash("Appointment booked successfully.", "success")
+    return redirect(url_for('patient_dashboard'))
+@route('/patient/available_slots')
+def available_slots():
+    principal = auth.current_principal()
+    if principal is None or not principal.is_active:
+        return jsonify(error="Login required."), 401
+    try:
+        start = validation.parse_date(request.args['start']) if request.args.get('start') else None
+        days = min(int(request.args.get('days', 14)), 60)
+    except ValueError:
+        return jsonify(error="Use start=YYYY-MM-DD and an integer days."), 400
+    doctor_id = request.args.get('doctor_id', type=int)
+    if doctor_id:
+        doctor_ids = [doctor_id]
+    else:
+        doctor_ids = slots.doctor_ids_for(request.args.get('specialization', '').strip() or None)
+    start, end = slots.date_range(start, days)
+    free = slots.free_slots(doctor_ids, start, end)
+    return jsonify(
+        start=start.isoformat(),
+        end=end.isoformat(),
+        slot_minutes=slots.SLOT_MINUTES,
+        doctors={
+            str(doc_id): {day.isoformat(): [t.strftime('%H:%M') for t in times] for day, times in by_day.items()}
+            for doc_id, by_day in free.items()
+        }
+    )
+@route('/patient/earliest_slots')
+def earliest_slots():
+    principal = auth.current_principal()
+    if principal is None or not principal.is_active:
+        return jsonify(error="Login required."), 401
+    specialization = request.args.get('specialization', '').strip()
+    if not specialization:
+        return jsonify(error="specialization is required."), 400
+    try:
+        start = validation.parse_date(request.args['start']) if request.args.get('start') else None
+        days = min(int(request.args.get('days', 30)), 90)
+        limit = max(1, min(int(request.args.get('limit', 10)), 50))
+    except ValueError:
+        return jsonify(error="Use start=YYYY-MM-DD and integer days and limit."), 400
+    start, end = slots.date_range(start, days)
+    found = slots.earliest_slots(slots.doctor_ids_for(specialization, active_only=True), start, end, limit)
+    names = dict(db.session.query(Doctor.id, User.name).join(User, User.id == Doctor.user_id)
+                 .filter(Doctor.id.in_({doctor_id for doctor_id, _, _ in found}))) if found else {}
+    return jsonify(
+        specialization=specialization,
+        start=start.isoformat(),
+        end=end.isoformat(),
+        slot_minutes=slots.SLOT_MINUTES,
+        slots=[{'doctor_id': doctor_id, 'doctor_name': names.get(doctor_id),
+                'date': day.isoformat(), 'time': t.strftime('%H:%M')} for doctor_id, day, t in found]
+    )
+@route('/patient/cancel_appointment/<int:appointment_id>', methods=['POST'])
+@auth.role_required('patient')
+def cancel_appointment(appointment_id):
+    appt = Appointment.query.get(appointment_id)
+    if not appt:
+        flash("Appointment not found.", "danger")
+        return redirect(url_for('patient_dashboard'))
+    
+    if appt.patient_id != auth.current_principal().patient_id:
+        flash("You cannot cancel someone else's appointment.", "danger")
+        return redirect(url_for('patient_dashboard'))
+    current_status = (appt.status or "").strip().lower()
+    if current_status != "pending":
+        flash(f"Only pending appointments can be cancelled. Current status: {appt.status}", "warning")
+        return redirect(url_for('patient_dashboard'))
+    try:
+        appt.status = "cancelled"
+        db.session.commit()
+        flash("Appointment cancelled successfully.", "success")
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception("Failed to cancel appointment")
+        flash(f"Error cancelling appointment: {str(e)}", "danger")
+    return redirect(url_for('patient_appointment_history'))
+
+@route('/patient/export/history.<fmt>')
+@auth.role_required('patient')
+def patient_export_history(fmt):
+    if fmt not in exports.FORMATS:
+        abort(404)
+    filters = queries.parse_appointment_filters(request.args)
+    filters['patient_id'] = auth.current_principal().patient_id
+    return export_response(fmt, filters, 'my-appointments')
+
+@route('/patient/appointment_history')
+@auth.role_required('patient')
+def patient_appointment_history():
+    patient = queries.get_patient(auth.current_principal().patient_id)
+    filters = queries.parse_appointment_filters(request.args)
+    filters['patient_id'] = patient.id
+    cursor, direction = page_args()
+    page = queries.history_page(filters, cursor, direction)
+    return render_template('view_patient_history.html', patient=patient, history=page.items, page=page)
@@ -0,0 +1,20 @@
+"""
+WSGI entry point:
+
+    gunicorn wsgi:app           # settings in gunicorn.conf.py
+
+That is threaded workers with --preload; the live dashboard streams need
+the threads (see gunicorn.conf.py).
+
+Run `python migrations.py` once before starting the workers; creating
+the app doesn't touch the database, so with --preload the master holds
+no SQLite connection that forked workers could inherit.
+"""
+import gc
+from app import create_app
+
+app = create_app()
+
+#move everything loaded so far out of the collector's generations, so
+#gc passes in forked workers don't write to (and un-share) those pages
+gc.freeze()